@@ -0,0 +1,77 @@
+"""
+Helpers for running blocking work off the asyncio event loop
+
+Filesystem and git work runs on worker threads, with a separate
+concurrency limit per resource so a burst of slow git operations cannot
+starve document reads.
+"""
+
+import asyncio
+import functools
+from typing import Any, Callable, Dict, Tuple
+
+import anyio
+import anyio.to_thread
+
+from config import get_settings
+from profiling import profiled
+
+_settings = get_settings()
+
+# Maximum concurrent blocking operations per resource
+RESOURCE_LIMITS = {
+    "fs": _settings.fs_concurrency,
+    "git": _settings.git_concurrency,
+}
+
+_limiters: Dict[str, Tuple[asyncio.AbstractEventLoop, anyio.CapacityLimiter]] = {}
+
+
+def get_limiter(resource: str) -> anyio.CapacityLimiter:
+    """
+    Get the capacity limiter for a resource on the running event loop
+
+    Args:
+        resource: Resource name ("fs" or "git")
+
+    Returns:
+        CapacityLimiter shared by all requests on this loop
+    """
+    loop = asyncio.get_running_loop()
+    entry = _limiters.get(resource)
+    if entry is None or entry[0] is not loop:
+        entry = (loop, anyio.CapacityLimiter(RESOURCE_LIMITS[resource]))
+        _limiters[resource] = entry
+    return entry[1]
+
+
+async def run_blocking(resource: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run a blocking callable on a worker thread, bounded by the resource limit
+
+    If the awaiting request is cancelled, the call still runs to completion
+    so a write is never left half-applied; only the result is discarded.
+    Work done for a profiled request is profiled in the worker thread.
+
+    Args:
+        resource: Resource name ("fs" or "git")
+        func: Blocking callable
+        *args, **kwargs: Arguments for func
+
+    Returns:
+        Whatever func returns
+    """
+    return await anyio.to_thread.run_sync(
+        profiled(functools.partial(func, *args, **kwargs)),
+        limiter=get_limiter(resource)
+    )
+
+
+async def run_fs(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run blocking filesystem work on the filesystem pool"""
+    return await run_blocking("fs", func, *args, **kwargs)
+
+
+async def run_git(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run blocking git work on the git pool"""
+    return await run_blocking("git", func, *args, **kwargs)
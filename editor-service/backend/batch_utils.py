@@ -0,0 +1,401 @@
+"""
+Atomic batches of document, section and navigation changes
+
+A batch applies an ordered list of operations to the docs directory in one
+pass, rewrites mkdocs.yml once and records everything in a single commit.
+Every filesystem change is journaled (replaced and deleted content is moved
+aside rather than removed), so if any operation, the navigation write or the
+commit fails, the whole batch is rolled back.
+"""
+
+import os
+import shutil
+import tempfile
+import logging
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Tuple
+
+from etag_utils import content_etag, etag_matches
+from metrics import STAGE_SECONDS
+from git_utils import REPO_LOCK, is_git_repo, git_commit_paths
+from mkdocs_utils import (
+    MKDOCS_LOCK, config_cache, restore_mkdocs_config, write_mkdocs_config,
+    nav_add_section, nav_add_subsection, nav_remove_section, nav_remove_subsection
+)
+from section_utils import sanitize_name, section_index_content, subsection_index_content
+
+logger = logging.getLogger(__name__)
+
+# Commits a list of paths with a message: (success, message, commit id)
+CommitPaths = Callable[[List[Path], str], Tuple[bool, str, Optional[str]]]
+
+OPERATIONS = (
+    "create", "update", "delete", "move",
+    "create_section", "create_subsection", "delete_section"
+)
+
+
+class BatchError(Exception):
+    """A batch operation could not be applied"""
+
+    def __init__(self, index: int, op: str, message: str, status_code: int = 400):
+        super().__init__(f"Operation {index} ({op}) failed: {message}")
+        self.index = index
+        self.op = op
+        self.status_code = status_code
+
+
+class BatchTransaction:
+    """
+    Journaled application of batch operations to the docs directory
+
+    Args:
+        docs_dir: Base docs directory
+        mkdocs_path: Path to mkdocs.yml
+    """
+
+    def __init__(self, docs_dir: Path, mkdocs_path: Path):
+        self.docs_dir = Path(docs_dir)
+        self.mkdocs_path = Path(mkdocs_path)
+        # Paths whose state changed, for staging and index refreshes
+        self.touched: List[Path] = []
+        self.touched_dirs: List[Path] = []
+        self.nav_edits: List[Tuple] = []
+        self.etags: Dict[str, str] = {}
+        self._journal: List[Tuple] = []
+        self._backup_dir: Optional[Path] = None
+        self._mkdocs_backup: Optional[bytes] = None
+
+    # Operations
+
+    def apply(self, index: int, operation: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Apply one operation
+
+        Args:
+            index: Position of the operation in the batch, for error messages
+            operation: Operation dictionary with an ``op`` key
+
+        Returns:
+            Summary of what was done
+
+        Raises:
+            BatchError: If the operation is invalid or cannot be applied
+        """
+        op = operation.get("op")
+        if op not in OPERATIONS:
+            raise BatchError(index, str(op), f"Unknown operation, expected one of {', '.join(OPERATIONS)}")
+        try:
+            return getattr(self, f"_{op}")(index, operation)
+        except BatchError:
+            raise
+        except OSError as e:
+            raise BatchError(index, op, str(e), 500)
+
+    def _create(self, index: int, operation: Dict[str, Any]) -> Dict[str, Any]:
+        path = self._document_path(index, operation, "path")
+        if path.exists():
+            raise BatchError(index, "create", f"'{self._rel(path)}' already exists", 409)
+        content = self._content(index, operation)
+        self._make_parents(path)
+        self._write(path, content)
+        self._journal.append(("created", path))
+        return {"op": "create", "path": self._rel(path)}
+
+    def _update(self, index: int, operation: Dict[str, Any]) -> Dict[str, Any]:
+        path = self._document_path(index, operation, "path")
+        if not path.is_file():
+            raise BatchError(index, "update", f"'{self._rel(path)}' does not exist", 404)
+        content = self._content(index, operation)
+        if_match = operation.get("if_match")
+        if if_match and not etag_matches(if_match, content_etag(path.read_bytes()), weak=False):
+            raise BatchError(index, "update", f"'{self._rel(path)}' was modified since it was loaded", 412)
+        self._set_aside(path)
+        self._write(path, content)
+        self._journal.append(("created", path))
+        return {"op": "update", "path": self._rel(path)}
+
+    def _delete(self, index: int, operation: Dict[str, Any]) -> Dict[str, Any]:
+        path = self._document_path(index, operation, "path")
+        if not path.is_file():
+            raise BatchError(index, "delete", f"'{self._rel(path)}' does not exist", 404)
+        self._set_aside(path)
+        self.touched.append(path)
+        return {"op": "delete", "path": self._rel(path)}
+
+    def _move(self, index: int, operation: Dict[str, Any]) -> Dict[str, Any]:
+        source = self._document_path(index, operation, "path")
+        target = self._document_path(index, operation, "to")
+        if not source.is_file():
+            raise BatchError(index, "move", f"'{self._rel(source)}' does not exist", 404)
+        if target.exists():
+            raise BatchError(index, "move", f"'{self._rel(target)}' already exists", 409)
+        self._make_parents(target)
+        os.replace(source, target)
+        self._journal.append(("moved", source, target))
+        self.touched.extend([source, target])
+        return {"op": "move", "path": self._rel(source), "to": self._rel(target)}
+
+    def _create_section(self, index: int, operation: Dict[str, Any]) -> Dict[str, Any]:
+        name = operation.get("name") or ""
+        directory = sanitize_name(name)
+        if not directory:
+            raise BatchError(index, "create_section", "Invalid section name")
+        path = self.docs_dir / directory
+        if path.exists():
+            raise BatchError(index, "create_section", f"Section '{directory}' already exists", 409)
+        self._make_dir(path)
+        index_path = path / "index.md"
+        self._write(index_path, section_index_content(name))
+        self.nav_edits.append((nav_add_section, name, directory))
+        return {"op": "create_section", "path": directory}
+
+    def _create_subsection(self, index: int, operation: Dict[str, Any]) -> Dict[str, Any]:
+        name = operation.get("name") or ""
+        section = sanitize_name(operation.get("section") or "")
+        directory = sanitize_name(name)
+        if not section or not directory:
+            raise BatchError(index, "create_subsection", "Invalid section or subsection name")
+        if not (self.docs_dir / section).is_dir():
+            raise BatchError(index, "create_subsection", f"Parent section '{section}' does not exist", 404)
+        path = self.docs_dir / section / directory
+        if path.exists():
+            raise BatchError(index, "create_subsection", f"Sub-section '{directory}' already exists in '{section}'", 409)
+        self._make_dir(path)
+        self._write(path / "index.md", subsection_index_content(name))
+        self.nav_edits.append((nav_add_subsection, operation.get("section"), name, f"{section}/{directory}"))
+        return {"op": "create_subsection", "path": f"{section}/{directory}"}
+
+    def _delete_section(self, index: int, operation: Dict[str, Any]) -> Dict[str, Any]:
+        path = self._resolve(index, "delete_section", operation.get("path"))
+        rel_path = self._rel(path)
+        if not rel_path or not path.is_dir():
+            raise BatchError(index, "delete_section", f"'{rel_path}' is not a section", 404)
+        documents = [p for p in path.rglob("*") if p.is_file()]
+        self._set_aside(path)
+        self.touched.extend(documents)
+        self.touched_dirs.append(path)
+        parts = rel_path.split("/")
+        if len(parts) > 1:
+            self.nav_edits.append((nav_remove_subsection, parts[0], parts[1]))
+        else:
+            self.nav_edits.append((nav_remove_section, parts[0]))
+        return {"op": "delete_section", "path": rel_path}
+
+    # Navigation, commit and rollback
+
+    def needs_navigation(self, navigation: Optional[List[Any]] = None) -> bool:
+        """Whether ``write_navigation`` will rewrite mkdocs.yml"""
+        return bool(self.nav_edits) or navigation is not None
+
+    def write_navigation(self, navigation: Optional[List[Any]] = None) -> bool:
+        """
+        Apply all navigation edits and write mkdocs.yml once
+
+        Args:
+            navigation: Replacement navigation, applied after the section edits
+
+        Returns:
+            True if mkdocs.yml was rewritten
+        """
+        if not self.needs_navigation(navigation):
+            return False
+        with config_cache.edit(self.mkdocs_path) as config:
+            self._mkdocs_backup = self.mkdocs_path.read_bytes()
+            for edit, *args in self.nav_edits:
+                if not edit(config, *args):
+                    logger.warning(f"Batch navigation edit {edit.__name__}{tuple(args)} had no effect")
+            if navigation is not None:
+                config["nav"] = navigation
+            if not write_mkdocs_config(config, self.mkdocs_path):
+                raise OSError("Failed to write mkdocs.yml")
+        self.touched.append(self.mkdocs_path)
+        return True
+
+    def commit(self, message: str, commit_paths: "CommitPaths" = git_commit_paths) -> Tuple[bool, str, Optional[str]]:
+        """
+        Commit exactly the touched paths
+
+        Args:
+            message: Commit message
+            commit_paths: Commits a path list, like ``git_commit_paths``
+
+        Returns:
+            Tuple of (success, message, commit id)
+        """
+        return commit_paths(list(dict.fromkeys(self.touched)), message)
+
+    def rollback(self) -> None:
+        """Undo every applied change, newest first"""
+        for entry in reversed(self._journal):
+            try:
+                kind = entry[0]
+                if kind == "created":
+                    entry[1].unlink(missing_ok=True)
+                elif kind == "created_dir":
+                    if entry[1].is_dir():
+                        shutil.rmtree(entry[1])
+                elif kind == "set_aside":
+                    os.replace(entry[2], entry[1])
+                elif kind == "moved":
+                    os.replace(entry[2], entry[1])
+            except OSError as e:
+                logger.error(f"Batch rollback step {entry} failed: {e}")
+        self._journal = []
+
+        if self._mkdocs_backup is not None:
+            # run_batch still holds MKDOCS_LOCK, so this is only the batch's own edit
+            restore_mkdocs_config(self._mkdocs_backup, self.mkdocs_path)
+            self._mkdocs_backup = None
+        self.cleanup()
+
+    def cleanup(self) -> None:
+        """Discard set-aside content once the batch is final"""
+        if self._backup_dir is not None:
+            shutil.rmtree(self._backup_dir, ignore_errors=True)
+            self._backup_dir = None
+
+    # Internals
+
+    def _rel(self, path: Path) -> str:
+        return path.relative_to(self.docs_dir).as_posix() if path != self.docs_dir else ""
+
+    def _resolve(self, index: int, op: str, rel_path: Optional[str]) -> Path:
+        if not rel_path:
+            raise BatchError(index, op, "Missing path")
+        path = self.docs_dir / rel_path.strip("/")
+        try:
+            path.resolve().relative_to(self.docs_dir.resolve())
+        except ValueError:
+            raise BatchError(index, op, "Access denied", 403)
+        return Path(os.path.normpath(path))
+
+    def _document_path(self, index: int, operation: Dict[str, Any], key: str) -> Path:
+        path = self._resolve(index, operation["op"], operation.get(key))
+        if path.suffix != ".md":
+            if operation["op"] == "create" or key == "to":
+                path = path.with_suffix(".md")
+            else:
+                raise BatchError(index, operation["op"], "Only markdown files are supported")
+        return path
+
+    @staticmethod
+    def _content(index: int, operation: Dict[str, Any]) -> str:
+        content = operation.get("content")
+        if content is None:
+            raise BatchError(index, operation["op"], "Missing content")
+        return content
+
+    def _write(self, path: Path, content: str) -> None:
+        with STAGE_SECONDS.labels("file_write").time():
+            path.write_text(content, encoding="utf-8")
+        self.etags[self._rel(path)] = content_etag(content.encode("utf-8"))
+        self.touched.append(path)
+
+    def _make_dir(self, path: Path) -> None:
+        self._make_parents(path)
+        path.mkdir()
+        self._journal.append(("created_dir", path))
+        self.touched_dirs.append(path)
+
+    def _make_parents(self, path: Path) -> None:
+        missing = []
+        parent = path.parent
+        while not parent.exists():
+            missing.append(parent)
+            parent = parent.parent
+        if missing:
+            path.parent.mkdir(parents=True)
+            # Removing the outermost new directory undoes the whole chain
+            self._journal.append(("created_dir", missing[-1]))
+
+    def _set_aside(self, path: Path) -> None:
+        if self._backup_dir is None:
+            # Same filesystem as the docs, so setting content aside is a rename
+            self._backup_dir = Path(tempfile.mkdtemp(prefix=".editor-batch-", dir=self.docs_dir.parent))
+        backup = self._backup_dir / str(len(self._journal))
+        os.replace(path, backup)
+        self._journal.append(("set_aside", path, backup))
+
+
+def default_batch_message(results: List[Dict[str, Any]]) -> str:
+    """Commit message summarizing a batch"""
+    summary = f"docs: Apply {len(results)} change(s)"
+    lines = []
+    for result in results[:50]:
+        target = f" -> {result['to']}" if "to" in result else ""
+        lines.append(f"- {result['op']} {result['path']}{target}")
+    if len(results) > 50:
+        lines.append(f"- ... and {len(results) - 50} more")
+    return summary + "\n\n" + "\n".join(lines)
+
+
+def run_batch(
+    transaction: BatchTransaction,
+    operations: List[Dict[str, Any]],
+    navigation: Optional[List[Any]] = None,
+    commit_message: Optional[str] = None,
+    commit_paths: CommitPaths = git_commit_paths,
+    lock: ContextManager = REPO_LOCK
+) -> Dict[str, Any]:
+    """
+    Apply a batch and commit it, rolling everything back on failure
+
+    ``lock`` is held until the commit is done, so no other write lands on
+    a path of the batch in between. When ``commit_paths`` hands the commit
+    to another thread, pass a lock that thread does not take (the document
+    write lock rather than REPO_LOCK). A batch that changes the navigation
+    also holds MKDOCS_LOCK from the mkdocs.yml write until the commit or
+    rollback, so a rollback never undoes another request's nav edit.
+    Afterwards ``transaction.touched`` lists the paths whose state may have
+    changed, whether the batch succeeded or not.
+
+    ``commit_paths`` must only report failure for a commit that can no
+    longer land; one that may still land (e.g. queued for a committer
+    that did not answer in time) counts as success and leaves the batch
+    applied.
+
+    Args:
+        transaction: Fresh transaction for the docs directory
+        operations: Operation dictionaries, applied in order
+        navigation: Optional replacement navigation
+        commit_message: Optional commit message
+        commit_paths: Commits the touched paths
+        lock: Lock held while the batch is applied and committed
+
+    Returns:
+        Result dictionary
+
+    Raises:
+        BatchError: If any operation fails (nothing is left applied)
+    """
+    with lock, ExitStack() as navigation_lock:
+        try:
+            results = [transaction.apply(index, operation) for index, operation in enumerate(operations)]
+            if transaction.needs_navigation(navigation):
+                navigation_lock.enter_context(MKDOCS_LOCK)
+            try:
+                navigation_updated = transaction.write_navigation(navigation)
+            except Exception as e:
+                raise BatchError(len(operations), "navigation", str(e), 500)
+
+            commit_id = None
+            git_status = ""
+            if is_git_repo():
+                message = commit_message or default_batch_message(results)
+                success, git_status, commit_id = transaction.commit(message, commit_paths)
+                if not success:
+                    raise BatchError(len(operations), "commit", git_status, 500)
+        except BaseException:
+            transaction.rollback()
+            raise
+
+    transaction.cleanup()
+    return {
+        "message": f"Applied {len(results)} operation(s)",
+        "operations": results,
+        "navigation_updated": navigation_updated,
+        "commit": commit_id,
+        "git_status": git_status
+    }
@@ -0,0 +1,415 @@
+"""
+Background group-commit queue for document writes
+
+Saves land on disk immediately and are queued here. A single committer
+thread groups everything that arrives within a short window (or until a
+file limit is reached) into one git commit, so autosaving editors do not
+pay for git subprocesses on every request.
+
+With several worker processes, only the elected committer commits. The
+other workers spool their tickets (see ``coordination.TicketSpool``) and
+the committer picks them up alongside its own. Changes whose callers need
+the outcome before responding (section, navigation and batch writes) are
+submitted with ``commit()``, which skips the grouping window and waits.
+A ticket the committer has not picked up when the wait ends is withdrawn,
+so the caller can undo its change without the commit landing later.
+"""
+
+import threading
+import time
+import uuid
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from coordination import LeaderElection, TicketSpool
+from git_utils import is_git_repo, git_commit_paths, git_push
+from metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# How many finished tickets to remember for status queries
+MAX_TICKET_HISTORY = 1000
+
+# Seconds commit() waits for the committer before reporting the ticket as pending
+COMMIT_WAIT_TIMEOUT = 60.0
+
+
+class CommitTicket:
+    """A queued change waiting to be committed"""
+
+    __slots__ = (
+        "id", "paths", "message", "push", "urgent", "status", "result",
+        "commit", "created_at", "committed_at", "spooled"
+    )
+
+    def __init__(self, paths: List[Path], message: str, push: bool, urgent: bool = False):
+        self.id = uuid.uuid4().hex
+        self.paths = paths
+        self.message = message
+        self.push = push
+        self.urgent = urgent
+        self.status = "pending"
+        self.result: Optional[str] = None
+        self.commit: Optional[str] = None
+        self.created_at = datetime.now().isoformat()
+        self.committed_at: Optional[str] = None
+        self.spooled: Optional[Dict] = None
+
+    @classmethod
+    def from_spool(cls, data: Dict) -> "CommitTicket":
+        """Rebuild a ticket another worker spooled for the committer"""
+        ticket = cls([Path(path) for path in data["paths"]], data["message"], data["push"], data.get("urgent", False))
+        ticket.id = data["id"]
+        ticket.created_at = data["created_at"]
+        ticket.spooled = data
+        return ticket
+
+    def to_spool(self) -> Dict:
+        """JSON form handed to the committer process"""
+        return {
+            "id": self.id,
+            "paths": [str(path) for path in self.paths],
+            "message": self.message,
+            "push": self.push,
+            "urgent": self.urgent,
+            "created_at": self.created_at
+        }
+
+    def to_dict(self) -> Dict:
+        return {
+            "ticket": self.id,
+            "status": self.status,
+            "message": self.message,
+            "result": self.result,
+            "commit": self.commit,
+            "created_at": self.created_at,
+            "committed_at": self.committed_at
+        }
+
+
+class CommitQueue:
+    """
+    Group queued file changes into combined commits
+
+    Args:
+        window: Seconds to wait after the first queued change before committing
+        max_files: Commit immediately once this many distinct files are queued
+        request_push: Hands pushes to a background worker; without it the
+            committer pushes inline after each group commit
+        on_commit: Called with a summary of each group commit attempt
+        election: Decides which worker process commits; without it this
+            process always does
+        spool: Queue shared with the other workers; required with election
+        poll: Seconds between spool checks while this process is the committer
+    """
+
+    def __init__(
+        self,
+        window: float = 2.0,
+        max_files: int = 50,
+        request_push: Optional[Callable[[], None]] = None,
+        on_commit: Optional[Callable[[Dict], None]] = None,
+        election: Optional[LeaderElection] = None,
+        spool: Optional[TicketSpool] = None,
+        poll: float = 0.5
+    ):
+        self.window = window
+        self.max_files = max_files
+        self.request_push = request_push
+        self.on_commit = on_commit
+        self.election = election
+        self.spool = spool
+        self.poll = poll
+        self._recover = True
+        self._pending: List[CommitTicket] = []
+        self._tickets: "OrderedDict[str, CommitTicket]" = OrderedDict()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    def start(self) -> None:
+        """Start the committer thread"""
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="commit-queue", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Commit anything still pending and stop the committer thread"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=60)
+            self._thread = None
+
+    def submit(self, paths: List[Path], message: str, push: bool = True, urgent: bool = False) -> str:
+        """
+        Queue changed paths for the next group commit
+
+        Args:
+            paths: Files that were created, updated or deleted
+            message: Commit message describing this change
+            push: Whether the resulting commit should be pushed
+            urgent: Commit as soon as the committer sees the ticket instead
+                of waiting for the window to close
+
+        Returns:
+            Ticket id that can be used to query the commit status
+        """
+        ticket = CommitTicket(list(paths), message, push, urgent)
+        if not self.is_committer:
+            # The committer reports the status back through the spool
+            self.spool.put(ticket.to_spool())
+            return ticket.id
+
+        with self._condition:
+            self._pending.append(ticket)
+            self._remember(ticket)
+            self._condition.notify_all()
+        return ticket.id
+
+    def push(self) -> None:
+        """Ask for local commits to be pushed, by the committer process"""
+        if not self.is_committer:
+            self.spool.put({"id": uuid.uuid4().hex, "paths": [], "push": True})
+        elif self.request_push is not None:
+            self.request_push()
+        else:
+            git_push()
+
+    def commit(self, paths: List[Path], message: str, push: bool = True, timeout: float = COMMIT_WAIT_TIMEOUT) -> Dict:
+        """
+        Commit paths through the committer and wait for the outcome
+
+        Args:
+            paths: Files that were created, updated or deleted
+            message: Commit message describing this change
+            push: Whether the resulting commit should be pushed
+            timeout: Seconds to wait for the committer
+
+        Returns:
+            Ticket status as from ``get``. If the committer did not get to it
+            within the timeout, the ticket is withdrawn and the status is
+            ``withdrawn``; it stays ``pending`` only if the committer took it
+            in the meantime, so the commit can still land.
+        """
+        ticket_id = self.submit(paths, message, push=push, urgent=True)
+        status = self.wait(ticket_id, timeout)
+        if status["status"] == "pending" and self.withdraw(ticket_id):
+            return {"ticket": ticket_id, "status": "withdrawn", "result": f"Not committed within {timeout:g}s"}
+        return status
+
+    def wait(self, ticket_id: str, timeout: float = COMMIT_WAIT_TIMEOUT) -> Dict:
+        """
+        Wait until a ticket is committed or has failed
+
+        Returns:
+            Ticket status; ``pending`` if the timeout expired first
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._condition:
+                ticket = self._tickets.get(ticket_id)
+                if ticket is not None:
+                    while ticket.status == "pending" and self._condition.wait(max(0.0, deadline - time.monotonic())):
+                        pass
+                    return ticket.to_dict()
+            # Spooled to the committer process, which reports back through the spool
+            status = self.spool.status(ticket_id) if self.spool is not None else None
+            if status is not None and status["status"] != "pending":
+                return status
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return status or {"ticket": ticket_id, "status": "pending"}
+            time.sleep(min(self.poll / 5, remaining))
+
+    def withdraw(self, ticket_id: str) -> bool:
+        """
+        Remove a ticket the committer has not started on
+
+        Returns:
+            True if the ticket will not be committed; False if it is already
+            being committed, finished, or unknown
+        """
+        with self._condition:
+            ticket = self._tickets.get(ticket_id)
+            if ticket is not None:
+                if ticket.status != "pending" or ticket not in self._pending:
+                    return False
+                self._pending.remove(ticket)
+                ticket.status = "withdrawn"
+                self._condition.notify_all()
+                return True
+        return self.spool is not None and self.spool.withdraw(ticket_id)
+
+    def get(self, ticket_id: str) -> Optional[Dict]:
+        """Get the status of a ticket, or None if it is unknown"""
+        with self._condition:
+            ticket = self._tickets.get(ticket_id)
+            if ticket is not None:
+                return ticket.to_dict()
+        # Spooled by this worker, or submitted through another one
+        return self.spool.status(ticket_id) if self.spool is not None else None
+
+    @property
+    def is_committer(self) -> bool:
+        """Whether this process commits, rather than spooling to another worker"""
+        return self.election is None or self.election.is_leader
+
+    @property
+    def depth(self) -> int:
+        """Number of tickets waiting to be committed"""
+        with self._condition:
+            return len(self._pending)
+
+    def flush(self) -> None:
+        """Commit everything that is currently pending, in the calling thread"""
+        with self._condition:
+            batch, self._pending = self._pending, []
+        if batch:
+            self._commit_batch(batch)
+
+    # Internals
+
+    def _remember(self, ticket: CommitTicket) -> None:
+        self._tickets[ticket.id] = ticket
+        while len(self._tickets) > MAX_TICKET_HISTORY:
+            oldest_id, oldest = next(iter(self._tickets.items()))
+            if oldest.status == "pending":
+                break
+            del self._tickets[oldest_id]
+
+    def _pending_file_count(self) -> int:
+        return len({path for ticket in self._pending for path in ticket.paths})
+
+    def _claim_spooled(self) -> None:
+        """Take over tickets other workers spooled, if this process commits"""
+        if self.spool is None or not self.is_committer:
+            return
+        try:
+            spooled = self.spool.claim(recover=self._recover)
+        except OSError as e:
+            logger.error(f"Reading the commit spool failed: {e}")
+            return
+        self._recover = False
+
+        tickets = []
+        push_requested = False
+        for data in spooled:
+            if data["paths"]:
+                tickets.append(CommitTicket.from_spool(data))
+            else:
+                push_requested = True
+                self.spool.finish(data)
+        if push_requested:
+            self.push()
+        if tickets:
+            with self._condition:
+                self._pending.extend(tickets)
+                for ticket in tickets:
+                    self._remember(ticket)
+                self._condition.notify_all()
+
+    def _run(self) -> None:
+        # Without other workers there is nothing to poll for
+        poll = self.poll if self.spool is not None else None
+        while True:
+            self._claim_spooled()
+            with self._condition:
+                if not self._pending and not self._stopping:
+                    self._condition.wait(poll)
+                    if not self._pending and not self._stopping:
+                        continue
+                if not self._pending and self._stopping:
+                    return
+
+                # Gather changes until the window closes, the batch is full or
+                # someone is waiting for the outcome
+                deadline = time.monotonic() + self.window
+                while (
+                    not self._stopping
+                    and self._pending_file_count() < self.max_files
+                    and not any(ticket.urgent for ticket in self._pending)
+                ):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+
+                batch, self._pending = self._pending, []
+
+            try:
+                self._commit_batch(batch)
+            except Exception as e:
+                logger.error(f"Group commit failed: {e}", exc_info=True)
+                self._finish(batch, "failed", f"Git error: {str(e)}")
+
+    def _commit_batch(self, batch: List[CommitTicket]) -> None:
+        paths = list(dict.fromkeys(path for ticket in batch for path in ticket.paths))
+        message = self._combined_message(batch)
+
+        with STAGE_SECONDS.labels("commit").time():
+            if not is_git_repo():
+                self._finish(batch, "failed", "Not a git repository")
+                return
+
+            commit_success, commit_result, commit_id = git_commit_paths(paths, message)
+            if not commit_success:
+                logger.warning(f"Group commit failed: {commit_result}")
+                self._finish(batch, "failed", commit_result)
+                return
+
+        result = commit_result
+        if any(ticket.push for ticket in batch):
+            if self.request_push is not None:
+                self.request_push()
+                result = f"{commit_result}. Push queued"
+            else:
+                push_success, push_msg = git_push()
+                result = f"{commit_result}. {push_msg}" if push_success else f"{commit_result}. Push failed: {push_msg}"
+
+        logger.info(f"Group commit of {len(paths)} file(s) for {len(batch)} change(s): {result}")
+        self._finish(batch, "committed", result, commit_id)
+
+    @staticmethod
+    def _combined_message(batch: List[CommitTicket]) -> str:
+        messages = list(dict.fromkeys(ticket.message for ticket in batch))
+        if len(messages) == 1:
+            return messages[0]
+        files = {path for ticket in batch for path in ticket.paths}
+        summary = f"docs: Update {len(files)} file(s)"
+        return summary + "\n\n" + "\n".join(f"- {message}" for message in messages)
+
+    def _finish(self, batch: List[CommitTicket], status: str, result: str, commit_id: Optional[str] = None) -> None:
+        finished_at = datetime.now().isoformat()
+        with self._condition:
+            for ticket in batch:
+                ticket.status = status
+                ticket.result = result
+                ticket.commit = commit_id
+                ticket.committed_at = finished_at
+            self._condition.notify_all()
+
+        for ticket in batch:
+            if ticket.spooled is not None:
+                try:
+                    self.spool.finish(ticket.spooled, ticket.to_dict())
+                except OSError as e:
+                    logger.error(f"Recording the result of spooled ticket {ticket.id} failed: {e}")
+
+        if self.on_commit is not None:
+            try:
+                self.on_commit({
+                    "status": status,
+                    "commit": commit_id,
+                    "result": result,
+                    "tickets": [ticket.id for ticket in batch],
+                    "paths": list(dict.fromkeys(path for ticket in batch for path in ticket.paths))
+                })
+            except Exception as e:
+                logger.error(f"Commit listener failed: {e}", exc_info=True)
@@ -2,6 +2,7 @@
 Configuration management for Phronidoc editor service
 """
 
+import hashlib
 import os
 from pathlib import Path
 from typing import Optional
@@ -19,9 +20,47 @@ class Settings(BaseSettings):
     git_remote: Optional[str] = None
     git_branch: Optional[str] = None
     
+    # Group commits: seconds to collect saves, and max files per commit
+    commit_window: float = 2.0
+    commit_max_files: int = 50
+    
+    # Push worker retry backoff (seconds)
+    push_retry_base: float = 1.0
+    push_retry_max: float = 300.0
+    
+    # Multi-worker coordination: lock and spool directory (defaults to
+    # .git/phronidoc), and how often the elected committer polls the spool
+    lock_dir: Optional[str] = None
+    committer_poll: float = 0.5
+    
+    # Concurrent blocking operations allowed per resource
+    fs_concurrency: int = 16
+    git_concurrency: int = 4
+    
+    # Directory for persisted indexes (defaults to ~/.cache/phronidoc)
+    cache_dir: Optional[str] = None
+    
+    # Upper bound for cached preview HTML (bytes)
+    render_cache_bytes: int = 32 * 1024 * 1024
+    
+    # Change feed: events kept for resuming clients, and idle keep-alive (seconds)
+    events_history: int = 1000
+    events_keepalive: float = 15.0
+    
+    # Request profiling: token for the X-Profile header, profile every request
+    # (keeping those slower than profile_slow_ms), and profiles kept
+    profile_token: Optional[str] = None
+    profile_requests: bool = False
+    profile_slow_ms: float = 1000.0
+    profile_history: int = 20
+    
     # MkDocs configuration
     mkdocs_config_path: Optional[str] = None
     
+    # Document index watcher: auto, inotify, polling or off
+    docs_watch_mode: str = "auto"
+    docs_watch_interval: float = 2.0
+    
     # Server configuration
     host: str = "0.0.0.0"
     port: int = 8001
@@ -68,6 +107,33 @@ def get_git_repo_path() -> Path:
     return Path(__file__).parent.parent.parent
 
 
+def get_cache_dir() -> Path:
+    """Get the directory for persisted indexes and snapshots"""
+    settings = Settings()
+    
+    if settings.cache_dir:
+        return Path(settings.cache_dir)
+    
+    # Default: per-user cache, outside the git working tree
+    return Path.home() / ".cache" / "phronidoc"
+
+
+def get_lock_dir() -> Path:
+    """Get the directory shared by all workers for locks and queued commits"""
+    settings = Settings()
+    
+    if settings.lock_dir:
+        return Path(settings.lock_dir)
+    
+    # Default: inside the repository's .git directory, so every process
+    # working on the same checkout finds it and it is never committed
+    git_dir = get_git_repo_path() / ".git"
+    if git_dir.is_dir():
+        return git_dir / "phronidoc"
+    key = hashlib.sha1(str(get_git_repo_path().resolve()).encode()).hexdigest()[:12]
+    return get_cache_dir() / "locks" / key
+
+
 def get_settings() -> Settings:
     """Get application settings"""
     return Settings()
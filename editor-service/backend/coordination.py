@@ -0,0 +1,343 @@
+"""
+Coordination between several server processes on one checkout
+
+When the editor runs with several uvicorn workers (or replicas sharing a
+volume), each process has its own threads and locks. The helpers here
+extend them across processes:
+
+- ``InterProcessLock`` is a re-entrant lock backed by ``flock`` on a file
+  in the shared lock directory, used around git index updates, document
+  writes and ``mkdocs.yml`` rewrites.
+- ``LeaderElection`` elects one committer process by holding a lock file
+  for as long as the process lives; if it exits, another worker takes over.
+- ``TicketSpool`` is a directory queue through which the other workers hand
+  commit and push work to the committer and read back the results.
+
+On platforms without ``fcntl`` the locks only serialize threads of the
+current process, which is enough for a single worker.
+"""
+
+import json
+import os
+import threading
+import time
+import logging
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Finished ticket results older than this are removed from the spool
+RESULT_TTL = 3600.0
+
+
+def _open_lock_file(path: Path) -> int:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+
+
+class InterProcessLock:
+    """
+    Re-entrant lock shared by all processes using the same lock file
+
+    Threads of this process are serialized by an RLock; the file lock is
+    taken when the outermost holder acquires and released with it, so
+    nested ``with`` blocks in one thread do not deadlock.
+
+    Args:
+        path: Lock file, created on first use
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._fd: Optional[int] = None
+        self._pid = os.getpid()
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """
+        Acquire the lock
+
+        Args:
+            blocking: Wait for the lock instead of failing immediately
+
+        Returns:
+            True if the lock is now held
+        """
+        if not self._lock.acquire(blocking):
+            return False
+        if self._depth == 0 and fcntl is not None:
+            try:
+                if self._fd is None or self._pid != os.getpid():
+                    # A forked worker must not share the parent's open file,
+                    # or both would hold the same flock
+                    self._fd = _open_lock_file(self.path)
+                    self._pid = os.getpid()
+                flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+                fcntl.flock(self._fd, flags)
+            except BlockingIOError:
+                self._lock.release()
+                return False
+            except BaseException:
+                self._lock.release()
+                raise
+        self._depth += 1
+        return True
+
+    def release(self) -> None:
+        """Release one level of the lock"""
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._lock.release()
+
+    def __enter__(self) -> "InterProcessLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+class LeaderElection:
+    """
+    Elect one process as the committer
+
+    The process that holds an exclusive lock on ``path`` is the leader. The
+    others retry in the background and take over when the leader exits,
+    since the operating system drops its lock with the process.
+
+    Args:
+        path: Lock file shared by all candidate processes
+        interval: Seconds between attempts while not elected
+        on_elected: Called once this process becomes the leader
+    """
+
+    def __init__(self, path: Path, interval: float = 1.0, on_elected: Optional[Callable[[], None]] = None):
+        self.path = Path(path)
+        self.interval = interval
+        self.on_elected = on_elected
+        self._fd: Optional[int] = None
+        self._leader = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_leader(self) -> bool:
+        """Whether this process is currently the committer"""
+        return self._leader
+
+    def start(self) -> None:
+        """Try to become the leader, and keep trying in the background if that fails"""
+        self._stop.clear()
+        if self._try_acquire():
+            return
+        logger.info("Another process is the committer; forwarding commits to it")
+        self._thread = threading.Thread(target=self._run, name="leader-election", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop campaigning and give up leadership"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        self._leader = False
+
+    def _try_acquire(self) -> bool:
+        if fcntl is None:
+            self._leader = True
+        else:
+            if self._fd is None:
+                self._fd = _open_lock_file(self.path)
+            try:
+                fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            os.ftruncate(self._fd, 0)
+            os.write(self._fd, str(os.getpid()).encode())
+            self._leader = True
+
+        logger.info(f"Process {os.getpid()} is the committer")
+        if self.on_elected is not None:
+            try:
+                self.on_elected()
+            except Exception as e:
+                logger.error(f"Election listener failed: {e}", exc_info=True)
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            if self._try_acquire():
+                return
+
+
+class TicketSpool:
+    """
+    Directory queue of commit tickets handed to the committer process
+
+    Tickets are JSON files written atomically into ``queue/``. The committer
+    moves them to ``claimed/`` before working on them, so a ticket of a
+    committer that died is picked up again by the next one, and writes the
+    outcome to ``results/<id>.json`` for any worker to read.
+
+    Args:
+        directory: Spool directory shared by all workers
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.queue_dir = self.directory / "queue"
+        self.claimed_dir = self.directory / "claimed"
+        self.results_dir = self.directory / "results"
+        self._pruned_at = 0.0
+
+    def put(self, ticket: Dict) -> None:
+        """
+        Queue a ticket for the committer
+
+        Args:
+            ticket: JSON-serializable ticket with at least an ``id``
+        """
+        self.queue_dir.mkdir(parents=True, exist_ok=True)
+        name = f"{time.time_ns():020d}-{ticket['id']}.json"
+        self._write(self.queue_dir / name, ticket)
+
+    def claim(self, recover: bool = False) -> List[Dict]:
+        """
+        Take all queued tickets, oldest first
+
+        Args:
+            recover: Also return tickets claimed earlier but never finished,
+                as after a committer restart
+
+        Returns:
+            Tickets, each with its spool file name under ``_file``
+        """
+        tickets = []
+        if recover:
+            tickets.extend(self._load(self.claimed_dir, self._names(self.claimed_dir)))
+
+        names = self._names(self.queue_dir)
+        if names:
+            self.claimed_dir.mkdir(parents=True, exist_ok=True)
+        claimed = []
+        for name in names:
+            try:
+                os.replace(self.queue_dir / name, self.claimed_dir / name)
+            except FileNotFoundError:
+                continue
+            claimed.append(name)
+        tickets.extend(self._load(self.claimed_dir, claimed))
+        return tickets
+
+    def finish(self, ticket: Dict, result: Optional[Dict] = None) -> None:
+        """
+        Record the outcome of a claimed ticket and drop it from the spool
+
+        Args:
+            ticket: Ticket as returned by ``claim``
+            result: Status to publish under the ticket id, if any
+        """
+        if result is not None:
+            self.results_dir.mkdir(parents=True, exist_ok=True)
+            self._write(self.results_dir / f"{ticket['id']}.json", result)
+        try:
+            os.unlink(self.claimed_dir / ticket["_file"])
+        except FileNotFoundError:
+            pass
+        self._prune()
+
+    def withdraw(self, ticket_id: str) -> bool:
+        """
+        Take a ticket back out of the queue before the committer claims it
+
+        Returns:
+            True if the ticket was removed; False if it was already claimed
+            (or never spooled), so its commit may still land
+        """
+        suffix = f"-{ticket_id}.json"
+        for name in self._names(self.queue_dir):
+            if name.endswith(suffix):
+                try:
+                    # Races with the rename in claim: exactly one of them wins
+                    os.unlink(self.queue_dir / name)
+                except FileNotFoundError:
+                    return False
+                return True
+        return False
+
+    def status(self, ticket_id: str) -> Optional[Dict]:
+        """
+        Result of a ticket, or a pending status while it is still spooled
+
+        Returns:
+            Result dictionary, ``{"ticket": id, "status": "pending"}``, or
+            None if the spool does not know the ticket
+        """
+        try:
+            with open(self.results_dir / f"{ticket_id}.json", "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            pass
+        suffix = f"-{ticket_id}.json"
+        for directory in (self.queue_dir, self.claimed_dir):
+            if any(name.endswith(suffix) for name in self._names(directory)):
+                return {"ticket": ticket_id, "status": "pending"}
+        return None
+
+    # Internals
+
+    @staticmethod
+    def _names(directory: Path) -> List[str]:
+        try:
+            return sorted(name for name in os.listdir(directory) if name.endswith(".json"))
+        except FileNotFoundError:
+            return []
+
+    @staticmethod
+    def _load(directory: Path, names: List[str]) -> List[Dict]:
+        tickets = []
+        for name in names:
+            try:
+                with open(directory / name, "r", encoding="utf-8") as f:
+                    ticket = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Dropping unreadable spooled ticket {name}: {e}")
+                try:
+                    os.unlink(directory / name)
+                except OSError:
+                    pass
+                continue
+            ticket["_file"] = name
+            tickets.append(ticket)
+        return tickets
+
+    @staticmethod
+    def _write(path: Path, data: Dict) -> None:
+        tmp_file = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_file, path)
+
+    def _prune(self) -> None:
+        now = time.time()
+        if now - self._pruned_at < 60:
+            return
+        self._pruned_at = now
+        for name in self._names(self.results_dir):
+            path = self.results_dir / name
+            try:
+                if now - path.stat().st_mtime > RESULT_TTL:
+                    path.unlink()
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,91 @@
+"""
+ETag helpers for conditional requests
+
+Document ETags are strong and equal to the git blob id of the file
+content. Listing and structure ETags are weak and derived from index
+generation counters, which are only meaningful within one process, so they
+are prefixed with a per-process boot id.
+"""
+
+import hashlib
+import uuid
+from typing import Optional
+
+from fastapi import Response
+
+# Distinguishes generation counters of different server processes
+BOOT_ID = uuid.uuid4().hex[:8]
+
+
+def git_blob_id(data: bytes) -> str:
+    """
+    Compute the git blob id (SHA-1) of some content
+
+    Args:
+        data: Raw file content
+
+    Returns:
+        Hex blob id, identical to ``git hash-object``
+    """
+    digest = hashlib.sha1()
+    digest.update(b"blob %d\0" % len(data))
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def content_etag(data: bytes) -> str:
+    """Strong ETag for document content"""
+    return f'"{git_blob_id(data)}"'
+
+
+def weak_etag(*parts) -> str:
+    """Weak ETag built from version components"""
+    return 'W/"' + "-".join(str(part) for part in (BOOT_ID, *parts)) + '"'
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    return tag
+
+
+def etag_matches(header: Optional[str], etag: str, weak: bool = True) -> bool:
+    """
+    Check an If-None-Match / If-Match header against an ETag
+
+    Args:
+        header: Header value (comma-separated list or "*")
+        etag: Current ETag of the resource
+        weak: Use weak comparison (If-None-Match); strong comparison
+            (If-Match) never matches weak tags
+
+    Returns:
+        True if any listed tag matches
+    """
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    if not weak and etag.startswith("W/"):
+        return False
+
+    current = _opaque(etag)
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if not weak and candidate.startswith("W/"):
+            continue
+        if _opaque(candidate) == current:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    """Empty 304 response carrying the current ETag"""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+def set_etag(response: Response, etag: str) -> None:
+    """Attach an ETag and ask clients to revalidate before reuse"""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
@@ -0,0 +1,185 @@
+"""
+Change feed for connected editors
+
+Mutations are published as small typed events with increasing sequence
+numbers and kept in a bounded in-memory history. Clients follow the feed
+over Server-Sent Events and resume after a disconnect with the last
+sequence number they saw; if the events they missed have already been
+dropped from the history they are told to reload instead.
+"""
+
+import asyncio
+import json
+import threading
+import time
+import logging
+from collections import deque
+from itertools import islice
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+EVENT_STREAM_MEDIA_TYPE = "text/event-stream"
+
+# Milliseconds an EventSource waits before reconnecting
+RECONNECT_DELAY_MS = 3000
+
+
+class Event:
+    """A published change"""
+
+    __slots__ = ("seq", "type", "data", "time")
+
+    def __init__(self, seq: int, type: str, data: Dict[str, Any]):
+        self.seq = seq
+        self.type = type
+        self.data = data
+        self.time = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"seq": self.seq, "type": self.type, "time": self.time, **self.data}
+
+
+def format_sse(event_type: str, data: Dict[str, Any], seq: Optional[int] = None) -> str:
+    """Encode one Server-Sent Events message"""
+    lines = []
+    if seq is not None:
+        lines.append(f"id: {seq}")
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def parse_types(types: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Parse a comma-separated list of event type prefixes ("document", "commit.landed")"""
+    if not types:
+        return None
+    selected = tuple(item.strip() for item in types.split(",") if item.strip())
+    return selected or None
+
+
+class EventFeed:
+    """
+    Publish change events to any number of streaming subscribers
+
+    ``publish`` may be called from any thread. Sequence numbers start from
+    the wall clock in milliseconds, so they keep increasing across restarts
+    and an id from a previous process is always recognised as too old.
+
+    Args:
+        history: Number of recent events kept for resuming clients
+    """
+
+    def __init__(self, history: int = 1000):
+        self._events: Deque[Event] = deque(maxlen=history)
+        self._seq = time.time_ns() // 1_000_000
+        self._lock = threading.Lock()
+        self._waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+
+    @property
+    def last_sequence(self) -> int:
+        """Sequence number of the most recent event"""
+        return self._seq
+
+    @property
+    def subscribers(self) -> int:
+        """Number of connected streams"""
+        return len(self._waiters)
+
+    def publish(self, event_type: str, **data: Any) -> int:
+        """
+        Append an event and wake all subscribers
+
+        Args:
+            event_type: Dotted event type, e.g. "document.updated"
+            **data: JSON-serializable payload
+
+        Returns:
+            Sequence number of the event
+        """
+        with self._lock:
+            self._seq += 1
+            self._events.append(Event(self._seq, event_type, data))
+            seq = self._seq
+            waiters = list(self._waiters)
+
+        for loop, wakeup in waiters:
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:
+                # The subscriber's event loop is gone
+                with self._lock:
+                    self._waiters.discard((loop, wakeup))
+        return seq
+
+    def since(self, after: int) -> Optional[List[Event]]:
+        """
+        Events published after a sequence number
+
+        Returns:
+            The events in order, or None if some of them are no longer in the
+            history (or the number is not from this feed)
+        """
+        with self._lock:
+            if after > self._seq:
+                return None
+            oldest = self._events[0].seq if self._events else self._seq + 1
+            if after < oldest - 1:
+                return None
+            return list(islice(self._events, after - oldest + 1, None))
+
+    async def stream(
+        self,
+        after: Optional[int] = None,
+        types: Optional[Tuple[str, ...]] = None,
+        keepalive: float = 15.0
+    ) -> AsyncIterator[str]:
+        """
+        Follow the feed as Server-Sent Events
+
+        A new subscriber first gets a ``ready`` event carrying the current
+        sequence number. A resuming subscriber gets everything it missed, or
+        a ``reset`` event if that is no longer possible; it should then
+        reload its state. Comments are sent when idle to keep proxies from
+        closing the connection.
+
+        Args:
+            after: Last sequence number the client has seen
+            types: Only send events whose type starts with one of these
+            keepalive: Seconds of inactivity before a keep-alive comment
+        """
+        wakeup = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), wakeup)
+        with self._lock:
+            self._waiters.add(waiter)
+        try:
+            yield f"retry: {RECONNECT_DELAY_MS}\n\n"
+            if after is None:
+                after = self._seq
+                yield format_sse("ready", {"seq": after}, after)
+
+            while True:
+                # Clear before reading so a publish in between is not missed
+                wakeup.clear()
+                events = self.since(after)
+                if events is None:
+                    after = self._seq
+                    yield format_sse("reset", {"seq": after}, after)
+                    continue
+
+                chunk = []
+                for event in events:
+                    after = event.seq
+                    if types is None or event.type.startswith(types):
+                        chunk.append(format_sse(event.type, event.to_dict(), event.seq))
+                if chunk:
+                    yield "".join(chunk)
+                    continue
+
+                try:
+                    await asyncio.wait_for(wakeup.wait(), keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
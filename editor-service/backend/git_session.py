@@ -0,0 +1,486 @@
+"""
+Long-lived git session for a repository
+
+Resolves the git directory once, reads the current branch straight from
+``HEAD``, caches identity and remotes from ``git config`` until a config
+file changes, and keeps ``git cat-file``, ``hash-object``, ``mktree`` and
+``update-ref --stdin`` processes running so reads, object writes and ref
+updates do not fork a new git process each time.
+"""
+
+import os
+import subprocess
+import tempfile
+import threading
+import time
+import weakref
+import logging
+from pathlib import Path
+from typing import IO, Callable, Dict, List, Optional, Tuple
+
+from metrics import GIT_COMMAND_SECONDS, GIT_TIMEOUTS
+
+logger = logging.getLogger(__name__)
+
+# How long a "not a git repository" answer is trusted before asking git again
+NOT_A_REPO_TTL = 5.0
+
+# Seconds a long-lived git process may take to answer one request
+REQUEST_TIMEOUT = 30.0
+
+
+class GitProcessError(RuntimeError):
+    """A long-lived git process failed or rejected a request"""
+
+
+class BatchProcess:
+    """
+    One long-lived git process spoken to over stdin/stdout
+
+    Requests are serialized; if the process died since the last request it
+    is started again transparently. A request that gets no reply within
+    ``timeout`` seconds kills the process (see ``_Watchdog``), fails, and the
+    next request starts a fresh one. Error output goes to a temporary file
+    rather than a pipe, so a chatty process can never block on a full
+    stderr pipe that nobody reads.
+
+    Args:
+        root: Working directory
+        args: Command line, e.g. ``["git", "cat-file", "--batch"]``
+        timeout: Seconds a request may take before the process is killed
+    """
+
+    def __init__(self, root: Path, args: List[str], timeout: float = REQUEST_TIMEOUT):
+        self.root = root
+        self.args = args
+        self.timeout = timeout
+        self.starts = 0
+        self._process: Optional[subprocess.Popen] = None
+        self._stderr: Optional[IO[bytes]] = None
+        self._lock = threading.Lock()
+        # Set while a request is in flight; read by the watchdog
+        self._deadline: Optional[float] = None
+        self._timed_out = False
+        self._watch_lock = threading.Lock()
+
+    def request(self, data: bytes, reply: Callable[[subprocess.Popen], bytes]) -> bytes:
+        """
+        Send data and read the reply
+
+        Args:
+            data: Bytes to write to stdin
+            reply: Reads the response from the process's stdout
+
+        Raises:
+            GitProcessError: If the process exited or timed out instead of answering
+        """
+        subcommand = self.args[1]
+        with self._lock:
+            started = time.perf_counter()
+            for attempt in range(2):
+                process = self._running()
+                self._deadline = time.monotonic() + self.timeout
+                WATCHDOG.watch(self)
+                try:
+                    process.stdin.write(data)
+                    process.stdin.flush()
+                    result = reply(process)
+                    GIT_COMMAND_SECONDS.labels(subcommand).observe(time.perf_counter() - started)
+                    return result
+                except (BrokenPipeError, EOFError, GitProcessError) as e:
+                    timed_out = self._finish_request()
+                    error = self._reap() or str(e)
+                    if timed_out:
+                        GIT_TIMEOUTS.labels(subcommand).inc()
+                        raise GitProcessError(f"git {subcommand}: no reply within {self.timeout:g}s") from e
+                    # Only a process that was already gone is worth a second try
+                    if attempt or not isinstance(e, BrokenPipeError):
+                        raise GitProcessError(f"git {subcommand}: {error}") from e
+                finally:
+                    self._finish_request()
+
+    def close(self) -> None:
+        """Stop the process"""
+        with self._lock:
+            self._reap()
+
+    def expire(self, now: float) -> None:
+        """Kill the process if the request in flight is past its deadline (watchdog thread)"""
+        with self._watch_lock:
+            if self._deadline is None or now < self._deadline or self._process is None:
+                return
+            self._timed_out = True
+            self._deadline = None
+            logger.warning(f"git {self.args[1]} gave no reply within {self.timeout:g}s, restarting it")
+            try:
+                self._process.kill()
+            except OSError:
+                pass
+
+    def _finish_request(self) -> bool:
+        """Stop the deadline; returns whether the watchdog killed the process"""
+        with self._watch_lock:
+            self._deadline = None
+            timed_out, self._timed_out = self._timed_out, False
+        return timed_out
+
+    def _running(self) -> subprocess.Popen:
+        if self._process is None or self._process.poll() is not None:
+            if self._process is not None:
+                self._reap()
+            self._stderr = tempfile.TemporaryFile()
+            self._process = subprocess.Popen(
+                self.args,
+                cwd=self.root,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=self._stderr
+            )
+            self.starts += 1
+        return self._process
+
+    def _reap(self) -> str:
+        """Wait for a finished or broken process and return its error output"""
+        with self._watch_lock:
+            process, self._process = self._process, None
+        stderr_file, self._stderr = self._stderr, None
+        if process is None:
+            return ""
+        try:
+            # Closes stdin, which ends a healthy batch process
+            process.communicate(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+        try:
+            stderr_file.seek(0)
+            return stderr_file.read().decode("utf-8", "replace").strip()
+        finally:
+            stderr_file.close()
+
+
+class _Watchdog:
+    """
+    Kills batch processes whose request is past its deadline
+
+    One thread serves every ``BatchProcess``, so a request only records its
+    deadline instead of arming a timer of its own. Deadlines are checked
+    every ``interval`` seconds.
+
+    Args:
+        interval: Seconds between checks
+    """
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self._processes: "weakref.WeakSet[BatchProcess]" = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, process: BatchProcess) -> None:
+        """Check the process's deadlines from now on"""
+        if process in self._processes:
+            return
+        with self._lock:
+            self._processes.add(process)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="git-watchdog", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            now = time.monotonic()
+            with self._lock:
+                processes = list(self._processes)
+            for process in processes:
+                process.expire(now)
+
+
+WATCHDOG = _Watchdog()
+
+
+def _readline(process: subprocess.Popen) -> bytes:
+    line = process.stdout.readline()
+    if not line:
+        raise EOFError("git exited")
+    return line
+
+
+class GitSession:
+    """
+    Cached repository facts and long-lived git processes
+
+    Args:
+        root: Repository working tree
+        scratch_dir: Directory for objects handed to git as files
+    """
+
+    def __init__(self, root: Path, scratch_dir: Path):
+        self.root = Path(root)
+        self.scratch_dir = Path(scratch_dir)
+        self._git_dir: Optional[Path] = None
+        self._common_dir: Optional[Path] = None
+        self._not_a_repo_until = 0.0
+        self._config: Optional[Tuple[Tuple, Dict[str, str]]] = None
+        self._lock = threading.Lock()
+        self._cat_file = BatchProcess(self.root, ["git", "cat-file", "--batch"])
+        self._check = BatchProcess(self.root, ["git", "cat-file", "--batch-check"])
+        self._hash_files = BatchProcess(self.root, ["git", "hash-object", "-w", "--stdin-paths"])
+        self._mktree = BatchProcess(self.root, ["git", "mktree", "-z", "--batch"])
+        self._hash_commits = BatchProcess(
+            self.root, ["git", "hash-object", "-w", "-t", "commit", "--stdin-paths", "--no-filters"]
+        )
+        self._hash_raw = BatchProcess(self.root, ["git", "hash-object", "-w", "--stdin-paths", "--no-filters"])
+        self._update_ref = BatchProcess(self.root, ["git", "update-ref", "--stdin", "-m", "commit (editor)"])
+
+    # Repository layout
+
+    @property
+    def git_dir(self) -> Optional[Path]:
+        """Absolute git directory, or None outside a repository"""
+        with self._lock:
+            if self._git_dir is not None and (self._git_dir / "HEAD").exists():
+                return self._git_dir
+            if time.monotonic() < self._not_a_repo_until:
+                return None
+            self._git_dir = self._common_dir = None
+            try:
+                result = subprocess.run(
+                    ["git", "rev-parse", "--absolute-git-dir", "--git-common-dir"],
+                    cwd=self.root, capture_output=True, text=True, timeout=30
+                )
+            except (OSError, subprocess.TimeoutExpired):
+                result = None
+            if result is None or result.returncode != 0:
+                self._not_a_repo_until = time.monotonic() + NOT_A_REPO_TTL
+                return None
+            git_dir, common_dir = result.stdout.splitlines()[:2]
+            self._git_dir = Path(git_dir)
+            self._common_dir = (self.root / common_dir).resolve()
+            return self._git_dir
+
+    def is_repo(self) -> bool:
+        """Whether the root is inside a git repository"""
+        return self.git_dir is not None
+
+    def branch(self) -> Optional[str]:
+        """Checked-out branch name, or None when HEAD is detached"""
+        git_dir = self.git_dir
+        if git_dir is None:
+            return None
+        try:
+            head = (git_dir / "HEAD").read_text(encoding="utf-8").strip()
+        except OSError:
+            return None
+        if head.startswith("ref: refs/heads/"):
+            return head[len("ref: refs/heads/"):]
+        return None
+
+    # Configuration
+
+    def config(self) -> Dict[str, str]:
+        """
+        ``user.*`` and ``remote.*`` settings, re-read when a config file changes
+
+        Returns:
+            Mapping of lower-case keys (e.g. ``user.name``) to values
+        """
+        stamp = self._config_stamp()
+        cached = self._config
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+
+        result = subprocess.run(
+            ["git", "config", "--get-regexp", r"^(user|remote)\."],
+            cwd=self.root, capture_output=True, text=True, timeout=30
+        )
+        values: Dict[str, str] = {}
+        for line in result.stdout.splitlines():
+            key, _, value = line.partition(" ")
+            # Later files (repository config) override earlier ones
+            values[key.lower()] = value
+        self._config = (stamp, values)
+        return values
+
+    def identity(self) -> Tuple[Optional[str], Optional[str]]:
+        """Configured user name and email"""
+        values = self.config()
+        return values.get("user.name"), values.get("user.email")
+
+    def remotes(self) -> Dict[str, str]:
+        """Remote names and their URLs"""
+        return {
+            key[len("remote."):-len(".url")]: value
+            for key, value in self.config().items()
+            if key.startswith("remote.") and key.endswith(".url")
+        }
+
+    def _config_stamp(self) -> Tuple:
+        git_dir = self.git_dir
+        common_dir = self._common_dir or git_dir
+        home = Path.home()
+        xdg = Path(os.environ.get("XDG_CONFIG_HOME") or home / ".config")
+        files = [home / ".gitconfig", xdg / "git" / "config"]
+        if common_dir is not None:
+            files.append(common_dir / "config")
+        if os.environ.get("GIT_CONFIG_GLOBAL"):
+            files.append(Path(os.environ["GIT_CONFIG_GLOBAL"]))
+        stamp = []
+        for path in files:
+            try:
+                info = os.stat(path)
+                stamp.append((info.st_mtime_ns, info.st_size))
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    # Objects
+
+    def resolve(self, revision: str) -> Optional[Tuple[str, str]]:
+        """
+        Object id and type of a revision, e.g. ``HEAD`` or ``HEAD^{tree}``
+
+        Returns:
+            Tuple of (object id, type), or None if it does not resolve
+        """
+        line = self._check.request(revision.encode() + b"\n", _readline).decode().split()
+        if len(line) != 3:
+            return None
+        return line[0], line[1]
+
+    def read_object(self, revision: str) -> Optional[Tuple[str, bytes]]:
+        """
+        Type and raw content of an object
+
+        Returns:
+            Tuple of (type, content), or None if it does not exist
+        """
+        def reply(process: subprocess.Popen) -> bytes:
+            header = _readline(process)
+            parts = header.split()
+            if len(parts) != 3:
+                return header
+            size = int(parts[2])
+            content = process.stdout.read(size + 1)
+            if len(content) != size + 1:
+                raise EOFError("git exited")
+            return header + content[:-1]
+
+        data = self._cat_file.request(revision.encode() + b"\n", reply)
+        header, _, content = data.partition(b"\n")
+        parts = header.decode().split()
+        if len(parts) != 3:
+            return None
+        return parts[1], content
+
+    def read_tree(self, tree_id: str) -> Dict[str, Tuple[str, str]]:
+        """
+        Entries of a tree object
+
+        Returns:
+            Mapping of entry name to (mode, object id)
+        """
+        obj = self.read_object(tree_id)
+        if obj is None or obj[0] != "tree":
+            raise GitProcessError(f"{tree_id} is not a tree")
+        content = obj[1]
+        raw_length = len(tree_id) // 2
+        entries: Dict[str, Tuple[str, str]] = {}
+        position = 0
+        while position < len(content):
+            space = content.index(b" ", position)
+            nul = content.index(b"\0", space)
+            mode = content[position:space].decode()
+            name = content[space + 1:nul].decode("utf-8", "surrogateescape")
+            entries[name] = (mode, content[nul + 1:nul + 1 + raw_length].hex())
+            position = nul + 1 + raw_length
+        return entries
+
+    def hash_files(self, rel_paths: List[str]) -> List[str]:
+        """Write working-tree files (with git's filters applied) as blobs"""
+        if not rel_paths:
+            return []
+        count = len(rel_paths)
+
+        def reply(process: subprocess.Popen) -> bytes:
+            return b"".join(_readline(process) for _ in range(count))
+
+        data = "".join(f"{path}\n" for path in rel_paths).encode("utf-8", "surrogateescape")
+        return self._hash_files.request(data, reply).decode().split()
+
+    def write_tree(self, entries: Dict[str, Tuple[str, str]]) -> str:
+        """
+        Write a tree object
+
+        Args:
+            entries: Mapping of entry name to (mode, object id)
+        """
+        kinds = {"40000": "tree", "160000": "commit"}
+        data = b"".join(
+            f"{mode} {kinds.get(mode, 'blob')} {oid}\t".encode() + name.encode("utf-8", "surrogateescape") + b"\0"
+            for name, (mode, oid) in entries.items()
+        ) + b"\0"
+        return self._mktree.request(data, _readline).decode().strip()
+
+    def write_object(self, content: bytes, kind: str = "blob") -> str:
+        """
+        Write raw content, without filters, as a blob or commit object
+
+        Args:
+            content: Object content
+            kind: ``blob`` or ``commit``
+        """
+        process = self._hash_commits if kind == "commit" else self._hash_raw
+        self.scratch_dir.mkdir(parents=True, exist_ok=True)
+        spool_file = self.scratch_dir / f"object-{os.getpid()}-{threading.get_ident()}"
+        spool_file.write_bytes(content)
+        try:
+            return process.request(f"{spool_file}\n".encode(), _readline).decode().strip()
+        finally:
+            spool_file.unlink(missing_ok=True)
+
+    # Refs
+
+    def update_ref(self, ref: str, new: str, old: str) -> bool:
+        """
+        Move a ref from ``old`` to ``new``, if it still points at ``old``
+
+        Returns:
+            True if the ref was updated, False if it had moved
+
+        Raises:
+            GitProcessError: If the update failed although the ref still
+                points at ``old`` (a stale lock, a full disk, a timeout)
+        """
+        def reply(process: subprocess.Popen) -> bytes:
+            lines = b"".join(_readline(process) for _ in range(3))
+            if lines != b"start: ok\nprepare: ok\ncommit: ok\n":
+                raise GitProcessError(lines.decode().strip())
+            return lines
+
+        try:
+            self._update_ref.request(f"start\nupdate {ref} {new} {old}\nprepare\ncommit\n".encode(), reply)
+        except GitProcessError as e:
+            current = self.resolve(ref)
+            if (current[0] if current else "0" * len(old)) == old:
+                raise
+            logger.info(f"Ref update lost the race: {ref} is no longer at {old}")
+            return False
+        return True
+
+    @property
+    def process_starts(self) -> int:
+        """How many long-lived git processes were started so far"""
+        return sum(process.starts for process in self._processes())
+
+    def close(self) -> None:
+        """Stop all long-lived git processes"""
+        for process in self._processes():
+            process.close()
+
+    def _processes(self) -> List[BatchProcess]:
+        return [
+            self._cat_file, self._check, self._hash_files, self._mktree,
+            self._hash_commits, self._hash_raw, self._update_ref
+        ]
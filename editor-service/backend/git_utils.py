@@ -3,24 +3,54 @@ Git utilities for automatic commits and pushes
 """
 
 import subprocess
+import asyncio
 import os
+import time
+import stat
 from pathlib import Path
-from typing import Optional, Tuple, List
+from typing import Dict, Optional, Tuple, List
 import logging
+from config import get_git_repo_path, get_lock_dir
+from coordination import InterProcessLock
+from git_session import GitProcessError, GitSession
+from metrics import GIT_COMMAND_SECONDS, GIT_FAILURES, GIT_TIMEOUTS, git_subcommand
+from profiling import record_subprocess
 
 logger = logging.getLogger(__name__)
 
-# Repository root (parent of docs directory)
-REPO_ROOT = Path(__file__).parent.parent.parent
+# Repository root (GIT_REPO_PATH, default: parent of docs directory)
+REPO_ROOT = get_git_repo_path()
 
+# Serializes index-mutating git operations across all worker processes
+REPO_LOCK = InterProcessLock(get_lock_dir() / "repo.lock")
 
-def run_git_command(command: list, cwd: Optional[Path] = None) -> Tuple[bool, str, str]:
+# Taken by commits that lost a ref update race, so retries cannot starve
+RETRY_LOCK = InterProcessLock(get_lock_dir() / "commit-retry.lock")
+
+# Cached repository facts and long-lived git processes for this process
+SESSION = GitSession(REPO_ROOT, scratch_dir=get_lock_dir())
+
+
+# Attempts at re-applying a commit after the branch moved underneath it
+COMMIT_ATTEMPTS = 10
+
+NOTHING_TO_COMMIT = "No changes to commit (already committed or no changes)"
+
+
+def run_git_command(
+    command: list,
+    cwd: Optional[Path] = None,
+    input: Optional[str] = None,
+    env: Optional[Dict[str, str]] = None
+) -> Tuple[bool, str, str]:
     """
     Run a git command and return success status, stdout, and stderr
     
     Args:
         command: List of command parts (e.g., ['git', 'add', 'file.md'])
         cwd: Working directory (defaults to repo root)
+        input: Text to feed to the command's stdin
+        env: Extra environment variables for the command
     
     Returns:
         Tuple of (success: bool, stdout: str, stderr: str)
@@ -28,40 +58,110 @@ def run_git_command(command: list, cwd: Optional[Path] = None) -> Tuple[bool, st
     if cwd is None:
         cwd = REPO_ROOT
     
+    subcommand = git_subcommand(command)
+    started = time.perf_counter()
     try:
         result = subprocess.run(
             command,
             cwd=cwd,
+            input=input,
+            env={**os.environ, **env} if env else None,
             capture_output=True,
             text=True,
             check=False,
             timeout=30
         )
         success = result.returncode == 0
+        if not success:
+            GIT_FAILURES.labels(subcommand).inc()
         return success, result.stdout.strip(), result.stderr.strip()
     except subprocess.TimeoutExpired:
         logger.error(f"Git command timed out: {' '.join(command)}")
+        GIT_TIMEOUTS.labels(subcommand).inc()
         return False, "", "Command timed out"
     except Exception as e:
         logger.error(f"Error running git command: {e}")
+        GIT_FAILURES.labels(subcommand).inc()
         return False, "", str(e)
+    finally:
+        elapsed = time.perf_counter() - started
+        GIT_COMMAND_SECONDS.labels(subcommand).observe(elapsed)
+        record_subprocess(command, started, elapsed, blocking=True)
+
+
+async def run_git_command_async(command: list, cwd: Optional[Path] = None, timeout: float = 30) -> Tuple[bool, str, str]:
+    """
+    Run a git command without blocking the event loop
+    
+    The process is killed if the command times out or the awaiting task is
+    cancelled, so an abandoned request does not leave git running.
+    
+    Args:
+        command: List of command parts (e.g., ['git', 'status', '--porcelain'])
+        cwd: Working directory (defaults to repo root)
+        timeout: Seconds before the command is killed
+    
+    Returns:
+        Tuple of (success: bool, stdout: str, stderr: str)
+    """
+    from async_utils import get_limiter
+    
+    if cwd is None:
+        cwd = REPO_ROOT
+    
+    subcommand = git_subcommand(command)
+    async with get_limiter("git"):
+        started = time.perf_counter()
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                cwd=cwd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+        except Exception as e:
+            logger.error(f"Error running git command: {e}")
+            GIT_FAILURES.labels(subcommand).inc()
+            return False, "", str(e)
+        
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            logger.error(f"Git command timed out: {' '.join(command)}")
+            GIT_TIMEOUTS.labels(subcommand).inc()
+            return False, "", "Command timed out"
+        except asyncio.CancelledError:
+            process.kill()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            GIT_COMMAND_SECONDS.labels(subcommand).observe(elapsed)
+            record_subprocess(command, started, elapsed, blocking=False)
+        
+        success = process.returncode == 0
+        if not success:
+            GIT_FAILURES.labels(subcommand).inc()
+        return success, stdout.decode("utf-8", "replace").strip(), stderr.decode("utf-8", "replace").strip()
 
 
 def is_git_repo() -> bool:
     """Check if the current directory is a git repository"""
-    success, _, _ = run_git_command(['git', 'rev-parse', '--git-dir'])
-    return success
+    return SESSION.is_repo()
+
+
+async def is_git_repo_async() -> bool:
+    """Check if the current directory is a git repository, without blocking"""
+    from async_utils import run_git
+    
+    return await run_git(SESSION.is_repo)
 
 
 def get_git_user_info() -> Tuple[Optional[str], Optional[str]]:
     """Get git user name and email from config"""
-    name_success, name, _ = run_git_command(['git', 'config', 'user.name'])
-    email_success, email, _ = run_git_command(['git', 'config', 'user.email'])
-    
-    git_name = name if name_success and name else None
-    git_email = email if email_success and email else None
-    
-    return git_name, git_email
+    name, email = SESSION.identity()
+    return name or None, email or None
 
 
 def git_add(file_path: Path) -> Tuple[bool, str]:
@@ -118,7 +218,7 @@ def git_commit(message: str, author_name: Optional[str] = None, author_email: Op
         # Check if there's nothing to commit
         error_text = (stderr + " " + stdout).lower()
         if "nothing to commit" in error_text or "no changes added to commit" in error_text:
-            return True, "No changes to commit (already committed or no changes)"
+            return True, NOTHING_TO_COMMIT
         # Check if file is already committed
         if "nothing added to commit" in error_text:
             return True, "File already committed"
@@ -139,9 +239,7 @@ def git_push(remote: str = "origin", branch: str = "main") -> Tuple[bool, str]:
     """
     # Try to get current branch if not specified
     if branch == "main":
-        success, current_branch, _ = run_git_command(['git', 'branch', '--show-current'])
-        if success and current_branch:
-            branch = current_branch
+        branch = SESSION.branch() or branch
     
     success, stdout, stderr = run_git_command(['git', 'push', remote, branch])
     
@@ -151,10 +249,391 @@ def git_push(remote: str = "origin", branch: str = "main") -> Tuple[bool, str]:
         return False, f"Failed to push: {stderr}"
 
 
+def git_stage_paths(paths: List[Path]) -> Tuple[bool, str]:
+    """
+    Stage additions, modifications and deletions for a set of paths
+
+    Unlike ``git add -A`` this only touches the given paths, so unrelated
+    working-tree changes are not swept into the commit.
+    
+    Args:
+        paths: Paths to stage (absolute or relative to repo root)
+    
+    Returns:
+        Tuple of (success: bool, message: str)
+    """
+    present = []
+    missing = []
+    for file_path in paths:
+        try:
+            rel_path = file_path.relative_to(REPO_ROOT) if file_path.is_absolute() else file_path
+        except ValueError:
+            rel_path = file_path
+        (present if (REPO_ROOT / rel_path).exists() else missing).append(str(rel_path))
+    
+    if present:
+        success, _, stderr = run_git_command(['git', 'add', '--', *present])
+        if not success:
+            return False, f"Failed to stage files: {stderr}"
+    
+    if missing:
+        success, _, stderr = run_git_command(['git', 'rm', '--cached', '--ignore-unmatch', '-q', '--', *missing])
+        if not success:
+            return False, f"Failed to stage deletions: {stderr}"
+    
+    return True, f"Staged {len(present) + len(missing)} path(s)"
+
+
+def git_unstage_paths(paths: List[Path]) -> Tuple[bool, str]:
+    """
+    Reset the index entries of paths back to HEAD
+    
+    Args:
+        paths: Paths to unstage (absolute or relative to repo root)
+    
+    Returns:
+        Tuple of (success: bool, message: str)
+    """
+    rel_paths = []
+    for file_path in paths:
+        try:
+            rel_paths.append(str(file_path.relative_to(REPO_ROOT) if file_path.is_absolute() else file_path))
+        except ValueError:
+            rel_paths.append(str(file_path))
+    
+    success, _, stderr = run_git_command(['git', 'reset', '-q', '--', *rel_paths])
+    if not success:
+        return False, f"Failed to unstage files: {stderr}"
+    return True, f"Unstaged {len(rel_paths)} path(s)"
+
+
+def git_head() -> Optional[str]:
+    """Get the commit id of HEAD, or None if it cannot be resolved"""
+    resolved = SESSION.resolve("HEAD")
+    return resolved[0] if resolved else None
+
+
+# Plumbing commits
+#
+# Commits are built from objects written through the long-lived processes of
+# the git session: working-tree files become blobs, the trees along the
+# changed paths are rewritten from the parent's trees, and the commit is
+# published with a compare-and-swap ref update. Neither .git/index nor a new
+# git process is involved, so concurrent commits only serialize on the ref
+# update; one that loses the race re-applies its changes on top of the new
+# head. Retries queue behind RETRY_LOCK, so under contention the losers take
+# turns instead of colliding again.
+
+def _repo_relative(file_path: Path) -> str:
+    path = Path(file_path)
+    if path.is_absolute():
+        path = path.relative_to(REPO_ROOT)
+    return path.as_posix()
+
+
+def _file_mode(path: Path) -> Optional[str]:
+    """Git mode of a working-tree file, or None if it is not a file"""
+    try:
+        info = os.lstat(path)
+    except FileNotFoundError:
+        return None
+    if stat.S_ISLNK(info.st_mode):
+        return "120000"
+    if not stat.S_ISREG(info.st_mode):
+        return None
+    return "100755" if info.st_mode & stat.S_IXUSR else "100644"
+
+
+def _expand_paths(rel_paths: List[str]) -> Tuple[List[str], List[str]]:
+    """
+    Split paths into files to write and paths to drop from the tree
+
+    Directories stand for every file below them that git would add, so
+    ignored files are left out, and are dropped first so files deleted from
+    them disappear too.
+    """
+    files = []
+    removed = []
+    directories = []
+    for rel_path in rel_paths:
+        full_path = REPO_ROOT / rel_path
+        if full_path.is_dir() and not full_path.is_symlink():
+            directories.append(rel_path)
+            removed.append(rel_path)
+        elif _file_mode(full_path) is None:
+            removed.append(rel_path)
+        else:
+            files.append(rel_path)
+
+    if directories:
+        success, stdout, _ = run_git_command(
+            ['git', 'ls-files', '-z', '--cached', '--others', '--exclude-standard', '--', *directories]
+        )
+        if success:
+            files.extend(
+                name for name in stdout.split("\0")
+                if name and _file_mode(REPO_ROOT / name) is not None
+            )
+    return list(dict.fromkeys(files)), removed
+
+
+def _write_blobs(rel_paths: List[str]) -> Dict[str, Tuple[str, str]]:
+    """
+    Write working-tree files to the object database
+
+    Returns:
+        Mapping of path to (mode, blob id); files deleted in the meantime
+        are left out
+    """
+    while True:
+        modes = {rel_path: _file_mode(REPO_ROOT / rel_path) for rel_path in rel_paths}
+        files = [rel_path for rel_path, mode in modes.items() if mode in ("100644", "100755")]
+        try:
+            blobs = SESSION.hash_files(files)
+            break
+        except GitProcessError:
+            # A file deleted since it was checked is committed as removed
+            if all(_file_mode(REPO_ROOT / rel_path) for rel_path in files):
+                raise
+            rel_paths = [rel_path for rel_path in rel_paths if _file_mode(REPO_ROOT / rel_path)]
+    entries = {rel_path: (modes[rel_path], blob) for rel_path, blob in zip(files, blobs)}
+    for rel_path, mode in modes.items():
+        if mode == "120000":
+            try:
+                target = os.readlink(REPO_ROOT / rel_path)
+            except FileNotFoundError:
+                continue
+            entries[rel_path] = (mode, SESSION.write_object(os.fsencode(target)))
+    return entries
+
+
+def _split_changes(changes: Dict[str, Optional[Tuple[str, str]]]) -> Tuple[Dict, Dict[str, Dict]]:
+    direct = {}
+    nested: Dict[str, Dict] = {}
+    for rel_path, change in changes.items():
+        head, _, rest = rel_path.partition("/")
+        if rest:
+            nested.setdefault(head, {})[rest] = change
+        else:
+            direct[head] = change
+    return direct, nested
+
+
+def _rewrite_tree(tree_id: Optional[str], changes: Dict[str, Optional[Tuple[str, str]]]) -> Optional[str]:
+    """
+    Apply changes to a tree, writing only the trees along the changed paths
+
+    Args:
+        tree_id: Tree to start from, None for an empty one
+        changes: Path (relative to this tree) to (mode, object id), or None to
+            remove the path
+
+    Returns:
+        Id of the new tree, or None if it ended up empty
+    """
+    entries = SESSION.read_tree(tree_id) if tree_id else {}
+    original = dict(entries)
+    direct, nested = _split_changes(changes)
+
+    # Removals first, so a directory can be replaced by what is below it
+    for name, change in direct.items():
+        if change is None:
+            entries.pop(name, None)
+    for name, change in direct.items():
+        if change is not None:
+            entries[name] = change
+    for name, sub_changes in nested.items():
+        current = entries.get(name)
+        subtree = current[1] if current and current[0] == "40000" else None
+        if subtree is None and all(change is None for change in sub_changes.values()):
+            continue
+        new_subtree = _rewrite_tree(subtree, sub_changes)
+        if new_subtree is None:
+            entries.pop(name, None)
+        else:
+            entries[name] = ("40000", new_subtree)
+
+    if entries == original and tree_id:
+        return tree_id
+    return SESSION.write_tree(entries) if entries else None
+
+
+def _commit_object(tree: str, parent: Optional[str], message: str, env: Dict[str, str]) -> bytes:
+    """Raw commit object, with identities resolved the way git does"""
+    config_name, config_email = SESSION.identity()
+    offset = time.localtime().tm_gmtoff // 60
+    timestamp = f"{int(time.time())} {'+' if offset >= 0 else '-'}{abs(offset) // 60:02d}{abs(offset) % 60:02d}"
+
+    def identity(role: str) -> str:
+        name = env.get(f"GIT_{role}_NAME") or os.environ.get(f"GIT_{role}_NAME") or config_name
+        email = env.get(f"GIT_{role}_EMAIL") or os.environ.get(f"GIT_{role}_EMAIL") or config_email
+        if not name or not email:
+            raise GitProcessError("Author identity unknown: set user.name and user.email")
+        return f"{name} <{email}> {timestamp}"
+
+    lines = [f"tree {tree}"]
+    if parent:
+        lines.append(f"parent {parent}")
+    lines.append(f"author {identity('AUTHOR')}")
+    lines.append(f"committer {identity('COMMITTER')}")
+    body = message if message.endswith("\n") else message + "\n"
+    return ("\n".join(lines) + "\n\n" + body).encode("utf-8")
+
+
+def _index_lines(changes: Dict[str, Optional[Tuple[str, str]]], parent: Optional[str], zero: str) -> List[str]:
+    """update-index --index-info lines that bring the shared index in line with a commit"""
+    lines = []
+    removed = [rel_path for rel_path, change in changes.items() if change is None]
+    if removed and parent:
+        # Removed directories stand for every file below them
+        success, stdout, _ = run_git_command(
+            ['git', 'ls-tree', '-r', '-z', '--name-only', parent, '--', *removed]
+        )
+        if success:
+            lines.extend(
+                f"0 {zero}\t{name}" for name in stdout.split("\0")
+                if name and changes.get(name) is None
+            )
+    lines.extend(
+        f"{change[0]} {change[1]}\t{rel_path}"
+        for rel_path, change in changes.items() if change is not None
+    )
+    return lines
+
+
+def git_commit_paths(
+    paths: List[Path],
+    message: str,
+    author_name: Optional[str] = None,
+    author_email: Optional[str] = None
+) -> Tuple[bool, str, Optional[str]]:
+    """
+    Commit exactly the given paths as they are in the working tree
+
+    Paths that no longer exist are removed from the commit, and a directory
+    stands for everything below it. Nothing else in the working tree or the
+    shared index is included, so unrelated changes are never swept in. The
+    commit is built without touching ``.git/index`` (see "Plumbing commits"
+    above); afterwards the shared index entries of the committed paths are
+    updated so ``git status`` stays clean. Commit hooks are not run.
+    
+    Args:
+        paths: Changed paths (absolute or relative to repo root)
+        message: Commit message
+        author_name: Optional author name (uses git config if not provided)
+        author_email: Optional author email (uses git config if not provided)
+    
+    Returns:
+        Tuple of (success, message, commit id); the commit id is the
+        unchanged head when there was nothing to commit
+    """
+    try:
+        rel_paths = list(dict.fromkeys(_repo_relative(path) for path in paths))
+    except ValueError as e:
+        return False, f"Failed to commit: {e}", None
+
+    env = {}
+    if author_name and author_email:
+        env = {"GIT_AUTHOR_NAME": author_name, "GIT_AUTHOR_EMAIL": author_email}
+
+    try:
+        files, removed = _expand_paths(rel_paths)
+        blobs = _write_blobs(files)
+        changes: Dict[str, Optional[Tuple[str, str]]] = dict.fromkeys(removed + files)
+        changes.update(blobs)
+    except (GitProcessError, OSError) as e:
+        return False, f"Failed to hash files: {e}", None
+
+    def attempt() -> Tuple[Optional[bool], str, Optional[str], Optional[str]]:
+        """One try; a success of None means HEAD moved and it should be retried"""
+        head = SESSION.resolve("HEAD")
+        parent = head[0] if head else None
+        parent_tree = SESSION.resolve(f"{parent}^{{tree}}")[0] if parent else None
+        tree = _rewrite_tree(parent_tree, changes)
+        if tree is None:
+            tree = SESSION.write_tree({})
+        if tree == parent_tree:
+            return True, NOTHING_TO_COMMIT, parent, None
+
+        commit_id = SESSION.write_object(_commit_object(tree, parent, message, env), "commit")
+        if not SESSION.update_ref("HEAD", commit_id, parent or "0" * len(commit_id)):
+            return None, "", None, None
+        return True, f"Committed: {message}", commit_id, parent
+
+    try:
+        result = attempt()
+        if result[0] is None:
+            with RETRY_LOCK:
+                for number in range(1, COMMIT_ATTEMPTS):
+                    logger.info(f"HEAD moved during commit (attempt {number}), re-applying on the new head")
+                    result = attempt()
+                    if result[0] is not None:
+                        break
+    except GitProcessError as e:
+        logger.error(f"Commit failed: {e}")
+        return False, f"Failed to commit: {e}", None
+
+    success, result_message, commit_id, parent = result
+    if success is None:
+        return False, f"Failed to commit: HEAD kept moving after {COMMIT_ATTEMPTS} attempts", None
+    if result_message != NOTHING_TO_COMMIT:
+        _sync_shared_index(_index_lines(changes, parent, "0" * len(commit_id)))
+    return success, result_message, commit_id
+
+
+def _sync_shared_index(lines: List[str]) -> None:
+    """Point the shared index entries of committed paths at the new commit"""
+    if not lines:
+        return
+    with REPO_LOCK:
+        success, _, stderr = run_git_command(
+            ['git', 'update-index', '-q', '--index-info'], input="\n".join(lines) + "\n"
+        )
+    if not success:
+        logger.warning(f"Commit landed but the shared index was not updated: {stderr}")
+
+
+def build_commit_message(file_path: Path, action: str = "update", custom_message: Optional[str] = None) -> str:
+    """
+    Build the default commit message for a single-file change
+    
+    Args:
+        file_path: Path to the file
+        action: Action type ('create', 'update', 'delete')
+        custom_message: Custom commit message (optional)
+    
+    Returns:
+        Commit message
+    """
+    if custom_message:
+        return custom_message
+    
+    try:
+        rel_path = file_path.relative_to(REPO_ROOT)
+    except ValueError:
+        rel_path = file_path
+    
+    action_messages = {
+        "create": f"docs: Add {rel_path}",
+        "update": f"docs: Update {rel_path}",
+        "delete": f"docs: Delete {rel_path}"
+    }
+    return action_messages.get(action, f"docs: {action} {rel_path}")
+
+
 def git_status() -> dict:
     """Get git status information"""
     success, stdout, stderr = run_git_command(['git', 'status', '--porcelain'])
-    
+    return _parse_status(success, stdout, stderr)
+
+
+async def git_status_async() -> dict:
+    """Get git status information, without blocking"""
+    success, stdout, stderr = await run_git_command_async(['git', 'status', '--porcelain'])
+    return _parse_status(success, stdout, stderr)
+
+
+def _parse_status(success: bool, stdout: str, stderr: str) -> dict:
     if not success:
         return {"error": stderr}
     
@@ -175,7 +654,7 @@ def commit_and_push_file(
     push: bool = True
 ) -> Tuple[bool, str]:
     """
-    Stage, commit, and optionally push a file
+    Commit, and optionally push, a created, updated or deleted file
     
     Args:
         file_path: Path to the file
@@ -186,51 +665,7 @@ def commit_and_push_file(
     Returns:
         Tuple of (success: bool, message: str)
     """
-    if not is_git_repo():
-        return False, "Not a git repository"
-    
-    # Get relative path for commit message
-    try:
-        rel_path = file_path.relative_to(REPO_ROOT)
-    except ValueError:
-        rel_path = file_path
-    
-    # Stage the file
-    if action != "delete":
-        add_success, add_msg = git_add(file_path)
-        if not add_success:
-            return False, add_msg
-    else:
-        # For deletes, we need to stage the deletion
-        success, _, stderr = run_git_command(['git', 'rm', str(rel_path)])
-        if not success:
-            return False, f"Failed to stage deletion: {stderr}"
-    
-    # Create commit message
-    if custom_message:
-        commit_msg = custom_message
-    else:
-        action_messages = {
-            "create": f"docs: Add {rel_path}",
-            "update": f"docs: Update {rel_path}",
-            "delete": f"docs: Delete {rel_path}"
-        }
-        commit_msg = action_messages.get(action, f"docs: {action} {rel_path}")
-    
-    # Commit
-    commit_success, commit_msg_result = git_commit(commit_msg)
-    if not commit_success:
-        return False, commit_msg_result
-    
-    # Push if requested
-    if push:
-        push_success, push_msg = git_push()
-        if not push_success:
-            # Commit succeeded but push failed - return partial success
-            return True, f"{commit_msg_result}. Push failed: {push_msg}"
-        return True, f"{commit_msg_result}. {push_msg}"
-    
-    return True, commit_msg_result
+    return commit_multiple_files([file_path], build_commit_message(file_path, action, custom_message), push)
 
 
 def commit_multiple_files(
@@ -239,10 +674,10 @@ def commit_multiple_files(
     push: bool = True
 ) -> Tuple[bool, str]:
     """
-    Stage, commit, and optionally push multiple files
+    Commit, and optionally push, exactly the given files and directories
     
     Args:
-        files: List of file paths to commit
+        files: Paths that were created, updated or deleted
         message: Commit message
         push: Whether to push to remote (default: True)
     
@@ -252,41 +687,7 @@ def commit_multiple_files(
     if not is_git_repo():
         return False, "Not a git repository"
     
-    # Stage all files
-    staged_files = []
-    for file_path in files:
-        if file_path.exists():
-            add_success, add_msg = git_add(file_path)
-            if add_success:
-                staged_files.append(file_path)
-            else:
-                # Log warning but continue - might already be staged
-                logger.warning(f"Failed to stage {file_path}: {add_msg}")
-                # Try to add anyway - might work
-                try:
-                    rel_path = file_path.relative_to(REPO_ROOT)
-                    success, _, _ = run_git_command(['git', 'add', str(rel_path)], cwd=REPO_ROOT)
-                    if success:
-                        staged_files.append(file_path)
-                except:
-                    pass
-        else:
-            # File might have been deleted, use git add -A to stage deletions
-            try:
-                success, _, stderr = run_git_command(['git', 'add', '-A'], cwd=REPO_ROOT)
-                if success:
-                    staged_files.append(file_path)
-            except Exception as e:
-                logger.warning(f"Error staging deleted file {file_path}: {e}")
-    
-    # If no files were staged, try git add -A to catch any changes
-    if not staged_files:
-        success, _, stderr = run_git_command(['git', 'add', '-A'], cwd=REPO_ROOT)
-        if not success:
-            return False, f"No files to commit. Error: {stderr}"
-    
-    # Commit
-    commit_success, commit_msg_result = git_commit(message)
+    commit_success, commit_msg_result, _ = git_commit_paths(files, message)
     if not commit_success:
         return False, commit_msg_result
     
@@ -0,0 +1,566 @@
+"""
+Cross-document link graph
+
+Links and heading anchors are parsed out of every markdown document once and
+kept in forward and reverse maps that are updated from DocumentIndex change
+notifications, so only the documents a write touches are re-read. Broken
+links, missing anchors and backlinks are then answered from the maps without
+reading any files. The graph is persisted like the search index, and the
+reverse maps are rebuilt from the stored links on load.
+"""
+
+import gc
+import re
+import json
+import sqlite3
+import posixpath
+import threading
+import time
+import logging
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterator, List, Match, NamedTuple, Optional, Set, Tuple
+from urllib.parse import unquote
+
+from snapshot_utils import read_snapshot, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Bump when the on-disk format changes
+GRAPH_VERSION = 2
+
+GRAPH_DOCUMENT_COLUMNS = "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime REAL NOT NULL, anchors TEXT NOT NULL"
+GRAPH_LINK_COLUMNS = (
+    "source TEXT NOT NULL, link TEXT NOT NULL, target TEXT NOT NULL, anchor TEXT NOT NULL, line INTEGER NOT NULL"
+)
+
+# (link as written, target document, anchor or "", line number)
+Link = Tuple[str, str, str, int]
+
+# path -> ((size, mtime), anchors, links), as read from a snapshot
+SnapshotDocuments = Dict[str, Tuple[Tuple[int, float], FrozenSet[str], List[Link]]]
+
+FENCE_RE = re.compile(r"^\s*(`{3,}|~{3,})")
+INLINE_CODE_RE = re.compile(r"(`+).+?\1")
+ATX_HEADING_RE = re.compile(r"^ {0,3}#{1,6}(?:\s+(.*?))?(?:\s+#+)?\s*$")
+SETEXT_UNDERLINE_RE = re.compile(r"^ {0,3}(=+|-+)\s*$")
+HEADING_ATTR_RE = re.compile(r"\s*\{:?([^}]*)\}\s*$")
+ATTR_ID_RE = re.compile(r"\{:?[^}]*?#([\w-]+)[^}]*\}")
+HTML_ID_RE = re.compile(r"<[a-zA-Z][^>]*?\s(?:id|name)\s*=\s*[\"']([^\"']+)[\"']")
+INLINE_LINK_RE = re.compile(r"\]\(\s*<?([^\s)>]+)")
+REFERENCE_DEF_RE = re.compile(r"^ {0,3}\[[^\]]+\]:\s*<?([^\s>]+)")
+HTML_HREF_RE = re.compile(r"<a\s[^>]*?href\s*=\s*[\"']([^\"']+)[\"']", re.IGNORECASE)
+SCHEME_RE = re.compile(r"^[a-zA-Z][a-zA-Z0-9+.-]*:")
+IDCOUNT_RE = re.compile(r"^(.*)_([0-9]+)$")
+
+# Heading markup removed before slugifying, as the rendered heading text would be
+HEADING_LINK_RE = re.compile(r"!?\[([^\]]*)\]\([^)]*\)")
+HEADING_TAG_RE = re.compile(r"<[^>]+>")
+HEADING_EMPHASIS_RE = re.compile(r"(\*{1,3}|_{1,3})(?=\S)(.+?)(?<=\S)\1")
+
+
+def slugify(value: str) -> str:
+    """Heading id as generated by the markdown ``toc`` extension"""
+    value = unicodedata.normalize("NFKD", value).encode("ascii", "ignore").decode("ascii")
+    value = re.sub(r"[^\w\s-]", "", value).strip().lower()
+    return re.sub(r"[-\s]+", "-", value)
+
+
+def _unique(anchor: str, anchors: Set[str]) -> str:
+    # toc numbers repeated ids foo, foo_1, foo_2, ...
+    while anchor in anchors or not anchor:
+        match = IDCOUNT_RE.match(anchor)
+        if match:
+            anchor = f"{match.group(1)}_{int(match.group(2)) + 1}"
+        else:
+            anchor = f"{anchor}_1"
+    return anchor
+
+
+def heading_text(text: str) -> str:
+    """Heading source without links, HTML tags and emphasis markers"""
+    text = HEADING_LINK_RE.sub(r"\1", text)
+    text = HEADING_TAG_RE.sub("", text)
+    return HEADING_EMPHASIS_RE.sub(r"\2", text)
+
+
+def heading_anchor(raw: str, anchors: Set[str]) -> str:
+    """
+    Anchor id of a heading, as generated by the markdown ``toc`` extension
+
+    Args:
+        raw: Heading source without the ``#`` markers or setext underline
+        anchors: Ids already used earlier in the document; the new id is added
+
+    Returns:
+        The heading's anchor id
+    """
+    attributes = HEADING_ATTR_RE.search(raw)
+    explicit = None
+    if attributes:
+        raw = raw[:attributes.start()]
+        explicit = ATTR_ID_RE.search("{" + attributes.group(1) + "}")
+    anchor = explicit.group(1) if explicit else _unique(slugify(heading_text(raw)), anchors)
+    anchors.add(anchor)
+    return anchor
+
+
+class MarkdownLine(NamedTuple):
+    """A line outside fenced code blocks, as seen by ``markdown_lines``"""
+
+    number: int
+    text: str
+    # The line without inline code spans
+    code_free: str
+    # ATX heading match on code_free, if the line is one
+    atx: Optional[Match[str]]
+    # The heading text above, if the line is a setext underline
+    setext_of: Optional[str]
+
+
+def markdown_lines(lines: List[str], start: int = 0) -> Iterator[MarkdownLine]:
+    """
+    Lines of a markdown document outside fenced code blocks, with headings recognized
+
+    Shared by the link graph and the metadata extractor, so both agree on
+    which lines are code and which are headings.
+
+    Args:
+        lines: Document lines
+        start: First line to scan, e.g. after the front matter
+
+    Yields:
+        MarkdownLine for every line that is not part of a code fence
+    """
+    fence: Optional[str] = None
+    previous = ""
+    for number in range(start, len(lines)):
+        line = lines[number]
+        marker = FENCE_RE.match(line)
+        if fence is not None:
+            if marker and marker.group(1)[0] == fence[0] and len(marker.group(1)) >= len(fence):
+                fence = None
+            previous = ""
+            continue
+        if marker:
+            fence = marker.group(1)
+            previous = ""
+            continue
+
+        code_free = INLINE_CODE_RE.sub("", line)
+        atx = ATX_HEADING_RE.match(code_free)
+        setext_of = None
+        if not atx and previous.strip() and SETEXT_UNDERLINE_RE.match(line) and not ATX_HEADING_RE.match(previous):
+            setext_of = previous
+        yield MarkdownLine(number, line, code_free, atx, setext_of)
+        previous = line
+
+
+def parse_markdown(text: str) -> Tuple[List[Tuple[str, int]], FrozenSet[str]]:
+    """
+    Links and anchors of a markdown document
+
+    Code blocks, inline code and YAML front matter are skipped.
+
+    Args:
+        text: Document content
+
+    Returns:
+        Tuple of (links as (target as written, line number), anchor ids)
+    """
+    lines = text.splitlines()
+    links: List[Tuple[str, int]] = []
+    anchors: Set[str] = set()
+    start = 0
+    if lines and lines[0].strip() == "---":
+        for number in range(1, len(lines)):
+            if lines[number].strip() in ("---", "..."):
+                start = number + 1
+                break
+
+    for line in markdown_lines(lines, start):
+        if line.atx:
+            heading_anchor(line.atx.group(1) or "", anchors)
+        elif line.setext_of is not None:
+            heading_anchor(INLINE_CODE_RE.sub("", line.setext_of).strip(), anchors)
+        else:
+            anchors.update(ATTR_ID_RE.findall(line.code_free))
+
+        anchors.update(HTML_ID_RE.findall(line.code_free))
+        for pattern in (INLINE_LINK_RE, REFERENCE_DEF_RE, HTML_HREF_RE):
+            for target in pattern.findall(line.code_free):
+                links.append((target, line.number + 1))
+
+    return links, frozenset(anchors)
+
+
+def resolve_link(source: str, target: str) -> Optional[Tuple[str, str]]:
+    """
+    Document and anchor a link points to
+
+    Relative targets resolve against the linking document's directory, a
+    leading ``/`` against the docs directory. Directory links resolve to
+    their ``index.md``.
+
+    Args:
+        source: Path of the linking document, relative to the docs directory
+        target: Link target as written
+
+    Returns:
+        Tuple of (document path, anchor or ""), or None for external links
+        and links to non-markdown files
+    """
+    if SCHEME_RE.match(target) or target.startswith("//") or "{{" in target:
+        return None
+    path, _, anchor = target.partition("#")
+    path = unquote(path.split("?", 1)[0])
+    anchor = unquote(anchor)
+
+    if not path:
+        return source, anchor
+    if path.startswith("/"):
+        joined = path.lstrip("/")
+    else:
+        joined = posixpath.join(posixpath.dirname(source), path)
+    normalized = posixpath.normpath(joined) if joined else "."
+
+    extension = posixpath.splitext(posixpath.basename(normalized))[1]
+    if path.endswith("/") or not extension:
+        document = "index.md" if normalized == "." else f"{normalized}/index.md"
+    elif extension == ".md":
+        document = normalized
+    else:
+        return None
+    return document, anchor
+
+
+class LinkGraph:
+    """
+    Links between the markdown documents in DOCS_DIR
+
+    Args:
+        docs_dir: Base docs directory
+        graph_file: Where to persist the graph (None disables persistence)
+    """
+
+    def __init__(self, docs_dir: Path, graph_file: Optional[Path] = None):
+        self.docs_dir = Path(docs_dir)
+        self.graph_file = graph_file
+        self.ready = False
+        self.generation = 0
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._report: Optional[Tuple[int, Dict[str, Any]]] = None
+        self._stamps: Dict[str, Tuple[int, float]] = {}
+        self._links: Dict[str, Tuple[Link, ...]] = {}
+        self._anchors: Dict[str, FrozenSet[str]] = {}
+        # target -> {source: number of links}
+        self._inbound: Dict[str, Dict[str, int]] = {}
+        # target -> {anchor: {source: number of links}}
+        self._anchor_refs: Dict[str, Dict[str, Dict[str, int]]] = {}
+
+    # Maintenance
+
+    def index_document(self, rel_path: str, text: str, stamp: Tuple[int, float]) -> None:
+        """
+        Add or replace a document's links and anchors
+
+        Args:
+            rel_path: Path relative to the docs directory
+            text: Document content
+            stamp: (size, mtime) of the file when it was read
+        """
+        raw_links, anchors = parse_markdown(text)
+        links = []
+        for raw, line in raw_links:
+            resolved = resolve_link(rel_path, raw)
+            if resolved is not None:
+                links.append((raw, resolved[0], resolved[1], line))
+
+        with self._lock:
+            current = self._stamps.get(rel_path)
+            if current is not None and current[1] > stamp[1]:
+                # A newer version was indexed concurrently
+                return
+            self._remove(rel_path)
+            self._add(rel_path, tuple(links), anchors, stamp)
+            self._changed()
+
+    def remove_document(self, rel_path: str) -> None:
+        """Remove a document from the graph"""
+        with self._lock:
+            if self._remove(rel_path):
+                self._changed()
+
+    def refresh(self, rel_path: str) -> None:
+        """Re-read a document from disk, or drop it if it no longer exists"""
+        full_path = self.docs_dir / rel_path
+        try:
+            stat = full_path.stat()
+            text = full_path.read_text(encoding="utf-8", errors="replace")
+        except OSError:
+            self.remove_document(rel_path)
+            return
+        self.index_document(rel_path, text, (stat.st_size, stat.st_mtime))
+
+    def on_documents_changed(self, changed: List[str], removed: List[str], created: List[str]) -> None:
+        """DocumentIndex listener"""
+        for rel_path in removed:
+            self.remove_document(rel_path)
+        for rel_path in changed:
+            self.refresh(rel_path)
+
+    def sync(self, snapshot: Dict[str, Tuple[int, float]]) -> Tuple[int, int]:
+        """
+        Bring the graph in line with the current document set
+
+        Only documents whose (size, mtime) differ from the parsed version
+        are re-read.
+
+        Args:
+            snapshot: (size, mtime) per document, from DocumentIndex.snapshot
+
+        Returns:
+            Tuple of (documents re-parsed, documents removed)
+        """
+        with self._lock:
+            stale = [path for path in self._stamps if path not in snapshot]
+        for rel_path in stale:
+            self.remove_document(rel_path)
+
+        reparsed = 0
+        for rel_path, stamp in snapshot.items():
+            if self._stamps.get(rel_path) != stamp:
+                self.refresh(rel_path)
+                reparsed += 1
+
+        self.ready = True
+        return reparsed, len(stale)
+
+    # Queries
+
+    def check(self) -> Dict[str, Any]:
+        """
+        Broken links and missing anchors across all documents
+
+        Computed per distinct link target from the reverse maps and reused
+        until the graph changes.
+
+        Returns:
+            Dictionary with ``broken`` (links to documents that do not exist)
+            and ``missing_anchors`` (links to anchors a document does not
+            have), each a list of ``source``, ``line``, ``link``, ``target``
+            (and ``anchor``) entries
+        """
+        with self._lock:
+            if self._report is not None and self._report[0] == self.generation:
+                return self._report[1]
+
+            started = time.perf_counter()
+            broken_targets = {target for target in self._inbound if target not in self._stamps}
+            missing_refs: Dict[Tuple[str, str], Set[str]] = {}
+            for target, refs in self._anchor_refs.items():
+                anchors = self._anchors.get(target)
+                if anchors is None:
+                    continue
+                for anchor, sources in refs.items():
+                    if anchor not in anchors:
+                        missing_refs[(target, anchor)] = set(sources)
+
+            broken = []
+            for target in broken_targets:
+                for source in self._inbound[target]:
+                    for raw, link_target, anchor, line in self._links[source]:
+                        if link_target == target:
+                            broken.append({"source": source, "line": line, "link": raw, "target": target})
+
+            missing_anchors = []
+            for (target, anchor), sources in missing_refs.items():
+                for source in sources:
+                    for raw, link_target, link_anchor, line in self._links[source]:
+                        if link_target == target and link_anchor == anchor:
+                            missing_anchors.append({
+                                "source": source, "line": line, "link": raw,
+                                "target": target, "anchor": anchor
+                            })
+
+            order = lambda entry: (entry["source"], entry["line"])
+            report = {
+                "ready": self.ready,
+                "documents": len(self._stamps),
+                "links": sum(sum(sources.values()) for sources in self._inbound.values()),
+                "broken": sorted(broken, key=order),
+                "missing_anchors": sorted(missing_anchors, key=order),
+                "took_ms": round((time.perf_counter() - started) * 1000, 2)
+            }
+            self._report = (self.generation, report)
+            return report
+
+    def page(self, rel_path: str) -> Optional[Dict[str, Any]]:
+        """
+        Anchors, outgoing links and backlinks of one document
+
+        Args:
+            rel_path: Path relative to the docs directory
+
+        Returns:
+            Dictionary with ``anchors``, ``links`` (each with a ``status`` of
+            ``ok``, ``broken`` or ``missing_anchor``) and ``backlinks``, or
+            None if the document is neither indexed nor linked to
+        """
+        with self._lock:
+            exists = rel_path in self._stamps
+            if not exists and rel_path not in self._inbound:
+                return None
+
+            links = []
+            for raw, target, anchor, line in self._links.get(rel_path, ()):
+                if target not in self._stamps:
+                    status = "broken"
+                elif anchor and anchor not in self._anchors.get(target, ()):
+                    status = "missing_anchor"
+                else:
+                    status = "ok"
+                links.append({"link": raw, "target": target, "anchor": anchor or None, "line": line, "status": status})
+
+            backlinks = []
+            for source in sorted(self._inbound.get(rel_path, ())):
+                if source == rel_path:
+                    continue
+                for raw, target, anchor, line in self._links[source]:
+                    if target == rel_path:
+                        backlinks.append({"source": source, "line": line, "link": raw, "anchor": anchor or None})
+
+            return {
+                "path": rel_path,
+                "exists": exists,
+                "ready": self.ready,
+                "anchors": sorted(self._anchors.get(rel_path, ())),
+                "links": links,
+                "backlinks": backlinks
+            }
+
+    def __len__(self) -> int:
+        return len(self._stamps)
+
+    # Persistence
+
+    def save(self) -> bool:
+        """Write the graph to disk if it changed since the last save"""
+        if self.graph_file is None or not self._dirty:
+            return False
+        with self._lock:
+            documents = [
+                (path, size, mtime, json.dumps(sorted(self._anchors[path])))
+                for path, (size, mtime) in self._stamps.items()
+            ]
+            links = [
+                (source, raw, target, anchor, line)
+                for source, source_links in self._links.items()
+                for raw, target, anchor, line in source_links
+            ]
+            self._dirty = False
+
+        try:
+            write_snapshot(self.graph_file, self._snapshot_header(), {
+                "documents": (GRAPH_DOCUMENT_COLUMNS, documents),
+                "links": (GRAPH_LINK_COLUMNS, links)
+            })
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Could not save link graph: {e}")
+            self._dirty = True
+            return False
+        logger.info(f"Link graph saved: {len(documents)} documents")
+        return True
+
+    def load(self) -> bool:
+        """Load a previously saved graph; returns False if none was usable"""
+        if self.graph_file is None:
+            return False
+        # As for the document index snapshot: every link becomes a few small
+        # objects that stay alive, so cyclic collections would only cost time
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            state = read_snapshot(self.graph_file, self._snapshot_header(), self._read_snapshot, "link graph")
+            if state is None:
+                return False
+            with self._lock:
+                self._stamps, self._links, self._anchors = {}, {}, {}
+                self._inbound, self._anchor_refs = {}, {}
+                for path, (stamp, anchors, links) in state.items():
+                    self._add(path, tuple(links), anchors, stamp)
+                self._changed()
+                self._dirty = False
+        finally:
+            if gc_enabled:
+                gc.enable()
+        logger.info(f"Link graph loaded: {len(self._stamps)} documents")
+        return True
+
+    def _snapshot_header(self) -> Dict[str, str]:
+        return {
+            "format": "link-graph",
+            "version": str(GRAPH_VERSION),
+            "docs_dir": str(self.docs_dir.resolve())
+        }
+
+    @staticmethod
+    def _read_snapshot(connection: sqlite3.Connection) -> SnapshotDocuments:
+        documents: SnapshotDocuments = {}
+        for path, size, mtime, anchors in connection.execute("SELECT * FROM documents"):
+            anchors = json.loads(anchors)
+            if (
+                not isinstance(path, str) or not isinstance(size, int) or not isinstance(mtime, float)
+                or not isinstance(anchors, list) or not all(isinstance(anchor, str) for anchor in anchors)
+            ):
+                raise TypeError(f"document {path!r} has columns of unexpected types")
+            documents[path] = ((size, mtime), frozenset(anchors), [])
+        for source, raw, target, anchor, line in connection.execute("SELECT * FROM links ORDER BY rowid"):
+            if (
+                not isinstance(raw, str) or not isinstance(target, str) or not isinstance(anchor, str)
+                or not isinstance(line, int)
+            ):
+                raise TypeError(f"link {raw!r} of {source!r} has columns of unexpected types")
+            # KeyError for links of a document that is not in the snapshot
+            documents[source][2].append((raw, target, anchor, line))
+        return documents
+
+    # Internals
+
+    def _add(self, rel_path: str, links: Tuple[Link, ...], anchors: FrozenSet[str], stamp: Tuple[int, float]) -> None:
+        self._links[rel_path] = links
+        self._anchors[rel_path] = anchors
+        self._stamps[rel_path] = stamp
+        for _, target, anchor, _ in links:
+            sources = self._inbound.setdefault(target, {})
+            sources[rel_path] = sources.get(rel_path, 0) + 1
+            if anchor:
+                refs = self._anchor_refs.setdefault(target, {}).setdefault(anchor, {})
+                refs[rel_path] = refs.get(rel_path, 0) + 1
+
+    def _changed(self) -> None:
+        self.generation += 1
+        self._dirty = True
+
+    def _remove(self, rel_path: str) -> bool:
+        if rel_path not in self._stamps:
+            return False
+        for _, target, anchor, _ in self._links.pop(rel_path, ()):
+            sources = self._inbound.get(target)
+            if sources is not None and rel_path in sources:
+                del sources[rel_path]
+                if not sources:
+                    del self._inbound[target]
+            if anchor:
+                refs = self._anchor_refs.get(target, {})
+                anchor_sources = refs.get(anchor)
+                if anchor_sources is not None and rel_path in anchor_sources:
+                    del anchor_sources[rel_path]
+                    if not anchor_sources:
+                        del refs[anchor]
+                    if not refs:
+                        self._anchor_refs.pop(target, None)
+        self._anchors.pop(rel_path, None)
+        self._stamps.pop(rel_path, None)
+        return True
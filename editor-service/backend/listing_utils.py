@@ -0,0 +1,111 @@
+"""
+Pagination, field selection and NDJSON streaming for listing endpoints
+
+Listings are paged by an opaque cursor that encodes the last path returned,
+so every page is a seek into the document tree rather than a slice of a
+materialized list.
+"""
+
+import base64
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Rows fetched from the index per step while streaming
+STREAM_CHUNK_SIZE = 500
+
+DOCUMENT_FIELDS = (
+    "path", "name", "directory", "size", "last_modified", "title", "word_count", "reading_time",
+    "outline", "frontmatter"
+)
+DIRECTORY_FIELDS = ("path", "name")
+
+
+def encode_cursor(path: str) -> str:
+    """Opaque cursor for the row after ``path``"""
+    return base64.urlsafe_b64encode(path.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[str]:
+    """
+    Decode a cursor from a previous page
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed
+    """
+    if not cursor:
+        return None
+    try:
+        # Validated, so stray characters are an error rather than silently dropped
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return base64.b64decode(padded, altchars=b"-_", validate=True).decode("utf-8")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def parse_fields(fields: Optional[str], allowed: tuple) -> Optional[List[str]]:
+    """
+    Parse a comma-separated ``fields`` parameter
+
+    Raises:
+        HTTPException: 400 if an unknown field is requested
+    """
+    if not fields:
+        return None
+    selected = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in selected if field not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(allowed)}"
+        )
+    return selected
+
+
+def project(rows: List[Dict[str, Any]], fields: Optional[List[str]]) -> List[Dict[str, Any]]:
+    """Reduce rows to the selected fields"""
+    if fields is None:
+        return rows
+    return [{field: row[field] for field in fields} for row in rows]
+
+
+def wants_ndjson(accept: Optional[str], format: Optional[str]) -> bool:
+    """Whether the client asked for an NDJSON stream"""
+    if format:
+        return format == "ndjson"
+    return bool(accept) and NDJSON_MEDIA_TYPE in accept
+
+
+async def ndjson_rows(
+    fetch: Callable[[Optional[str], int], Awaitable[List[Dict[str, Any]]]],
+    after: Optional[str],
+    fields: Optional[List[str]],
+    limit: Optional[int] = None
+) -> AsyncIterator[bytes]:
+    """
+    Stream rows as newline-delimited JSON, one index page at a time
+
+    Only one chunk of rows is held in memory at any point, however large
+    the listing is.
+
+    Args:
+        fetch: Coroutine returning up to N rows after a path
+        after: Path to start after
+        fields: Selected fields, or None for all
+        limit: Maximum number of rows to stream
+    """
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = STREAM_CHUNK_SIZE if remaining is None else min(STREAM_CHUNK_SIZE, remaining)
+        rows = await fetch(after, size)
+        if not rows:
+            return
+        after = rows[-1]["path"]
+        yield "".join(json.dumps(row) + "\n" for row in project(rows, fields)).encode("utf-8")
+        if remaining is not None:
+            remaining -= len(rows)
+        if len(rows) < size:
+            return
@@ -3,27 +3,58 @@ Phronidoc Documentation Editor Service
 Backend API for editing and creating documentation
 """
 
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Header, Response, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 import os
+import sys
 import json
+import gzip
+import hashlib
+import hmac
+import threading
 from pathlib import Path
 from datetime import datetime
 import logging
-from git_utils import commit_and_push_file, is_git_repo, git_status, commit_multiple_files
+from git_utils import (
+    is_git_repo_async, git_status_async,
+    build_commit_message, REPO_ROOT, SESSION as git_session
+)
+from async_utils import run_fs, run_git
+from commit_queue import CommitQueue
+from coordination import InterProcessLock, LeaderElection, TicketSpool
+from push_worker import PushWorker
 from section_utils import (
-    create_section, create_subsection, get_section_structure,
+    create_section, create_subsection,
     delete_section, DOCS_DIR as SECTION_DOCS_DIR
 )
 from mkdocs_utils import (
     read_navigation, add_section_to_nav, add_subsection_to_nav,
     remove_section_from_nav, remove_subsection_from_nav,
-    validate_navigation
+    validate_navigation, config_cache
+)
+from etag_utils import content_etag, weak_etag, etag_matches, not_modified, set_etag
+from document_index import DocumentIndex, DocumentWatcher, QueuedListener, scan_tree
+from metadata_utils import extract_metadata
+from search_index import SearchIndex, default_index_file
+from link_graph import LinkGraph
+from render_utils import MarkdownRenderer
+from patch_utils import (
+    PatchError, apply_line_edits, diff_to_edits, line_ending, split_lines, with_line_ending, write_changed_suffix
+)
+from batch_utils import BatchError, BatchTransaction, run_batch
+from listing_utils import (
+    NDJSON_MEDIA_TYPE, DOCUMENT_FIELDS, DIRECTORY_FIELDS,
+    encode_cursor, decode_cursor, parse_fields, project, wants_ndjson, ndjson_rows
 )
-from config import get_docs_dir, get_mkdocs_config_path, get_settings
+from event_feed import EVENT_STREAM_MEDIA_TYPE, EventFeed, parse_types
+from metrics import (
+    METRICS_MEDIA_TYPE, REGISTRY, STAGE_SECONDS, Counter, Gauge, Histogram, MetricsMiddleware
+)
+from profiling import PSTATS_MEDIA_TYPE, ProfileStore, ProfilingMiddleware
+from config import get_docs_dir, get_mkdocs_config_path, get_settings, get_cache_dir, get_lock_dir
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -42,12 +73,181 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-Profile-Id"],
 )
 
 # Base directory for documentation (from config or default)
 DOCS_DIR = get_docs_dir()
 MKDOCS_CONFIG = get_mkdocs_config_path()
 
+# In-memory index of the docs tree and document metadata, kept current by the
+# watcher and write paths and snapshotted to the cache directory for fast restarts
+document_index = DocumentIndex(
+    DOCS_DIR,
+    default_index_file(get_cache_dir(), DOCS_DIR, name="documents"),
+    extractor=extract_metadata
+)
+document_watcher = DocumentWatcher(
+    document_index,
+    mode=settings.docs_watch_mode,
+    interval=settings.docs_watch_interval
+)
+
+# Full-text search, fed by document index change notifications
+search_index = SearchIndex(DOCS_DIR, default_index_file(get_cache_dir(), DOCS_DIR))
+
+# Links and anchors between documents, fed the same way
+link_graph = LinkGraph(DOCS_DIR, default_index_file(get_cache_dir(), DOCS_DIR, name="links"))
+
+# Both re-read changed documents on their own threads, off the request path
+search_updates = QueuedListener(search_index.on_documents_changed, "search-index-updates")
+link_updates = QueuedListener(link_graph.on_documents_changed, "link-graph-updates")
+
+# Preview renderer using the mkdocs.yml markdown extensions
+markdown_renderer = MarkdownRenderer(MKDOCS_CONFIG, DOCS_DIR, cache_bytes=settings.render_cache_bytes)
+
+# Serializes If-Match checks with the writes they guard, across all workers
+document_write_lock = InterProcessLock(get_lock_dir() / "documents.lock")
+
+# Last /api/bootstrap body and its gzip encoding, reused while the ETag holds
+bootstrap_cache: Dict[str, Any] = {}
+
+# Change events for connected editors (GET /api/events)
+event_feed = EventFeed(history=settings.events_history)
+
+# More document changes than this in one index update are sent as one event
+EVENT_BULK_LIMIT = 100
+
+
+def feed_path(path: Path) -> str:
+    """Path for change events: relative to the docs directory, else to the repository"""
+    for base in (DOCS_DIR, REPO_ROOT):
+        try:
+            return Path(path).relative_to(base).as_posix()
+        except ValueError:
+            continue
+    return Path(path).name
+
+
+def publish_document_changes(changed: List[str], removed: List[str], created: List[str]) -> None:
+    """DocumentIndex listener feeding the change feed"""
+    if len(changed) + len(removed) > EVENT_BULK_LIMIT:
+        event_feed.publish("documents.changed", changed=len(changed), removed=len(removed))
+        return
+    for rel_path in removed:
+        event_feed.publish("document.deleted", path=rel_path)
+    created_paths = set(created)
+    for rel_path in changed:
+        event_type = "document.created" if rel_path in created_paths else "document.updated"
+        event_feed.publish(event_type, path=rel_path, etag=document_index.get_etag(rel_path))
+
+
+def publish_navigation_change() -> None:
+    """Announce a mkdocs.yml navigation change"""
+    try:
+        etag = navigation_etag()
+    except OSError:
+        etag = None
+    event_feed.publish("navigation.changed", etag=etag)
+
+
+def publish_commit(
+    status: str,
+    result: str,
+    commit: Optional[str] = None,
+    tickets: Optional[List[str]] = None,
+    paths: Optional[List[Path]] = None
+) -> None:
+    """Announce a commit attempt (also the CommitQueue listener)"""
+    event_feed.publish(
+        "commit.landed" if status == "committed" else "commit.failed",
+        commit=commit,
+        message=result,
+        tickets=tickets or [],
+        paths=[feed_path(path) for path in paths or []]
+    )
+
+
+def publish_push(result: Dict) -> None:
+    """PushWorker listener feeding the change feed"""
+    event_feed.publish("push.completed", **result)
+
+
+# Background worker that coalesces pushes to the remote
+push_worker = PushWorker(
+    remote=settings.git_remote or "origin",
+    branch=settings.git_branch or "main",
+    retry_base=settings.push_retry_base,
+    retry_max=settings.push_retry_max,
+    on_result=publish_push
+)
+
+# One worker process is elected to commit and push for all of them
+committer_election = LeaderElection(get_lock_dir() / "committer.lock")
+
+# Background committer that groups document saves into combined commits
+commit_queue = CommitQueue(
+    window=settings.commit_window,
+    max_files=settings.commit_max_files,
+    request_push=push_worker.request_push,
+    on_commit=lambda summary: publish_commit(**summary),
+    election=committer_election,
+    spool=TicketSpool(get_lock_dir() / "spool"),
+    poll=settings.committer_poll
+)
+
+
+def hit_ratio(hits: int, misses: int) -> float:
+    """Share of cache lookups that were hits (0 before the first lookup)"""
+    return hits / (hits + misses) if hits + misses else 0.0
+
+
+# Request latency per route, and gauges read from the components at scrape time
+REQUEST_SECONDS = Histogram(
+    "phronidoc_http_request_seconds",
+    "Duration of HTTP requests by route",
+    ["method", "route", "status"]
+)
+app.add_middleware(MetricsMiddleware, histogram=REQUEST_SECONDS, untimed=("/api/events", "/metrics"))
+
+Gauge("phronidoc_commit_queue_depth", "Changes waiting for the background committer",
+      function=lambda: commit_queue.depth)
+Gauge("phronidoc_push_queue_depth", "Push requests not yet covered by a successful push",
+      function=lambda: push_worker.status()["queue_depth"])
+Gauge("phronidoc_event_subscribers", "Connected /api/events streams",
+      function=lambda: event_feed.subscribers)
+Gauge("phronidoc_documents", "Markdown documents in the document index",
+      function=lambda: len(document_index))
+Gauge("phronidoc_render_cache_bytes", "Size of the rendered HTML cache",
+      function=lambda: markdown_renderer.stats()["bytes"])
+Gauge("phronidoc_render_cache_hit_ratio", "Share of preview renders served from the cache",
+      function=lambda: hit_ratio(markdown_renderer.hits, markdown_renderer.misses))
+Gauge("phronidoc_config_cache_hit_ratio", "Share of mkdocs.yml reads served without parsing",
+      function=lambda: hit_ratio(config_cache.hits, config_cache.misses))
+Counter("phronidoc_pushes_total", "Successful pushes",
+        function=lambda: push_worker.status()["total_pushes"])
+Counter("phronidoc_git_session_processes_total", "Long-lived git processes started by the git session",
+        function=lambda: git_session.process_starts)
+
+# Profiles of requests sent with X-Profile, or of slow requests when profiling all
+profile_store = ProfileStore(history=settings.profile_history)
+app.add_middleware(
+    ProfilingMiddleware,
+    store=profile_store,
+    token=settings.profile_token,
+    profile_all=settings.profile_requests,
+    slow=settings.profile_slow_ms / 1000,
+    skip=("/api/events", "/api/profiles")
+)
+
+
+def require_profile_access(x_profile: Optional[str] = Header(None)) -> None:
+    """Profiles expose internals; with a token configured they need the X-Profile header"""
+    if not settings.profile_token and not settings.profile_requests:
+        raise HTTPException(status_code=404, detail="Request profiling is not enabled")
+    if settings.profile_token and not hmac.compare_digest(x_profile or "", settings.profile_token):
+        raise HTTPException(status_code=403, detail="Access denied")
+
 
 class DocumentCreate(BaseModel):
     path: str  # e.g., "engineering/new-page.md"
@@ -64,6 +264,20 @@ class DocumentUpdate(BaseModel):
     push: bool = True  # Whether to push to remote
 
 
+class LineEdit(BaseModel):
+    start: int  # First replaced line of the base (0-based)
+    end: int  # Line after the last replaced line (start for a pure insert)
+    text: str  # Replacement, including line endings
+
+
+class DocumentPatch(BaseModel):
+    base_etag: Optional[str] = None  # ETag the patch was made against (or send If-Match)
+    edits: Optional[List[LineEdit]] = None
+    diff: Optional[str] = None  # Unified diff against the base, instead of edits
+    commit_message: Optional[str] = None
+    push: bool = True
+
+
 class DocumentInfo(BaseModel):
     path: str
     title: Optional[str] = None
@@ -71,6 +285,39 @@ class DocumentInfo(BaseModel):
     last_modified: Optional[str] = None
     git_status: Optional[str] = None
     git_error: Optional[bool] = None
+    commit_ticket: Optional[str] = None
+
+
+class BatchOperation(BaseModel):
+    op: str  # create, update, delete, move, create_section, create_subsection, delete_section
+    path: Optional[str] = None
+    to: Optional[str] = None  # Destination of a move
+    content: Optional[str] = None
+    if_match: Optional[str] = None  # Expected ETag for updates
+    name: Optional[str] = None  # Section or sub-section name
+    section: Optional[str] = None  # Parent section of a new sub-section
+
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation]
+    navigation: Optional[List[Any]] = None  # Replacement navigation, applied last
+    commit_message: Optional[str] = None
+    push: bool = True
+
+
+class RenderRequest(BaseModel):
+    content: str
+
+
+class DocumentSaved(BaseModel):
+    """Response to a write with ``Prefer: return=minimal``"""
+    path: str
+    etag: str
+    last_modified: Optional[str] = None
+    git_status: Optional[str] = None
+    git_error: Optional[bool] = None
+    commit_ticket: Optional[str] = None
+    bytes_written: Optional[int] = None
 
 
 class SectionCreate(BaseModel):
@@ -85,6 +332,135 @@ class SubsectionCreate(BaseModel):
     push: bool = True
 
 
+@app.on_event("startup")
+async def start_document_index():
+    """Load or build the document index and start watching the docs directory"""
+    loaded = await run_fs(document_index.load)
+    if not loaded:
+        await run_fs(document_index.build)
+    await run_fs(search_index.load)
+    await run_fs(link_graph.load)
+    document_index.add_listener(search_updates)
+    document_index.add_listener(link_updates)
+    search_updates.start()
+    link_updates.start()
+    document_index.add_listener(publish_document_changes)
+    threading.Thread(target=warm_indexes, args=(loaded,), name="index-warmup", daemon=True).start()
+    document_watcher.start()
+    committer_election.start()
+    push_worker.start()
+    commit_queue.start()
+
+
+@app.on_event("shutdown")
+async def stop_document_index():
+    """Stop the docs directory watcher and flush pending commits and pushes"""
+    document_watcher.stop()
+    commit_queue.stop()
+    push_worker.stop()
+    committer_election.stop()
+    search_updates.stop()
+    link_updates.stop()
+    git_session.close()
+    document_index.save()
+    search_index.save()
+    link_graph.save()
+
+
+def warm_indexes(loaded: bool) -> None:
+    """Reconcile a snapshot-loaded document index and fill in missing metadata, then bring the derived indexes up to date"""
+    if loaded:
+        try:
+            changed = document_index.reconcile(scan_tree(DOCS_DIR))
+            logger.info(f"Document index reconciled with the docs directory ({'updated' if changed else 'unchanged'})")
+        except Exception as e:
+            logger.error(f"Document index reconcile failed: {e}", exc_info=True)
+    try:
+        extracted = document_index.extract_missing()
+        logger.info(f"Document metadata ready: {extracted} extracted")
+    except Exception as e:
+        logger.error(f"Document metadata extraction failed: {e}", exc_info=True)
+    document_index.save()
+    threading.Thread(target=sync_search_index, name="search-index-sync", daemon=True).start()
+    threading.Thread(target=sync_link_graph, name="link-graph-sync", daemon=True).start()
+
+
+def sync_search_index():
+    """Re-index documents that changed since the search index was saved"""
+    try:
+        reindexed, removed = search_index.sync(document_index.snapshot())
+        logger.info(f"Search index ready: {reindexed} re-indexed, {removed} removed")
+        search_index.save()
+    except Exception as e:
+        logger.error(f"Search index sync failed: {e}", exc_info=True)
+
+
+def sync_link_graph():
+    """Re-parse documents that changed since the link graph was saved"""
+    try:
+        reparsed, removed = link_graph.sync(document_index.snapshot())
+        logger.info(f"Link graph ready: {reparsed} re-parsed, {removed} removed")
+        link_graph.save()
+    except Exception as e:
+        logger.error(f"Link graph sync failed: {e}", exc_info=True)
+
+
+def commit_and_wait(paths: List[Path], message: str, push: bool = True) -> Tuple[bool, str, Optional[str]]:
+    """
+    Commit paths through the elected committer and wait for the outcome
+
+    For writes that report their commit result in the response (sections,
+    navigation, batches); document saves are only queued.
+
+    A commit the committer did not start in time is withdrawn and reported
+    as failed, so the caller may undo the change. One it started but did
+    not finish is reported as successful but pending: it can still land.
+
+    Returns:
+        Tuple of (success, message, commit id)
+    """
+    status = commit_queue.commit(paths, message, push=push)
+    if status["status"] == "pending":
+        return True, f"Commit still pending (ticket {status['ticket']})", None
+    if status["status"] == "withdrawn":
+        return False, f"Commit withdrawn: {status['result']}", None
+    return status["status"] == "committed", status.get("result") or "", status.get("commit")
+
+
+def listing_etag() -> str:
+    """Weak ETag for views derived from the document index"""
+    return weak_etag("docs", document_index.generation)
+
+
+def navigation_etag() -> str:
+    """Weak ETag for the navigation, derived from mkdocs.yml's stat"""
+    return weak_etag("nav", *config_cache.version(MKDOCS_CONFIG))
+
+
+def prefers_minimal(prefer: Optional[str], return_preference: Optional[str]) -> bool:
+    """Whether the client asked not to have the document echoed back"""
+    if return_preference:
+        return return_preference == "minimal"
+    if not prefer:
+        return False
+    return any(token.strip().replace(" ", "") == "return=minimal" for token in prefer.split(","))
+
+
+def minimal_response(saved: DocumentSaved) -> JSONResponse:
+    """Path, ETag, mtime and commit ticket of a write, without the content"""
+    return JSONResponse(
+        content=saved.model_dump(exclude_none=True),
+        headers={"ETag": saved.etag, "Cache-Control": "no-cache", "Preference-Applied": "return=minimal"}
+    )
+
+
+def record_write(rel_path: str, content: str, stat: os.stat_result) -> str:
+    """Record a document just written, with its content ETag, in the index and return the ETag"""
+    etag = content_etag(content.encode("utf-8"))
+    document_index.set_etag(rel_path, etag, stat.st_size, stat.st_mtime, content)
+    return etag
+
+
 @app.get("/")
 async def root():
     return {
@@ -94,177 +470,451 @@ async def root():
     }
 
 
+@app.get("/api/bootstrap")
+async def bootstrap(
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None)
+):
+    """
+    Everything the editor needs on page load, in one response
+    
+    Sections and documents come from one version of the document index, and
+    one weak ETag covers them, the navigation and the git status. The body is
+    gzip-compressed when the client accepts it, and the encoded body is
+    reused until the ETag changes. ``events_after`` is a change feed position
+    the snapshot is at least as new as, for following /api/events from.
+    """
+    events_after = event_feed.last_sequence
+    generation, sections, documents = await run_fs(document_index.listing_snapshot)
+    
+    def load_navigation():
+        try:
+            etag = navigation_etag()
+        except OSError:
+            etag = None
+        return etag, read_navigation(MKDOCS_CONFIG).get("nav", [])
+    
+    nav_etag, navigation = await run_fs(load_navigation)
+    git = await git_status_info()
+    
+    digest = hashlib.sha1(json.dumps([nav_etag, git], sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    etag = weak_etag("bootstrap", generation, digest)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    
+    compress = bool(accept_encoding) and "gzip" in accept_encoding
+    
+    def encode():
+        entry = bootstrap_cache.get("entry")
+        if entry is None or entry["etag"] != etag:
+            entry = {"etag": etag, "body": json.dumps({
+                "sections": sections,
+                "navigation": navigation,
+                "documents": documents,
+                "git": git,
+                "events_after": events_after
+            }).encode("utf-8")}
+            bootstrap_cache["entry"] = entry
+        if compress and "gzip" not in entry:
+            entry["gzip"] = gzip.compress(entry["body"], compresslevel=6)
+        return entry["gzip" if compress else "body"]
+    
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=await run_fs(encode), media_type="application/json", headers=headers)
+
+
+def with_metadata(row: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """Copy of a document row with the outline and/or front matter from the index"""
+    meta = document_index.get_metadata(row["path"])
+    row = dict(row)
+    if "outline" in fields:
+        row["outline"] = meta.outline_dicts() if meta is not None else []
+    if "frontmatter" in fields:
+        row["frontmatter"] = meta.frontmatter if meta is not None else {}
+    return row
+
+
+async def paged_listing(
+    kind: str,
+    allowed_fields: tuple,
+    response: Response,
+    prefix: Optional[str],
+    cursor: Optional[str],
+    limit: Optional[int],
+    fields: Optional[str],
+    format: Optional[str],
+    accept: Optional[str]
+):
+    """
+    Serve a page, a filtered list or an NDJSON stream of index rows
+    
+    Args:
+        kind: "documents" or "directories"
+        allowed_fields: Fields that may be selected
+        response: Response to attach pagination headers to
+        prefix: Only include entries below this directory
+        cursor: Cursor from the previous page
+        limit: Page size (None for everything)
+        fields: Comma-separated fields to include
+        format: "ndjson" to stream
+        accept: Accept header
+    """
+    after = decode_cursor(cursor)
+    selected = parse_fields(fields, allowed_fields)
+    prefix = (prefix or "").strip("/")
+    
+    # Heavier metadata fields are only added to the rows when selected
+    extra = [field for field in selected or () if field in ("outline", "frontmatter")]
+    
+    def page(after_path: Optional[str], size: int):
+        rows = document_index.page(kind, prefix, after_path, size)
+        if extra:
+            rows = [with_metadata(row, extra) for row in rows]
+        return rows
+    
+    async def fetch(after_path: Optional[str], size: int):
+        return await run_fs(page, after_path, size)
+    
+    if wants_ndjson(accept, format):
+        return StreamingResponse(
+            ndjson_rows(fetch, after, selected, limit),
+            media_type=NDJSON_MEDIA_TYPE,
+            headers={"ETag": listing_etag(), "Cache-Control": "no-cache"}
+        )
+    
+    if limit is None:
+        rows = await fetch(after, sys.maxsize)
+    else:
+        # One extra row tells whether another page follows
+        rows = await fetch(after, limit + 1)
+        if len(rows) > limit:
+            rows = rows[:limit]
+            response.headers["X-Next-Cursor"] = encode_cursor(rows[-1]["path"])
+    return project(rows, selected)
+
+
 @app.get("/api/documents", response_model=List[dict])
-async def list_documents():
-    """List all markdown documents in the docs directory"""
-    documents = []
-    
-    for md_file in DOCS_DIR.rglob("*.md"):
-        relative_path = md_file.relative_to(DOCS_DIR)
-        documents.append({
-            "path": str(relative_path).replace("\\", "/"),
-            "name": md_file.name,
-            "directory": str(relative_path.parent).replace("\\", "/"),
-            "size": md_file.stat().st_size,
-            "last_modified": datetime.fromtimestamp(md_file.stat().st_mtime).isoformat()
-        })
+async def list_documents(
+    response: Response,
+    prefix: Optional[str] = Query(None, description="Only documents below this directory"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=10000),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to include"),
+    format: Optional[str] = Query(None, pattern="^(json|ndjson)$"),
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    List markdown documents in the docs directory, sorted by path
+    
+    Without parameters the whole listing is returned. With ``limit`` it is
+    paged and ``X-Next-Cursor`` carries the cursor for the next page;
+    ``format=ndjson`` (or ``Accept: application/x-ndjson``) streams one row
+    per line.
+    """
+    etag = listing_etag()
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
     
-    return sorted(documents, key=lambda x: x["path"])
+    set_etag(response, etag)
+    if not any((prefix, cursor, limit, fields, format)) and not wants_ndjson(accept, None):
+        return await run_fs(document_index.list_documents)
+    return await paged_listing("documents", DOCUMENT_FIELDS, response, prefix, cursor, limit, fields, format, accept)
 
 
 @app.get("/api/documents/{file_path:path}", response_model=DocumentInfo)
-async def get_document(file_path: str):
+async def get_document(file_path: str, response: Response, if_none_match: Optional[str] = Header(None)):
     """Get a specific document by path"""
     file_path_clean = file_path.lstrip("/")
     full_path = DOCS_DIR / file_path_clean
     
-    # Security check - ensure file is within docs directory
-    try:
-        full_path.resolve().relative_to(DOCS_DIR.resolve())
-    except ValueError:
-        raise HTTPException(status_code=403, detail="Access denied")
-    
-    if not full_path.exists():
-        raise HTTPException(status_code=404, detail="Document not found")
+    # Answer revalidations from the index when the content is known. The file
+    # is not stat'ed here, so an edit made outside the editor is only seen once
+    # the watcher or poller has refreshed the index (never with watching off).
+    if if_none_match:
+        known_etag = await run_fs(document_index.get_etag, file_path_clean)
+        if known_etag and etag_matches(if_none_match, known_etag):
+            return not_modified(known_etag)
     
-    if not full_path.suffix == ".md":
-        raise HTTPException(status_code=400, detail="Only markdown files are supported")
+    def read_document():
+        # Security check - ensure file is within docs directory
+        try:
+            full_path.resolve().relative_to(DOCS_DIR.resolve())
+        except ValueError:
+            raise HTTPException(status_code=403, detail="Access denied")
+        
+        if not full_path.exists():
+            raise HTTPException(status_code=404, detail="Document not found")
+        
+        if not full_path.suffix == ".md":
+            raise HTTPException(status_code=400, detail="Only markdown files are supported")
+        
+        stat = full_path.stat()
+        data = full_path.read_bytes()
+        etag = content_etag(data)
+        content = data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+        document_index.set_etag(file_path_clean, etag, stat.st_size, stat.st_mtime, content)
+        return content, stat, etag, document_index.get_metadata(file_path_clean)
     
-    content = full_path.read_text(encoding="utf-8")
-    stat = full_path.stat()
+    content, stat, etag, meta = await run_fs(read_document)
     
-    # Extract title from content if available
-    title = None
-    if content.startswith("#"):
-        title = content.split("\n")[0].lstrip("#").strip()
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
     
     return DocumentInfo(
         path=file_path_clean,
-        title=title,
+        title=meta.title if meta is not None else None,
         content=content,
         last_modified=datetime.fromtimestamp(stat.st_mtime).isoformat()
     )
 
 
 @app.post("/api/documents", response_model=DocumentInfo)
-async def create_document(document: DocumentCreate):
-    """Create a new document"""
+async def create_document(
+    document: DocumentCreate,
+    response: Response,
+    prefer: Optional[str] = Header(None),
+    return_preference: Optional[str] = Query(None, alias="return", pattern="^(minimal|representation)$")
+):
+    """
+    Create a new document
+    
+    With ``Prefer: return=minimal`` (or ``?return=minimal``) only the path,
+    ETag, mtime and commit ticket are returned instead of the full document.
+    """
     file_path_clean = document.path.lstrip("/")
     full_path = DOCS_DIR / file_path_clean
     
-    # Security check
-    try:
-        full_path.resolve().relative_to(DOCS_DIR.resolve())
-    except ValueError:
-        raise HTTPException(status_code=403, detail="Access denied")
-    
     # Ensure it's a markdown file
     if not full_path.suffix == ".md":
         full_path = full_path.with_suffix(".md")
     
-    # Create directory if it doesn't exist
-    full_path.parent.mkdir(parents=True, exist_ok=True)
-    
-    if full_path.exists():
-        raise HTTPException(status_code=409, detail="Document already exists")
+    def write_document():
+        # Security check
+        try:
+            full_path.resolve().relative_to(DOCS_DIR.resolve())
+        except ValueError:
+            raise HTTPException(status_code=403, detail="Access denied")
+        
+        # Create directory if it doesn't exist
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # The existence check and the write must not interleave with another
+        # worker creating the same path
+        with document_write_lock:
+            if full_path.exists():
+                raise HTTPException(status_code=409, detail="Document already exists")
+            
+            # Write content
+            with STAGE_SECONDS.labels("file_write").time():
+                full_path.write_text(document.content, encoding="utf-8")
+            rel_path = full_path.relative_to(DOCS_DIR).as_posix()
+            stat = full_path.stat()
+            return stat, record_write(rel_path, document.content, stat)
     
-    # Write content
-    full_path.write_text(document.content, encoding="utf-8")
+    stat, etag = await run_fs(write_document)
+    set_etag(response, etag)
     
-    # Git commit and push
-    git_success = True
+    # Queue the change for the background committer
+    commit_ticket = None
     git_message = ""
-    if is_git_repo():
-        try:
-            git_success, git_message = commit_and_push_file(
-                full_path,
-                action="create",
-                custom_message=document.commit_message,
-                push=document.push
-            )
-            if not git_success:
-                logger.warning(f"Git operation failed: {git_message}")
-            else:
-                logger.info(f"Git operation: {git_message}")
-        except Exception as e:
-            logger.error(f"Git operation exception: {e}", exc_info=True)
-            git_success = False
-            git_message = f"Git error: {str(e)}"
+    if await is_git_repo_async():
+        commit_ticket = commit_queue.submit(
+            [full_path],
+            build_commit_message(full_path, "create", document.commit_message),
+            push=document.push
+        )
+        git_message = "Queued for commit"
     
-    result = DocumentInfo(
-        path=str(full_path.relative_to(DOCS_DIR)).replace("\\", "/"),
+    rel_path = str(full_path.relative_to(DOCS_DIR)).replace("\\", "/")
+    last_modified = datetime.fromtimestamp(stat.st_mtime).isoformat()
+    if prefers_minimal(prefer, return_preference):
+        return minimal_response(DocumentSaved(
+            path=rel_path,
+            etag=etag,
+            last_modified=last_modified,
+            git_status=git_message,
+            commit_ticket=commit_ticket
+        ))
+    
+    return DocumentInfo(
+        path=rel_path,
         title=document.title,
         content=document.content,
-        last_modified=datetime.now().isoformat()
+        last_modified=last_modified,
+        git_status=git_message,
+        commit_ticket=commit_ticket
     )
-    
-    # Include git status in response
-    if not git_success:
-        logger.warning(f"Document created but git commit failed: {git_message}")
-        result.git_error = True
-        result.git_status = git_message
-    else:
-        result.git_status = git_message
-    
-    return result
 
 
 @app.put("/api/documents/{file_path:path}", response_model=DocumentInfo)
-async def update_document(file_path: str, document: DocumentUpdate):
-    """Update an existing document"""
+async def update_document(
+    file_path: str,
+    document: DocumentUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    prefer: Optional[str] = Header(None),
+    return_preference: Optional[str] = Query(None, alias="return", pattern="^(minimal|representation)$")
+):
+    """
+    Update an existing document
+    
+    If an If-Match header is sent, the update is rejected with 412 unless it
+    matches the current content ETag, so a stale editor cannot overwrite a
+    newer save. ``Prefer: return=minimal`` skips echoing the content back.
+    """
     file_path_clean = file_path.lstrip("/")
     full_path = DOCS_DIR / file_path_clean
     
-    # Security check
-    try:
-        full_path.resolve().relative_to(DOCS_DIR.resolve())
-    except ValueError:
-        raise HTTPException(status_code=403, detail="Access denied")
-    
-    if not full_path.exists():
-        raise HTTPException(status_code=404, detail="Document not found")
+    def write_document():
+        # Security check
+        try:
+            full_path.resolve().relative_to(DOCS_DIR.resolve())
+        except ValueError:
+            raise HTTPException(status_code=403, detail="Access denied")
+        
+        if not full_path.exists():
+            raise HTTPException(status_code=404, detail="Document not found")
+        
+        with document_write_lock:
+            if if_match is not None:
+                current_etag = document_index.get_etag(file_path_clean, full_path.stat())
+                if current_etag is None:
+                    current_etag = content_etag(full_path.read_bytes())
+                if not etag_matches(if_match, current_etag, weak=False):
+                    raise HTTPException(status_code=412, detail="Document was modified since it was loaded")
+            
+            # Write updated content
+            with STAGE_SECONDS.labels("file_write").time():
+                full_path.write_text(document.content, encoding="utf-8")
+            stat = full_path.stat()
+            return stat, record_write(file_path_clean, document.content, stat)
     
-    # Write updated content
-    full_path.write_text(document.content, encoding="utf-8")
+    stat, etag = await run_fs(write_document)
+    set_etag(response, etag)
     
-    # Git commit and push
-    git_success = True
+    # Queue the change for the background committer
+    commit_ticket = None
     git_message = ""
-    if is_git_repo():
-        try:
-            git_success, git_message = commit_and_push_file(
-                full_path,
-                action="update",
-                custom_message=document.commit_message,
-                push=document.push
-            )
-            if not git_success:
-                logger.warning(f"Git operation failed: {git_message}")
-            else:
-                logger.info(f"Git operation: {git_message}")
-        except Exception as e:
-            logger.error(f"Git operation exception: {e}", exc_info=True)
-            git_success = False
-            git_message = f"Git error: {str(e)}"
+    if await is_git_repo_async():
+        commit_ticket = commit_queue.submit(
+            [full_path],
+            build_commit_message(full_path, "update", document.commit_message),
+            push=document.push
+        )
+        git_message = "Queued for commit"
     
-    stat = full_path.stat()
+    if prefers_minimal(prefer, return_preference):
+        return minimal_response(DocumentSaved(
+            path=file_path_clean,
+            etag=etag,
+            last_modified=datetime.fromtimestamp(stat.st_mtime).isoformat(),
+            git_status=git_message,
+            commit_ticket=commit_ticket
+        ))
     
-    result = DocumentInfo(
+    return DocumentInfo(
         path=file_path_clean,
         title=document.title,
         content=document.content,
-        last_modified=datetime.fromtimestamp(stat.st_mtime).isoformat()
+        last_modified=datetime.fromtimestamp(stat.st_mtime).isoformat(),
+        git_status=git_message,
+        commit_ticket=commit_ticket
     )
+
+
+@app.patch("/api/documents/{file_path:path}", response_model=DocumentSaved)
+async def patch_document(
+    file_path: str,
+    patch: DocumentPatch,
+    response: Response,
+    if_match: Optional[str] = Header(None)
+):
+    """
+    Apply line-range edits or a unified diff to a document
     
-    # Include git status in response
-    if not git_success:
-        logger.warning(f"Document updated but git commit failed: {git_message}")
-        result.git_error = True
-        result.git_status = git_message
-    else:
-        result.git_status = git_message
+    The patch must name the version it was made against, via ``base_etag``
+    or If-Match; it is rejected with 412 if the document changed since. Only
+    the part of the file from the first changed line onwards is rewritten.
+    """
+    base_etag = patch.base_etag or if_match
+    if not base_etag:
+        raise HTTPException(status_code=428, detail="A patch needs base_etag or If-Match")
+    if (patch.edits is None) == (patch.diff is None):
+        raise HTTPException(status_code=400, detail="Send either edits or diff")
     
-    return result
+    file_path_clean = file_path.lstrip("/")
+    full_path = DOCS_DIR / file_path_clean
+    
+    def write_document():
+        # Security check
+        try:
+            full_path.resolve().relative_to(DOCS_DIR.resolve())
+        except ValueError:
+            raise HTTPException(status_code=403, detail="Access denied")
+        
+        if not full_path.is_file():
+            raise HTTPException(status_code=404, detail="Document not found")
+        
+        with document_write_lock:
+            raw = full_path.read_bytes()
+            if not etag_matches(base_etag, content_etag(raw), weak=False):
+                raise HTTPException(status_code=412, detail="Document was modified since the patch base")
+            
+            # Patches address the content as served by GET, where every line
+            # ends with LF. Splitting on "\n" numbers CRLF lines the same way,
+            # so those are patched in place and keep their endings; only a
+            # lone CR, which GET turns into a line break, needs the
+            # normalized text
+            text = raw.decode("utf-8")
+            lone_cr = "\r" in text.replace("\r\n", "")
+            base = text.replace("\r\n", "\n").replace("\r", "\n") if lone_cr else text
+            try:
+                if patch.diff is not None:
+                    edits = diff_to_edits(base, patch.diff)
+                else:
+                    edits = [edit.model_dump() for edit in patch.edits]
+                edits = with_line_ending(edits, line_ending(base))
+                content, first_line = apply_line_edits(base, edits)
+            except PatchError as e:
+                raise HTTPException(status_code=422, detail=f"Patch does not apply: {e}")
+            
+            data = content.encode("utf-8")
+            with STAGE_SECONDS.labels("file_write").time():
+                if base is text:
+                    prefix = "".join(split_lines(base)[:first_line]).encode("utf-8")
+                    written = write_changed_suffix(full_path, raw, data, len(prefix))
+                else:
+                    full_path.write_bytes(data)
+                    written = len(data)
+            stat = full_path.stat()
+            return stat, record_write(file_path_clean, content, stat), written
+    
+    stat, etag, written = await run_fs(write_document)
+    set_etag(response, etag)
+    
+    # Queue the change for the background committer
+    commit_ticket = None
+    git_message = ""
+    if await is_git_repo_async():
+        commit_ticket = commit_queue.submit(
+            [full_path],
+            build_commit_message(full_path, "update", patch.commit_message),
+            push=patch.push
+        )
+        git_message = "Queued for commit"
+    
+    return DocumentSaved(
+        path=file_path_clean,
+        etag=etag,
+        last_modified=datetime.fromtimestamp(stat.st_mtime).isoformat(),
+        git_status=git_message,
+        commit_ticket=commit_ticket,
+        bytes_written=written
+    )
 
 
 @app.delete("/api/documents/{file_path:path}")
@@ -273,110 +923,297 @@ async def delete_document(file_path: str):
     file_path_clean = file_path.lstrip("/")
     full_path = DOCS_DIR / file_path_clean
     
-    # Security check
-    try:
-        full_path.resolve().relative_to(DOCS_DIR.resolve())
-    except ValueError:
-        raise HTTPException(status_code=403, detail="Access denied")
-    
-    if not full_path.exists():
-        raise HTTPException(status_code=404, detail="Document not found")
-    
-    # Store path for git before deletion
-    file_for_git = full_path
+    def remove_document():
+        # Security check
+        try:
+            full_path.resolve().relative_to(DOCS_DIR.resolve())
+        except ValueError:
+            raise HTTPException(status_code=403, detail="Access denied")
+        
+        if not full_path.exists():
+            raise HTTPException(status_code=404, detail="Document not found")
+        
+        with STAGE_SECONDS.labels("file_write").time():
+            full_path.unlink()
+        document_index.refresh_path(file_path_clean)
     
-    full_path.unlink()
+    await run_fs(remove_document)
     
-    # Git commit and push
-    git_success = True
+    # Queue the deletion for the background committer
+    commit_ticket = None
     git_message = ""
-    if is_git_repo():
-        try:
-            git_success, git_message = commit_and_push_file(
-                file_for_git,
-                action="delete",
-                push=True  # Always push deletes
-            )
-            logger.info(f"Git operation: {git_message}")
-        except Exception as e:
-            logger.error(f"Git operation failed: {e}")
-            git_success = False
-            git_message = f"Git error: {str(e)}"
+    if await is_git_repo_async():
+        commit_ticket = commit_queue.submit(
+            [full_path],
+            build_commit_message(full_path, "delete"),
+            push=True  # Always push deletes
+        )
+        git_message = "Queued for commit"
     
     return {
         "message": "Document deleted successfully",
         "path": file_path_clean,
-        "git_status": git_message if git_success else f"Warning: {git_message}"
+        "git_status": git_message,
+        "commit_ticket": commit_ticket
     }
 
 
-@app.get("/api/directories")
-async def list_directories():
-    """List all directories in the docs folder"""
-    directories = []
+@app.post("/api/batch")
+async def apply_batch(batch: BatchRequest):
+    """
+    Apply many document, section and navigation changes atomically
+    
+    Operations are applied in order with one mkdocs.yml rewrite and a single
+    commit. If any operation fails, every change in the batch is rolled back.
+    """
+    if not batch.operations and batch.navigation is None:
+        raise HTTPException(status_code=400, detail="Batch is empty")
+    
+    operations = [operation.model_dump(exclude_none=True) for operation in batch.operations]
+    transaction = BatchTransaction(DOCS_DIR, MKDOCS_CONFIG)
     
-    for item in DOCS_DIR.rglob("*"):
-        if item.is_dir() and not item.name.startswith("."):
-            relative_path = item.relative_to(DOCS_DIR)
-            directories.append({
-                "path": str(relative_path).replace("\\", "/"),
-                "name": item.name
-            })
+    def refresh_index():
+        for directory in transaction.touched_dirs:
+            document_index.refresh_tree(directory.relative_to(DOCS_DIR))
+        for path in transaction.touched:
+            if path != MKDOCS_CONFIG:
+                document_index.refresh_path(path.relative_to(DOCS_DIR))
     
-    return sorted(directories, key=lambda x: x["path"])
+    def commit_batch(paths: List[Path], message: str) -> Tuple[bool, str, Optional[str]]:
+        return commit_and_wait(paths, message, push=batch.push)
+    
+    try:
+        # The document write lock keeps other saves off the batch's paths
+        # until the committer has recorded it
+        result = await run_git(
+            run_batch, transaction, operations, batch.navigation, batch.commit_message,
+            commit_paths=commit_batch, lock=document_write_lock
+        )
+    except BatchError as e:
+        # Rolled back; make the index reflect the restored tree right away
+        await run_fs(refresh_index)
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    
+    def record_etags():
+        refresh_index()
+        for rel_path, etag in transaction.etags.items():
+            try:
+                stat = (DOCS_DIR / rel_path).stat()
+            except OSError:
+                continue
+            document_index.set_etag(rel_path, etag, stat.st_size, stat.st_mtime)
+    
+    await run_fs(record_etags)
+    if MKDOCS_CONFIG in transaction.touched:
+        publish_navigation_change()
+    return result
+
+
+@app.get("/api/search")
+async def search_documents(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0)
+):
+    """Full-text search across all documents, ranked by BM25"""
+    return await run_fs(search_index.search, q, limit=limit, offset=offset)
+
+
+@app.get("/api/links/broken")
+async def list_broken_links():
+    """Links to missing documents and missing anchors across all documents"""
+    return await run_fs(link_graph.check)
+
+
+@app.get("/api/links/{file_path:path}")
+async def get_document_links(file_path: str):
+    """Anchors, outgoing links and backlinks of a document"""
+    file_path_clean = file_path.lstrip("/")
+    links = await run_fs(link_graph.page, file_path_clean)
+    if links is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return links
+
+
+@app.post("/api/render")
+async def render_markdown(request: RenderRequest):
+    """Render markdown to HTML with the site's markdown extensions"""
+    html = markdown_renderer.lookup(request.content)
+    if html is not None:
+        return {"html": html, "cached": True}
+
+    if not markdown_renderer.available:
+        raise HTTPException(status_code=503, detail="Markdown rendering is not available on the server")
+    html, cached = await run_fs(markdown_renderer.render, request.content)
+    return {"html": html, "cached": cached}
+
+
+@app.get("/api/directories")
+async def list_directories(
+    response: Response,
+    prefix: Optional[str] = Query(None, description="Only directories below this directory"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=10000),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to include"),
+    format: Optional[str] = Query(None, pattern="^(json|ndjson)$"),
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None)
+):
+    """List directories in the docs folder, with the same paging options as documents"""
+    etag = listing_etag()
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    
+    set_etag(response, etag)
+    if not any((prefix, cursor, limit, fields, format)) and not wants_ndjson(accept, None):
+        return await run_fs(document_index.list_directories)
+    return await paged_listing("directories", DIRECTORY_FIELDS, response, prefix, cursor, limit, fields, format, accept)
 
 
 @app.get("/api/mkdocs-config")
 async def get_mkdocs_config():
     """Get the current mkdocs.yml configuration"""
-    if not MKDOCS_CONFIG.exists():
-        raise HTTPException(status_code=404, detail="mkdocs.yml not found")
+    def read_config():
+        if not MKDOCS_CONFIG.exists():
+            raise HTTPException(status_code=404, detail="mkdocs.yml not found")
+        return MKDOCS_CONFIG.read_text(encoding="utf-8")
+    
+    return {"config": await run_fs(read_config)}
+
+
+@app.get("/api/git/push-status")
+async def get_push_status():
+    """Get the push worker's queue depth and last push result"""
+    return {**push_worker.status(), "committer": committer_election.is_leader}
+
+
+@app.get("/api/commits/{ticket_id}")
+async def get_commit_status(ticket_id: str):
+    """Get the commit status of a queued document change"""
+    ticket = commit_queue.get(ticket_id)
+    if ticket is None:
+        raise HTTPException(status_code=404, detail="Unknown commit ticket")
+    return ticket
+
+
+@app.get("/api/events")
+async def stream_events(
+    after: Optional[int] = Query(None, description="Resume after this sequence number"),
+    types: Optional[str] = Query(None, description="Comma-separated event type prefixes"),
+    last_event_id: Optional[str] = Header(None)
+):
+    """
+    Follow document, navigation, commit and push changes as Server-Sent Events
+    
+    Every event carries an increasing sequence number as its id, so a
+    reconnecting EventSource resumes via Last-Event-ID, which takes
+    precedence over ``after``. A ``reset`` event
+    means events were missed and the client should reload its state.
+    """
+    if last_event_id:
+        # A reconnecting EventSource knows better than the original URL
+        try:
+            after = int(last_event_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
     
-    return {"config": MKDOCS_CONFIG.read_text(encoding="utf-8")}
+    return StreamingResponse(
+        event_feed.stream(after, parse_types(types), settings.events_keepalive),
+        media_type=EVENT_STREAM_MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Metrics in the Prometheus text format"""
+    return PlainTextResponse(REGISTRY.render(), media_type=METRICS_MEDIA_TYPE)
+
+
+@app.get("/api/profiles", dependencies=[Depends(require_profile_access)])
+async def list_profiles():
+    """Summaries of the kept request profiles, newest first"""
+    return profile_store.list()
+
+
+@app.get("/api/profiles/{profile_id}", dependencies=[Depends(require_profile_access)])
+async def download_profile(profile_id: str, format: str = Query("speedscope", pattern="^(speedscope|pstats)$")):
+    """Download a request profile as a speedscope file or pstats data"""
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    if format == "pstats":
+        body = await run_fs(profile.to_pstats)
+        return Response(body, media_type=PSTATS_MEDIA_TYPE, headers={
+            "Content-Disposition": f'attachment; filename="{profile_id}.prof"'
+        })
+    body = await run_fs(profile.to_speedscope)
+    return Response(body, media_type="application/json", headers={
+        "Content-Disposition": f'attachment; filename="{profile_id}.speedscope.json"'
+    })
 
 
 @app.get("/api/git/status")
 async def get_git_status():
     """Get git repository status"""
-    if not is_git_repo():
+    return await git_status_info()
+
+
+async def git_status_info() -> dict:
+    """Git status of the repository, or a note that it is not one"""
+    if not await is_git_repo_async():
         return {"is_repo": False, "message": "Not a git repository"}
     
-    status = git_status()
+    status = await git_status_async()
     return {"is_repo": True, **status}
 
 
 # Section Management Endpoints
 
 @app.get("/api/sections")
-async def list_sections():
-    """Get the complete section structure"""
-    structure = get_section_structure(DOCS_DIR)
-    return structure
+async def list_sections(
+    response: Response,
+    outline: bool = Query(False, description="Include each document's heading outline"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Get the complete section structure, with document titles"""
+    etag = listing_etag()
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    
+    set_etag(response, etag)
+    return await run_fs(document_index.section_structure, outline)
 
 
 @app.post("/api/sections")
 async def create_section_endpoint(section: SectionCreate):
     """Create a new top-level section"""
     # Create section folder and index.md
-    success, message, section_path = create_section(section.name, DOCS_DIR)
+    success, message, section_path = await run_fs(create_section, section.name, DOCS_DIR)
     
     if not success:
         raise HTTPException(status_code=400, detail=message)
     
+    await run_fs(document_index.refresh_tree, section_path.relative_to(DOCS_DIR))
+    
     # Update mkdocs.yml navigation
-    nav_success = add_section_to_nav(
+    nav_success = await run_fs(
+        add_section_to_nav,
         section.name,
         section_path.relative_to(DOCS_DIR).as_posix(),
         MKDOCS_CONFIG
     )
     
-    if not nav_success:
+    if nav_success:
+        publish_navigation_change()
+    else:
         logger.warning(f"Section created but navigation update failed: {section.name}")
     
     # Git commit and push
     git_success = True
     git_message = ""
-    if is_git_repo():
+    if await is_git_repo_async():
         try:
             # Stage section folder and mkdocs.yml
             files_to_commit = [
@@ -385,7 +1222,8 @@ async def create_section_endpoint(section: SectionCreate):
             ]
             
             commit_msg = section.commit_message or f"docs: Add section '{section.name}'"
-            git_success, git_message = commit_multiple_files(
+            git_success, git_message, _ = await run_git(
+                commit_and_wait,
                 files_to_commit,
                 commit_msg,
                 push=section.push
@@ -419,26 +1257,31 @@ async def create_section_endpoint(section: SectionCreate):
 async def create_subsection_endpoint(section_name: str, subsection: SubsectionCreate):
     """Create a sub-section within an existing section"""
     # Create sub-section folder and index.md
-    success, message, subsection_path = create_subsection(section_name, subsection.name, DOCS_DIR)
+    success, message, subsection_path = await run_fs(create_subsection, section_name, subsection.name, DOCS_DIR)
     
     if not success:
         raise HTTPException(status_code=400, detail=message)
     
+    await run_fs(document_index.refresh_tree, subsection_path.relative_to(DOCS_DIR))
+    
     # Update mkdocs.yml navigation
-    nav_success = add_subsection_to_nav(
+    nav_success = await run_fs(
+        add_subsection_to_nav,
         section_name,
         subsection.name,
         subsection_path.relative_to(DOCS_DIR).as_posix(),
         MKDOCS_CONFIG
     )
     
-    if not nav_success:
+    if nav_success:
+        publish_navigation_change()
+    else:
         logger.warning(f"Sub-section created but navigation update failed: {section_name}/{subsection.name}")
     
     # Git commit and push
     git_success = True
     git_message = ""
-    if is_git_repo():
+    if await is_git_repo_async():
         try:
             # Stage sub-section folder and mkdocs.yml
             files_to_commit = [
@@ -447,7 +1290,8 @@ async def create_subsection_endpoint(section_name: str, subsection: SubsectionCr
             ]
             
             commit_msg = subsection.commit_message or f"docs: Add subsection '{subsection.name}' to '{section_name}'"
-            git_success, git_message = commit_multiple_files(
+            git_success, git_message, _ = await run_git(
+                commit_and_wait,
                 files_to_commit,
                 commit_msg,
                 push=subsection.push
@@ -470,11 +1314,13 @@ async def create_subsection_endpoint(section_name: str, subsection: SubsectionCr
 async def delete_section_endpoint(path: str):
     """Delete a section or sub-section"""
     # Delete section folder
-    success, message = delete_section(path, DOCS_DIR)
+    success, message = await run_fs(delete_section, path, DOCS_DIR)
     
     if not success:
         raise HTTPException(status_code=400, detail=message)
     
+    await run_fs(document_index.refresh_tree, path.strip("/"))
+    
     # Determine if it's a section or sub-section
     path_parts = path.strip("/").split("/")
     is_subsection = len(path_parts) > 1
@@ -484,36 +1330,28 @@ async def delete_section_endpoint(path: str):
     if is_subsection:
         section_name = path_parts[0]
         subsection_name = path_parts[1]
-        nav_success = remove_subsection_from_nav(section_name, subsection_name, MKDOCS_CONFIG)
+        nav_success = await run_fs(remove_subsection_from_nav, section_name, subsection_name, MKDOCS_CONFIG)
     else:
         section_name = path_parts[0]
-        nav_success = remove_section_from_nav(section_name, MKDOCS_CONFIG)
+        nav_success = await run_fs(remove_section_from_nav, section_name, MKDOCS_CONFIG)
     
-    if not nav_success:
+    if nav_success:
+        publish_navigation_change()
+    else:
         logger.warning(f"Section deleted but navigation update failed: {path}")
     
     # Git commit and push
     git_success = True
     git_message = ""
-    if is_git_repo():
+    if await is_git_repo_async():
         try:
-            from git_utils import run_git_command, git_commit, git_push, REPO_ROOT
-            
-            # Stage all changes (deletion and mkdocs.yml update)
-            run_git_command(['git', 'add', '-A'], cwd=REPO_ROOT)
-            
-            # Commit
-            commit_msg = f"docs: Delete section '{path}'"
-            commit_success, commit_result = git_commit(commit_msg)
-            
-            if commit_success:
-                # Push
-                push_success, push_result = git_push()
-                git_message = f"{commit_result}. {push_result}" if push_success else f"{commit_result}. Push failed: {push_result}"
-                git_success = push_success
-            else:
-                git_success = False
-                git_message = commit_result
+            # Commit the removed folder and mkdocs.yml, nothing else
+            files_to_commit = [DOCS_DIR / path.strip("/"), MKDOCS_CONFIG]
+            git_success, git_message, _ = await run_git(
+                commit_and_wait,
+                files_to_commit,
+                f"docs: Delete section '{path}'"
+            )
             
             logger.info(f"Git operation: {git_message}")
         except Exception as e:
@@ -530,9 +1368,23 @@ async def delete_section_endpoint(path: str):
 
 
 @app.get("/api/navigation")
-async def get_navigation():
+async def get_navigation(response: Response, if_none_match: Optional[str] = Header(None)):
     """Get the current navigation structure from mkdocs.yml"""
-    nav_data = read_navigation(MKDOCS_CONFIG)
+    def load_navigation():
+        try:
+            etag = navigation_etag()
+        except OSError:
+            etag = None
+        if etag and etag_matches(if_none_match, etag):
+            return etag, None
+        return etag, read_navigation(MKDOCS_CONFIG)
+    
+    etag, nav_data = await run_fs(load_navigation)
+    if nav_data is None:
+        return not_modified(etag)
+    if etag:
+        set_etag(response, etag)
+    
     return {
         "navigation": nav_data.get("nav", []),
         "config_path": str(MKDOCS_CONFIG)
@@ -545,21 +1397,21 @@ async def update_navigation_endpoint(nav_structure: dict):
     from mkdocs_utils import update_navigation
     
     nav_list = nav_structure.get("navigation", [])
-    success = update_navigation(nav_list, MKDOCS_CONFIG)
+    success = await run_fs(update_navigation, nav_list, MKDOCS_CONFIG)
     
     if not success:
         raise HTTPException(status_code=500, detail="Failed to update navigation")
+    publish_navigation_change()
     
     # Git commit
     git_success = True
     git_message = ""
-    if is_git_repo():
+    if await is_git_repo_async():
         try:
-            git_success, git_message = commit_and_push_file(
-                MKDOCS_CONFIG,
-                action="update",
-                custom_message="docs: Update navigation structure",
-                push=True
+            git_success, git_message, _ = await run_git(
+                commit_and_wait,
+                [MKDOCS_CONFIG],
+                "docs: Update navigation structure"
             )
         except Exception as e:
             logger.error(f"Git operation failed: {e}")
@@ -574,8 +1426,13 @@ async def update_navigation_endpoint(nav_structure: dict):
 
 @app.get("/api/navigation/validate")
 async def validate_navigation_endpoint():
-    """Validate the navigation structure"""
-    validation = validate_navigation(MKDOCS_CONFIG, DOCS_DIR)
+    """Validate the navigation structure against the document index"""
+    def validate():
+        documents = document_index.snapshot()
+        directories = [row["path"] for row in document_index.list_directories()]
+        return validate_navigation(MKDOCS_CONFIG, DOCS_DIR, documents, directories)
+    
+    validation = await run_fs(validate)
     return validation
 
 
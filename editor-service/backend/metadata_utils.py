@@ -0,0 +1,202 @@
+"""
+Metadata extracted from markdown documents
+
+The document index runs the extractor whenever it learns about new content,
+from the editor's own writes and from watcher events, and keeps the result
+next to each entry. Listings can then show titles, outlines and reading
+times without reading any files.
+"""
+
+import json
+import math
+import re
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import yaml
+
+from link_graph import (
+    ATX_HEADING_RE, HEADING_ATTR_RE, INLINE_CODE_RE, MarkdownLine, heading_anchor, heading_text, markdown_lines
+)
+
+logger = logging.getLogger(__name__)
+
+# Average silent reading speed used for reading time estimates
+WORDS_PER_MINUTE = 200
+
+WORD_RE = re.compile(r"[^\W_]+(?:['’-][^\W_]+)*")
+LINK_TARGET_RE = re.compile(r"\]\([^)]*\)")
+HTML_TAG_RE = re.compile(r"<[^>]+>")
+
+# (level, text, anchor id)
+Heading = Tuple[int, str, str]
+
+# Compact JSON for index snapshots
+_encode_json = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False).encode
+
+
+class DocumentMetadata:
+    """Front matter, title, heading outline and word count of a document"""
+
+    __slots__ = ("title", "frontmatter", "outline", "word_count")
+
+    def __init__(self, title: Optional[str], frontmatter: Dict[str, Any], outline: Tuple[Heading, ...], word_count: int):
+        self.title = title
+        self.frontmatter = frontmatter
+        self.outline = outline
+        self.word_count = word_count
+
+    def to_row(self) -> Tuple[Optional[str], int, str, Optional[str]]:
+        """Title, word count, outline JSON and front matter JSON, as stored in index snapshots"""
+        frontmatter = _encode_json(self.frontmatter) if self.frontmatter else None
+        return self.title, self.word_count, _encode_json(self.outline), frontmatter
+
+    @classmethod
+    def from_rows(cls, rows: List[Tuple[Optional[str], int, str, Optional[str]]]) -> List["DocumentMetadata"]:
+        """
+        Inverse of ``to_row`` for many documents at once
+
+        All outlines, and all front matter, are parsed as one JSON document
+        each rather than row by row.
+
+        Raises:
+            ValueError, TypeError: If a column is malformed
+        """
+        outlines = json.loads("[" + ",".join([row[2] for row in rows]) + "]")
+        frontmatters = iter(json.loads("[" + ",".join([row[3] for row in rows if row[3]]) + "]"))
+        if len(outlines) != len(rows):
+            raise ValueError("outline column does not match the rows")
+        metadata = []
+        for (title, word_count, _, frontmatter), outline in zip(rows, outlines):
+            data = next(frontmatters) if frontmatter else {}
+            if not isinstance(data, dict) or not isinstance(word_count, int):
+                raise TypeError("metadata columns have unexpected types")
+            metadata.append(cls(title, data, tuple(map(tuple, outline)), word_count))
+        return metadata
+
+    @property
+    def reading_time(self) -> int:
+        """Estimated reading time in whole minutes"""
+        return math.ceil(self.word_count / WORDS_PER_MINUTE)
+
+    def outline_dicts(self) -> List[Dict[str, Any]]:
+        return [{"level": level, "text": text, "anchor": anchor} for level, text, anchor in self.outline]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "title": self.title,
+            "frontmatter": self.frontmatter,
+            "outline": self.outline_dicts(),
+            "word_count": self.word_count,
+            "reading_time": self.reading_time
+        }
+
+
+def parse_frontmatter(lines: List[str]) -> Tuple[Dict[str, Any], int]:
+    """
+    YAML front matter at the top of a document
+
+    Args:
+        lines: Document lines
+
+    Returns:
+        Tuple of (front matter mapping, index of the first body line); the
+        mapping is empty if there is no front matter or it is not valid YAML
+    """
+    if not lines or lines[0].strip() != "---":
+        return {}, 0
+    for number in range(1, len(lines)):
+        if lines[number].strip() in ("---", "..."):
+            break
+    else:
+        return {}, 0
+
+    try:
+        data = yaml.safe_load("\n".join(lines[1:number]))
+    except yaml.YAMLError as e:
+        logger.debug(f"Ignoring invalid front matter: {e}")
+        data = None
+    if not isinstance(data, dict):
+        return {}, number + 1
+    # Dates and other YAML types are kept in their JSON form
+    return json.loads(json.dumps(data, default=str)), number + 1
+
+
+def _outline_text(raw: str) -> str:
+    attributes = HEADING_ATTR_RE.search(raw)
+    if attributes:
+        raw = raw[:attributes.start()]
+    return heading_text(raw).replace("`", "").strip()
+
+
+def _heading(line: MarkdownLine) -> Optional[Tuple[int, str, str]]:
+    """Level, outline text and anchor source of a heading line, or None"""
+    if line.atx:
+        raw = ATX_HEADING_RE.match(line.text)
+        stripped = line.code_free.lstrip(" ")
+        level = len(stripped) - len(stripped.lstrip("#"))
+        return level, _outline_text((raw.group(1) if raw else None) or ""), line.atx.group(1) or ""
+    if line.setext_of is not None:
+        level = 1 if line.text.strip()[0] == "=" else 2
+        return level, _outline_text(line.setext_of), INLINE_CODE_RE.sub("", line.setext_of).strip()
+    return None
+
+
+def _title(frontmatter: Dict[str, Any], headings: Iterable[Tuple[int, str]]) -> Optional[str]:
+    title = frontmatter.get("title")
+    if not isinstance(title, str) or not title.strip():
+        title = next((text for level, text in headings if level == 1 and text), None)
+    return title.strip() if title else None
+
+
+def extract_metadata(text: str) -> DocumentMetadata:
+    """
+    Extract the metadata of a markdown document
+
+    Headings and words inside fenced code blocks are ignored. The title is
+    the front matter ``title`` if there is one, otherwise the first H1.
+
+    Args:
+        text: Document content
+
+    Returns:
+        DocumentMetadata for the document
+    """
+    lines = text.splitlines()
+    frontmatter, start = parse_frontmatter(lines)
+    outline: List[Heading] = []
+    anchors: Set[str] = set()
+    word_count = 0
+
+    for line in markdown_lines(lines, start):
+        heading = _heading(line)
+        if heading is not None:
+            level, label, anchor_source = heading
+            outline.append((level, label, heading_anchor(anchor_source, anchors)))
+            if line.setext_of is not None:
+                # The underline is not prose
+                continue
+
+        prose = HTML_TAG_RE.sub(" ", LINK_TARGET_RE.sub("]", line.text))
+        word_count += len(WORD_RE.findall(prose))
+
+    title = _title(frontmatter, ((level, heading) for level, heading, _ in outline))
+    return DocumentMetadata(title, frontmatter, tuple(outline), word_count)
+
+
+def extract_title(text: str) -> Optional[str]:
+    """
+    Title of a markdown document, as ``extract_metadata`` determines it
+
+    Stops at the first H1, for callers that need nothing else.
+
+    Args:
+        text: Document content
+
+    Returns:
+        Front matter ``title`` or first H1, or None
+    """
+    lines = text.splitlines()
+    frontmatter, start = parse_frontmatter(lines)
+    headings = (_heading(line) for line in markdown_lines(lines, start))
+    return _title(frontmatter, (heading[:2] for heading in headings if heading is not None))
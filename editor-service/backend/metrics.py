@@ -0,0 +1,373 @@
+"""
+Process metrics in the Prometheus text format
+
+Counters, gauges and latency histograms that are cheap enough to update on
+every request and every git call: an observation is a bisect into a fixed
+bucket list and a few additions under an uncontended lock. Values that
+other components already track (queue depths, cache counters) are read by
+callbacks at scrape time instead of being updated on the hot path.
+"""
+
+import time
+import threading
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+METRICS_MEDIA_TYPE = "text/plain; version=0.0.4"
+
+# Seconds, from a cached read to a slow push
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Registry:
+    """Metrics exposed together on one endpoint"""
+
+    def __init__(self):
+        self._metrics: Dict[str, "Metric"] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: "Metric") -> None:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+    def unregister(self, name: str) -> None:
+        with self._lock:
+            self._metrics.pop(name, None)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class Metric:
+    """
+    A named metric with optional labels
+
+    Args:
+        name: Metric name
+        help: One-line description
+        labelnames: Names of the labels every child has
+        registry: Registry to expose the metric on (None for none)
+    """
+
+    type = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        registry: Optional[Registry] = REGISTRY
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def labels(self, *values: str):
+        """Child metric for one combination of label values"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _items(self) -> List[Tuple[Tuple[str, ...], Any]]:
+        with self._lock:
+            return list(self._children.items())
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(Metric):
+    """
+    Monotonically increasing count
+
+    Args:
+        function: Read the value from this callable at scrape time instead
+            (unlabelled counters only)
+    """
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), function: Optional[Callable[[], float]] = None, **kwargs):
+        super().__init__(name, help, labelnames, **kwargs)
+        self.function = function
+
+    def inc(self, amount: float = 1) -> None:
+        """Increment the unlabelled counter"""
+        self.labels().inc(amount)
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def samples(self) -> Iterator[str]:
+        if self.function is not None:
+            yield f"{self.name} {_format_value(self.function())}"
+            return
+        for values, child in self._items():
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+
+
+class Gauge(Metric):
+    """
+    Value that can go up and down
+
+    Args:
+        function: Read the value from this callable at scrape time instead
+            (unlabelled gauges only)
+    """
+
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), function: Optional[Callable[[], float]] = None, **kwargs):
+        super().__init__(name, help, labelnames, **kwargs)
+        self.function = function
+
+    def set(self, value: float) -> None:
+        """Set the unlabelled gauge"""
+        self.labels().set(value)
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def samples(self) -> Iterator[str]:
+        if self.function is not None:
+            yield f"{self.name} {_format_value(self.function())}"
+            return
+        for values, child in self._items():
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_started")
+
+    def __init__(self, histogram: "_HistogramChild"):
+        self._histogram = histogram
+
+    def __enter__(self) -> "_Timer":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._histogram.observe(time.perf_counter() - self._started)
+
+
+class _HistogramChild:
+    __slots__ = ("_upper_bounds", "_counts", "_sum", "_lock")
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self._upper_bounds = upper_bounds
+        # One count per bucket plus +Inf, non-cumulative until rendered
+        self._counts = [0] * (len(upper_bounds) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self._upper_bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def time(self) -> _Timer:
+        """Context manager observing the duration of its block"""
+        return _Timer(self)
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        with self._lock:
+            return list(self._counts), self._sum
+
+
+class Histogram(Metric):
+    """
+    Distribution of observed values in fixed buckets
+
+    Args:
+        buckets: Upper bounds of the buckets, ascending
+    """
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(name, help, labelnames, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float) -> None:
+        """Record a value in the unlabelled histogram"""
+        self.labels().observe(value)
+
+    def time(self) -> _Timer:
+        """Time a block into the unlabelled histogram"""
+        return self.labels().time()
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def samples(self) -> Iterator[str]:
+        bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+        for values, child in self._items():
+            counts, total = child.snapshot()
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, values, f'le="{bound}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+# Shared metrics, updated by the modules that do the work
+
+STAGE_SECONDS = Histogram(
+    "phronidoc_stage_seconds",
+    "Duration of individual stages of write requests",
+    ["stage"]
+)
+
+GIT_COMMAND_SECONDS = Histogram(
+    "phronidoc_git_command_seconds",
+    "Duration of git invocations by subcommand",
+    ["subcommand"]
+)
+
+GIT_FAILURES = Counter(
+    "phronidoc_git_failures_total",
+    "Git invocations that exited unsuccessfully, by subcommand",
+    ["subcommand"]
+)
+
+GIT_TIMEOUTS = Counter(
+    "phronidoc_git_timeouts_total",
+    "Git invocations killed after timing out, by subcommand",
+    ["subcommand"]
+)
+
+FS_WALK_SECONDS = Histogram(
+    "phronidoc_fs_walk_seconds",
+    "Duration of directory tree walks",
+    ["scope"]
+)
+
+
+def git_subcommand(command: Sequence[str]) -> str:
+    """The subcommand of a git command line, skipping global options such as ``-c key=value``"""
+    parts = iter(command[1:] if command and command[0] == "git" else command)
+    for part in parts:
+        if part in ("-c", "-C", "--git-dir", "--work-tree"):
+            next(parts, None)
+        elif not part.startswith("-"):
+            return part
+    return "git"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request latency per route
+
+    Requests are labelled with the route's path template rather than the
+    request path, so the number of series stays bounded. Durations run until
+    the last body chunk is sent.
+
+    Args:
+        app: The ASGI application
+        histogram: Histogram with ``method``, ``route`` and ``status`` labels
+        untimed: Route templates that are not recorded, e.g. event streams
+    """
+
+    def __init__(self, app, histogram: Histogram, untimed: Sequence[str] = ()):
+        self.app = app
+        self.histogram = histogram
+        self.untimed = frozenset(untimed)
+        self._routes: Dict[Any, str] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = self._route(scope)
+            if route not in self.untimed:
+                self.histogram.labels(scope["method"], route, str(status[0])).observe(time.perf_counter() - started)
+
+    def _route(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        route = self._routes.get(endpoint)
+        if route is None:
+            app = scope.get("app")
+            for candidate in getattr(app, "routes", ()):
+                if getattr(candidate, "endpoint", None) is not None:
+                    self._routes.setdefault(candidate.endpoint, candidate.path)
+            route = self._routes.setdefault(endpoint, "unmatched")
+        return route
@@ -3,16 +3,187 @@ MkDocs configuration management utilities
 """
 
 import yaml
+import os
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any, Iterable, Tuple
+from contextlib import contextmanager
+import threading
 import logging
 import copy
+import shutil
+
+from document_index import scan_tree
+from nav_index import NavIndex, not_in_nav_patterns
+from metrics import STAGE_SECONDS
+from config import get_lock_dir
+from coordination import InterProcessLock
 
 logger = logging.getLogger(__name__)
 
 # Path to mkdocs.yml
 MKDOCS_CONFIG = Path(__file__).parent.parent.parent / "mkdocs.yml"
 
+# Serializes mkdocs.yml read-modify-write cycles across all worker processes
+MKDOCS_LOCK = InterProcessLock(get_lock_dir() / "mkdocs.lock")
+
+
+class PythonName(str):
+    """A ``!!python/name:`` reference, kept as text so it round-trips unchanged"""
+
+
+class MkdocsLoader(yaml.SafeLoader):
+    """Safe loader that tolerates the python/name tags mkdocs-material uses"""
+
+
+class MkdocsDumper(yaml.Dumper):
+    """Dumper that writes PythonName values back as python/name tags"""
+
+
+MkdocsLoader.add_multi_constructor(
+    "tag:yaml.org,2002:python/name:",
+    lambda loader, suffix, node: PythonName(suffix)
+)
+MkdocsDumper.add_representer(
+    PythonName,
+    lambda dumper, data: dumper.represent_scalar(f"tag:yaml.org,2002:python/name:{data}", "")
+)
+
+
+class MkdocsConfigCache:
+    """
+    Process-wide cache of parsed mkdocs.yml files
+
+    Entries are validated against the file's (mtime, size, inode) so an
+    unchanged file is never parsed twice. Readers share the cached object and
+    must treat it as read-only; writers use ``edit`` to get a copy-on-write
+    view, which is stored back without a re-parse once it has been written.
+    Each entry also carries a NavIndex, built on first use and carried over
+    through edits so it is only rebuilt when mkdocs.yml changes on disk.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Path, Tuple[Tuple[int, int, int], Dict[str, Any], Optional[NavIndex]]] = {}
+        self._editing: Dict[int, NavIndex] = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _stamp(path: Path) -> Tuple[int, int, int]:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def get(self, mkdocs_path: Path) -> Dict[str, Any]:
+        """
+        Return the parsed configuration (shared, do not mutate)
+
+        Raises:
+            FileNotFoundError: If mkdocs.yml does not exist
+            yaml.YAMLError: If mkdocs.yml cannot be parsed
+        """
+        stamp = self._stamp(mkdocs_path)
+        with self._lock:
+            entry = self._entries.get(mkdocs_path)
+            if entry is not None and entry[0] == stamp:
+                self.hits += 1
+                return entry[1]
+
+            self.misses += 1
+            with open(mkdocs_path, 'r', encoding='utf-8') as f:
+                config = yaml.load(f, Loader=MkdocsLoader) or {}
+            self._entries[mkdocs_path] = (stamp, config, None)
+            return config
+
+    def nav_index(self, mkdocs_path: Path) -> NavIndex:
+        """
+        NavIndex of the current navigation (shared, do not modify)
+
+        Raises:
+            FileNotFoundError: If mkdocs.yml does not exist
+        """
+        with self._lock:
+            config = self.get(mkdocs_path)
+            stamp, _, index = self._entries[mkdocs_path]
+            if index is None or not index.indexes(config.get("nav")):
+                index = NavIndex(config.get("nav"))
+                self._entries[mkdocs_path] = (stamp, config, index)
+            return index
+
+    @contextmanager
+    def edit(self, mkdocs_path: Path, keys: Iterable[str] = ("nav",)):
+        """
+        Yield a private copy of the configuration for modification
+
+        Only the given top-level keys are deep-copied; everything else is
+        shared with the cached version. The edit is serialized against other
+        edits in this and every other worker process, so the read-modify-write
+        never loses another worker's change. Call ``write_mkdocs_config`` to
+        persist it.
+        """
+        with MKDOCS_LOCK, self._lock:
+            cached = self.get(mkdocs_path)
+            config = dict(cached)
+            for key in keys:
+                if key in config:
+                    memo: Dict[int, Any] = {}
+                    config[key] = copy.deepcopy(config[key], memo)
+                    if key == "nav":
+                        # Follow the copy so nav edits can update the index in place
+                        self._editing[id(config)] = self.nav_index(mkdocs_path).rebind(config["nav"], memo)
+            try:
+                yield config
+            finally:
+                self._editing.pop(id(config), None)
+
+    def editing_index(self, config: Dict[str, Any]) -> NavIndex:
+        """NavIndex for a configuration being edited, built if the edit did not copy the nav"""
+        with self._lock:
+            index = self._editing.get(id(config))
+            if index is None or not index.indexes(config.get("nav")):
+                index = NavIndex(config.get("nav"))
+                self._editing[id(config)] = index
+            return index
+
+    def version(self, mkdocs_path: Path) -> Tuple[int, int, int]:
+        """Current (mtime, size, inode) of the file, usable as a cheap version tag"""
+        return self._stamp(mkdocs_path)
+
+    def store(self, mkdocs_path: Path, config: Dict[str, Any]) -> None:
+        """Record a configuration that was just written to disk"""
+        with self._lock:
+            index = self._editing.get(id(config))
+            if index is not None and not index.indexes(config.get("nav")):
+                index = None
+            self._entries[mkdocs_path] = (self._stamp(mkdocs_path), config, index)
+
+    def invalidate(self, mkdocs_path: Optional[Path] = None) -> None:
+        """Drop one cached entry, or all of them"""
+        with self._lock:
+            if mkdocs_path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(mkdocs_path, None)
+
+
+config_cache = MkdocsConfigCache()
+
+
+def load_config(mkdocs_path: Optional[Path] = None) -> Dict[str, Any]:
+    """
+    Get the parsed mkdocs.yml from the shared cache
+
+    The returned dictionary is shared between callers and must not be modified.
+
+    Args:
+        mkdocs_path: Path to mkdocs.yml (defaults to MKDOCS_CONFIG)
+
+    Returns:
+        Parsed configuration dictionary
+    """
+    if mkdocs_path is None:
+        mkdocs_path = MKDOCS_CONFIG
+    return config_cache.get(mkdocs_path)
+
 
 def read_navigation(mkdocs_path: Optional[Path] = None) -> Dict[str, Any]:
     """
@@ -32,8 +203,7 @@ def read_navigation(mkdocs_path: Optional[Path] = None) -> Dict[str, Any]:
         return {"nav": []}
     
     try:
-        with open(mkdocs_path, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
+        config = config_cache.get(mkdocs_path)
         
         return {
             "nav": config.get("nav", []),
@@ -60,32 +230,45 @@ def add_section_to_nav(section_name: str, section_path: str, mkdocs_path: Option
         mkdocs_path = MKDOCS_CONFIG
     
     try:
-        # Read current config
-        with open(mkdocs_path, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
-        
-        if "nav" not in config:
-            config["nav"] = []
-        
-        # Check if section already exists
-        nav = config["nav"]
-        for item in nav:
-            if isinstance(item, dict) and section_name in item:
-                logger.warning(f"Section '{section_name}' already in navigation")
+        with config_cache.edit(mkdocs_path) as config:
+            if not nav_add_section(config, section_name, section_path):
                 return False
-        
-        # Add new section
-        nav.append({section_name: f"{section_path}/index.md"})
-        
-        # Write back
-        write_mkdocs_config(config, mkdocs_path)
-        
-        return True
+            
+            # Write back
+            return write_mkdocs_config(config, mkdocs_path)
     except Exception as e:
         logger.error(f"Error adding section to navigation: {e}")
         return False
 
 
+def nav_add_section(config: Dict[str, Any], section_name: str, section_path: str) -> bool:
+    """
+    Add a section to the navigation of a configuration, in place
+    
+    Args:
+        config: Private configuration copy (see MkdocsConfigCache.edit)
+        section_name: Display name for the section
+        section_path: Path to the section directory
+    
+    Returns:
+        True if the section was added, False if it already exists
+    """
+    if "nav" not in config:
+        config["nav"] = []
+    index = config_cache.editing_index(config)
+    
+    # Check if section already exists
+    if index.section(section_name) is not None:
+        logger.warning(f"Section '{section_name}' already in navigation")
+        return False
+    
+    # Add new section
+    item = {section_name: f"{section_path}/index.md"}
+    config["nav"].append(item)
+    index.add((), item)
+    return True
+
+
 def add_subsection_to_nav(
     section: str,
     subsection_name: str,
@@ -108,45 +291,65 @@ def add_subsection_to_nav(
         mkdocs_path = MKDOCS_CONFIG
     
     try:
-        # Read current config
-        with open(mkdocs_path, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
-        
-        if "nav" not in config:
-            config["nav"] = []
-        
-        nav = config["nav"]
-        
-        # Find the parent section
-        for item in nav:
-            if isinstance(item, dict) and section in item:
-                section_nav = item[section]
-                
-                # If section nav is a string, convert to list
-                if isinstance(section_nav, str):
-                    section_nav = [{"Overview": section_nav}]
-                    item[section] = section_nav
-                
-                # Check if subsection already exists
-                for sub_item in section_nav:
-                    if isinstance(sub_item, dict) and subsection_name in sub_item:
-                        logger.warning(f"Sub-section '{subsection_name}' already in navigation")
-                        return False
-                
-                # Add sub-section
-                section_nav.append({subsection_name: f"{subsection_path}/index.md"})
-                
-                # Write back
-                write_mkdocs_config(config, mkdocs_path)
-                return True
-        
-        logger.warning(f"Parent section '{section}' not found in navigation")
-        return False
+        with config_cache.edit(mkdocs_path) as config:
+            if not nav_add_subsection(config, section, subsection_name, subsection_path):
+                return False
+            
+            # Write back
+            return write_mkdocs_config(config, mkdocs_path)
     except Exception as e:
         logger.error(f"Error adding subsection to navigation: {e}")
         return False
 
 
+def nav_add_subsection(config: Dict[str, Any], section: str, subsection_name: str, subsection_path: str) -> bool:
+    """
+    Add a sub-section to a section's navigation of a configuration, in place
+    
+    Args:
+        config: Private configuration copy (see MkdocsConfigCache.edit)
+        section: Parent section name
+        subsection_name: Display name for sub-section
+        subsection_path: Path to sub-section (e.g., "engineering/api")
+    
+    Returns:
+        True if the sub-section was added, False otherwise
+    """
+    if "nav" not in config:
+        config["nav"] = []
+    index = config_cache.editing_index(config)
+    
+    # Find the parent section
+    item = index.section(section)
+    if item is None:
+        logger.warning(f"Parent section '{section}' not found in navigation")
+        return False
+    
+    section_nav = item[section]
+    
+    # If section nav is a string, convert to list
+    if isinstance(section_nav, str):
+        overview = {"Overview": section_nav}
+        section_nav = [overview]
+        item[section] = section_nav
+        index.move(overview["Overview"], ((), section), ((section,), "Overview"))
+        index.subsections[(section, "Overview")] = overview
+    elif not isinstance(section_nav, list):
+        section_nav = []
+        item[section] = section_nav
+    
+    # Check if subsection already exists
+    if index.subsection(section, subsection_name) is not None:
+        logger.warning(f"Sub-section '{subsection_name}' already in navigation")
+        return False
+    
+    # Add sub-section
+    sub_item = {subsection_name: f"{subsection_path}/index.md"}
+    section_nav.append(sub_item)
+    index.add((section,), sub_item)
+    return True
+
+
 def update_navigation(nav_structure: List[Any], mkdocs_path: Optional[Path] = None) -> bool:
     """
     Replace the entire navigation structure
@@ -162,29 +365,36 @@ def update_navigation(nav_structure: List[Any], mkdocs_path: Optional[Path] = No
         mkdocs_path = MKDOCS_CONFIG
     
     try:
-        # Read current config
-        with open(mkdocs_path, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
-        
-        # Update navigation
-        config["nav"] = nav_structure
-        
-        # Write back
-        write_mkdocs_config(config, mkdocs_path)
-        
-        return True
+        with config_cache.edit(mkdocs_path, keys=()) as config:
+            # Update navigation
+            config["nav"] = nav_structure
+            
+            # Write back
+            return write_mkdocs_config(config, mkdocs_path)
     except Exception as e:
         logger.error(f"Error updating navigation: {e}")
         return False
 
 
-def validate_navigation(mkdocs_path: Optional[Path] = None, docs_dir: Optional[Path] = None) -> Dict[str, Any]:
+def validate_navigation(
+    mkdocs_path: Optional[Path] = None,
+    docs_dir: Optional[Path] = None,
+    documents: Optional[Iterable[str]] = None,
+    directories: Optional[Iterable[str]] = None
+) -> Dict[str, Any]:
     """
-    Validate that all navigation entries point to existing files
+    Validate the navigation against the documents in the docs directory
+    
+    Reports nav entries pointing to missing files or to directories, targets
+    listed more than once, and documents missing from the nav (``orphaned``,
+    honouring mkdocs' ``not_in_nav``).
     
     Args:
         mkdocs_path: Path to mkdocs.yml (defaults to MKDOCS_CONFIG)
         docs_dir: Base docs directory
+        documents: Paths of all markdown documents, relative to docs_dir
+            (scanned from disk if omitted)
+        directories: Paths of all directories, relative to docs_dir
     
     Returns:
         Dictionary with validation results
@@ -195,47 +405,47 @@ def validate_navigation(mkdocs_path: Optional[Path] = None, docs_dir: Optional[P
     if docs_dir is None:
         docs_dir = Path(__file__).parent.parent.parent / "docs"
     
-    result = {
-        "valid": True,
-        "errors": [],
-        "warnings": [],
-        "orphaned": []
-    }
-    
     try:
-        nav_data = read_navigation(mkdocs_path)
-        nav = nav_data.get("nav", [])
-        
-        def validate_nav_item(item: Any, path_prefix: str = ""):
-            """Recursively validate navigation items"""
-            if isinstance(item, dict):
-                for key, value in item.items():
-                    if isinstance(value, str):
-                        # It's a file path
-                        file_path = docs_dir / value
-                        if not file_path.exists():
-                            result["valid"] = False
-                            result["errors"].append(f"Navigation item '{key}' points to non-existent file: {value}")
-                    elif isinstance(value, list):
-                        # It's a nested structure
-                        validate_nav_item(value, f"{path_prefix}/{key}")
-            elif isinstance(item, list):
-                for sub_item in item:
-                    validate_nav_item(sub_item, path_prefix)
-            elif isinstance(item, str):
-                # Direct file reference
-                file_path = docs_dir / item
-                if not file_path.exists():
-                    result["warnings"].append(f"File not found: {item}")
+        if documents is None or directories is None:
+            root = scan_tree(docs_dir)
+            documents = (path for path, _ in root.walk_documents(""))
+            directories = root.walk_directories("")
         
-        validate_nav_item(nav)
+        if not mkdocs_path.exists():
+            logger.error(f"mkdocs.yml not found at {mkdocs_path}")
+            index, patterns = NavIndex([]), []
+        else:
+            index = config_cache.nav_index(mkdocs_path)
+            patterns = not_in_nav_patterns(config_cache.get(mkdocs_path))
         
+        return index.validate(
+            set(documents),
+            set(directories),
+            exists=lambda target: (docs_dir / target).exists(),
+            not_in_nav=patterns
+        )
     except Exception as e:
         logger.error(f"Error validating navigation: {e}")
-        result["valid"] = False
-        result["errors"].append(f"Validation error: {str(e)}")
-    
-    return result
+        return {
+            "valid": False,
+            "errors": [f"Validation error: {str(e)}"],
+            "warnings": [],
+            "orphaned": []
+        }
+
+
+def _replace_mkdocs_file(mkdocs_path: Path, write: Callable[[Path], None]) -> None:
+    """Write mkdocs.yml through a temporary file, so other workers never read it half-written"""
+    target = Path(os.path.realpath(mkdocs_path))
+    tmp_file = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    try:
+        write(tmp_file)
+        if target.exists():
+            shutil.copymode(target, tmp_file)
+        os.replace(tmp_file, target)
+    finally:
+        if tmp_file.exists():
+            tmp_file.unlink()
 
 
 def write_mkdocs_config(config: Dict[str, Any], mkdocs_path: Optional[Path] = None) -> bool:
@@ -251,24 +461,58 @@ def write_mkdocs_config(config: Dict[str, Any], mkdocs_path: Optional[Path] = No
     """
     if mkdocs_path is None:
         mkdocs_path = MKDOCS_CONFIG
-    
-    try:
-        # Write updated config with proper YAML formatting
-        with open(mkdocs_path, 'w', encoding='utf-8') as f:
+
+    def dump(tmp_file: Path) -> None:
+        with open(tmp_file, 'w', encoding='utf-8') as f:
             yaml.dump(
                 config,
                 f,
+                Dumper=MkdocsDumper,
                 default_flow_style=False,
                 allow_unicode=True,
                 sort_keys=False,
                 indent=2,
                 width=1000
             )
+
+    try:
+        with STAGE_SECONDS.labels("nav_write").time():
+            _replace_mkdocs_file(mkdocs_path, dump)
+        
+        # Keep the cache current without re-parsing what we just wrote
+        config_cache.store(mkdocs_path, config)
         
         return True
     except Exception as e:
         logger.error(f"Error writing mkdocs.yml: {e}")
+        config_cache.invalidate(mkdocs_path)
+        return False
+
+
+def restore_mkdocs_config(data: bytes, mkdocs_path: Optional[Path] = None) -> bool:
+    """
+    Put back an earlier copy of mkdocs.yml byte for byte
+
+    The caller must hold MKDOCS_LOCK since the copy was taken, or edits
+    made in between are lost.
+
+    Args:
+        data: Earlier content of mkdocs.yml
+        mkdocs_path: Path to mkdocs.yml (defaults to MKDOCS_CONFIG)
+
+    Returns:
+        True if successful, False otherwise
+    """
+    if mkdocs_path is None:
+        mkdocs_path = MKDOCS_CONFIG
+    try:
+        _replace_mkdocs_file(mkdocs_path, lambda tmp_file: tmp_file.write_bytes(data))
+        return True
+    except OSError as e:
+        logger.error(f"Error restoring mkdocs.yml: {e}")
         return False
+    finally:
+        config_cache.invalidate(mkdocs_path)
 
 
 def remove_section_from_nav(section_name: str, mkdocs_path: Optional[Path] = None) -> bool:
@@ -286,27 +530,40 @@ def remove_section_from_nav(section_name: str, mkdocs_path: Optional[Path] = Non
         mkdocs_path = MKDOCS_CONFIG
     
     try:
-        # Read current config
-        with open(mkdocs_path, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
-        
-        if "nav" not in config:
-            return False
-        
-        nav = config["nav"]
-        
-        # Remove section
-        config["nav"] = [item for item in nav if not (isinstance(item, dict) and section_name in item)]
-        
-        # Write back
-        write_mkdocs_config(config, mkdocs_path)
-        
-        return True
+        with config_cache.edit(mkdocs_path, keys=()) as config:
+            if not nav_remove_section(config, section_name):
+                return False
+            
+            # Write back
+            return write_mkdocs_config(config, mkdocs_path)
     except Exception as e:
         logger.error(f"Error removing section from navigation: {e}")
         return False
 
 
+def nav_remove_section(config: Dict[str, Any], section_name: str) -> bool:
+    """
+    Remove a section from the navigation of a configuration, in place
+    
+    Args:
+        config: Private configuration copy (see MkdocsConfigCache.edit)
+        section_name: Label or directory name of the section to remove
+    
+    Returns:
+        True if the configuration has a navigation, False otherwise
+    """
+    if "nav" not in config:
+        return False
+    index = config_cache.editing_index(config)
+    # Accept the section's directory name too, as used in API paths
+    section_name = index.label_for((), section_name, section_name) or section_name
+    
+    config["nav"] = [item for item in config["nav"] if not (isinstance(item, dict) and section_name in item)]
+    index.remove((section_name,))
+    index.nav = config["nav"]
+    return True
+
+
 def remove_subsection_from_nav(section: str, subsection_name: str, mkdocs_path: Optional[Path] = None) -> bool:
     """
     Remove a sub-section from navigation
@@ -323,32 +580,47 @@ def remove_subsection_from_nav(section: str, subsection_name: str, mkdocs_path:
         mkdocs_path = MKDOCS_CONFIG
     
     try:
-        # Read current config
-        with open(mkdocs_path, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
-        
-        if "nav" not in config:
-            return False
-        
-        nav = config["nav"]
-        
-        # Find and update parent section
-        for item in nav:
-            if isinstance(item, dict) and section in item:
-                section_nav = item[section]
-                
-                if isinstance(section_nav, list):
-                    # Remove subsection
-                    item[section] = [
-                        sub_item for sub_item in section_nav
-                        if not (isinstance(sub_item, dict) and subsection_name in sub_item)
-                    ]
-                
-                # Write back
-                write_mkdocs_config(config, mkdocs_path)
-                return True
-        
-        return False
+        with config_cache.edit(mkdocs_path) as config:
+            if not nav_remove_subsection(config, section, subsection_name):
+                return False
+            
+            # Write back
+            return write_mkdocs_config(config, mkdocs_path)
     except Exception as e:
         logger.error(f"Error removing subsection from navigation: {e}")
         return False
+
+
+def nav_remove_subsection(config: Dict[str, Any], section: str, subsection_name: str) -> bool:
+    """
+    Remove a sub-section from the navigation of a configuration, in place
+    
+    Args:
+        config: Private configuration copy (see MkdocsConfigCache.edit)
+        section: Parent section label or directory name
+        subsection_name: Label or directory name of the sub-section to remove
+    
+    Returns:
+        True if the parent section was found, False otherwise
+    """
+    if "nav" not in config:
+        return False
+    index = config_cache.editing_index(config)
+    
+    # Find and update parent section, by label or directory name
+    directory = section
+    section = index.label_for((), section, directory) or section
+    item = index.section(section)
+    if item is None:
+        return False
+    subsection_name = index.label_for((section,), subsection_name, f"{directory}/{subsection_name}") or subsection_name
+    
+    section_nav = item[section]
+    if isinstance(section_nav, list):
+        # Remove subsection
+        item[section] = [
+            sub_item for sub_item in section_nav
+            if not (isinstance(sub_item, dict) and subsection_name in sub_item)
+        ]
+        index.remove((section, subsection_name))
+    return True
@@ -0,0 +1,227 @@
+"""
+Index over the mkdocs.yml navigation
+
+Maps section and sub-section labels to their nav items and every nav target
+to the places it appears, so navigation edits find their parent in O(1) and
+validation compares the nav against the document set with set operations
+instead of touching the filesystem once per entry.
+"""
+
+import fnmatch
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+# (labels of the enclosing sections, own label or None for a bare path)
+NavLocation = Tuple[Tuple[str, ...], Optional[str]]
+
+
+def is_external(target: str) -> bool:
+    """Whether a nav target is a link rather than a file in the docs directory"""
+    return "://" in target or target.startswith(("mailto:", "#"))
+
+
+def not_in_nav_patterns(config: Dict[str, Any]) -> List[str]:
+    """Patterns from the mkdocs ``not_in_nav`` option (one per line)"""
+    value = config.get("not_in_nav") or ""
+    lines = value.splitlines() if isinstance(value, str) else list(value)
+    return [line.strip() for line in lines if line.strip() and not line.strip().startswith("#")]
+
+
+def _excluded(path: str, patterns: List[str]) -> bool:
+    """gitignore-style match: a pattern with a slash is anchored, a trailing slash matches directories"""
+    directories = path.split("/")[:-1]
+    for pattern in patterns:
+        is_directory = pattern.endswith("/")
+        anchored = "/" in pattern.rstrip("/")
+        pattern = pattern.strip("/")
+        if is_directory:
+            if anchored:
+                candidates = ["/".join(directories[:depth]) for depth in range(1, len(directories) + 1)]
+            else:
+                candidates = directories
+        else:
+            candidates = [path] if anchored else [path.rsplit("/", 1)[-1]]
+        if any(fnmatch.fnmatchcase(candidate, pattern) for candidate in candidates):
+            return True
+    return False
+
+
+class NavIndex:
+    """
+    Lookup tables for one navigation list
+
+    The index holds references into the nav it was built from. Edits made
+    through the ``nav_*`` helpers in mkdocs_utils keep it current; anything
+    else that replaces the nav list makes it stale (see ``indexes``).
+
+    Args:
+        nav: The ``nav`` list of a parsed mkdocs.yml
+    """
+
+    def __init__(self, nav: Optional[List[Any]]):
+        self.nav = nav
+        self.sections: Dict[str, Dict] = {}
+        self.subsections: Dict[Tuple[str, str], Dict] = {}
+        self.targets: Dict[str, List[NavLocation]] = {}
+        if nav:
+            self._walk(nav, ())
+
+    def indexes(self, nav: Optional[List[Any]]) -> bool:
+        """Whether this index describes the given nav list"""
+        return self.nav is nav
+
+    def section(self, label: str) -> Optional[Dict]:
+        """Top-level nav item with this label"""
+        return self.sections.get(label)
+
+    def subsection(self, section: str, label: str) -> Optional[Dict]:
+        """Nav item with this label directly inside a section"""
+        return self.subsections.get((section, label))
+
+    def label_for(self, parents: Tuple[str, ...], name: str, directory: str) -> Optional[str]:
+        """
+        Label of a section or sub-section, given its label or its directory
+
+        Args:
+            parents: Labels of the enclosing sections (empty for a section)
+            name: Label, or directory name as used in API paths
+            directory: Directory path whose index.md the entry points to
+        """
+        if (not parents and name in self.sections) or (len(parents) == 1 and (parents[0], name) in self.subsections):
+            return name
+        for trail, label in self.targets.get(f"{directory}/index.md", ()):
+            if trail == parents and label is not None:
+                return label
+            if len(trail) == len(parents) + 1 and trail[:-1] == parents:
+                # The index page listed inside the entry, e.g. as its "Overview"
+                return trail[-1]
+        return None
+
+    def add(self, trail: Tuple[str, ...], item: Dict) -> None:
+        """Record a nav item that was appended inside the given sections"""
+        self._walk([item], trail)
+
+    def remove(self, trail: Tuple[str, ...]) -> None:
+        """Forget a section or sub-section and everything below it"""
+        depth = len(trail)
+        for target in list(self.targets):
+            kept = [
+                (parents, label) for parents, label in self.targets[target]
+                if (parents + (label,))[:depth] != trail
+            ]
+            if kept:
+                self.targets[target] = kept
+            else:
+                del self.targets[target]
+        if depth == 1:
+            self.sections.pop(trail[0], None)
+            for key in [key for key in self.subsections if key[0] == trail[0]]:
+                del self.subsections[key]
+        elif depth == 2:
+            self.subsections.pop(trail, None)
+
+    def move(self, target: str, old: NavLocation, new: NavLocation) -> None:
+        """Record that a target now appears at a different place"""
+        locations = self.targets.get(target, [])
+        if old in locations:
+            locations.remove(old)
+        self.targets.setdefault(target, locations).append(new)
+
+    def rebind(self, nav: List[Any], memo: Dict[int, Any]) -> "NavIndex":
+        """
+        Index for a deep copy of the nav, without walking it again
+
+        Args:
+            nav: The copy
+            memo: The ``copy.deepcopy`` memo used to make it
+        """
+        index = NavIndex(None)
+        index.nav = nav
+        index.sections = {label: memo.get(id(item), item) for label, item in self.sections.items()}
+        index.subsections = {key: memo.get(id(item), item) for key, item in self.subsections.items()}
+        index.targets = {target: list(locations) for target, locations in self.targets.items()}
+        return index
+
+    def validate(
+        self,
+        documents: Set[str],
+        directories: Set[str],
+        exists: Callable[[str], bool],
+        not_in_nav: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Compare the nav with the documents on disk
+
+        Args:
+            documents: Paths of all markdown documents
+            directories: Paths of all directories
+            exists: Existence check for targets that are not markdown files
+            not_in_nav: mkdocs ``not_in_nav`` patterns exempt from orphan checks
+
+        Returns:
+            Dictionary with ``valid``, ``errors``, ``warnings``, ``orphaned``
+            (documents not in the nav), ``duplicates`` (targets listed more
+            than once), ``directory_targets`` and ``missing``
+        """
+        local = {target for target in self.targets if not is_external(target)}
+        directory_targets = {
+            target for target in local
+            if target.endswith("/") or target.rstrip("/") in directories
+        }
+        candidates = local - directory_targets - documents
+        missing = {target for target in candidates if target.endswith(".md") or not exists(target)}
+
+        errors = []
+        warnings = []
+        for target in sorted(missing):
+            for trail, label in self.targets[target]:
+                if label is None:
+                    warnings.append(f"File not found: {target}")
+                else:
+                    errors.append(f"Navigation item '{label}' points to non-existent file: {target}")
+        for target in sorted(directory_targets):
+            for trail, label in self.targets[target]:
+                errors.append(f"Navigation item '{label or target}' points to a directory: {target}")
+
+        duplicates = {
+            target: [" / ".join(trail + ((label,) if label else ())) for trail, label in locations]
+            for target, locations in sorted(self.targets.items())
+            if len(locations) > 1
+        }
+        for target, places in duplicates.items():
+            warnings.append(f"'{target}' appears {len(places)} times in navigation")
+
+        orphaned = []
+        if self.targets:
+            # Without a nav, mkdocs builds one from the tree and nothing is orphaned
+            unlisted = documents - local
+            if not_in_nav:
+                unlisted = {path for path in unlisted if not _excluded(path, not_in_nav)}
+            orphaned = sorted(unlisted)
+
+        return {
+            "valid": not errors,
+            "errors": errors,
+            "warnings": warnings,
+            "orphaned": orphaned,
+            "duplicates": duplicates,
+            "directory_targets": sorted(directory_targets),
+            "missing": sorted(missing)
+        }
+
+    # Internals
+
+    def _walk(self, items: List[Any], trail: Tuple[str, ...]) -> None:
+        for item in items:
+            if isinstance(item, str):
+                self.targets.setdefault(item, []).append((trail, None))
+            elif isinstance(item, dict):
+                for label, value in item.items():
+                    label = str(label)
+                    if not trail:
+                        self.sections.setdefault(label, item)
+                    elif len(trail) == 1:
+                        self.subsections.setdefault((trail[0], label), item)
+                    if isinstance(value, str):
+                        self.targets.setdefault(value, []).append((trail, label))
+                    elif isinstance(value, list):
+                        self._walk(value, trail + (label,))
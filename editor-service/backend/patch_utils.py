@@ -0,0 +1,171 @@
+"""
+Line-range edits and unified diffs for incremental document updates
+
+Patches are made against a known base version of a document. Edits are
+expressed in lines of the base (0-based, half-open ranges); a unified diff
+is converted into the same form after its context has been verified.
+
+Only ``\n`` ends a line, as in the editor's own line diff. ``str.splitlines``
+also breaks on form feeds, U+2028 and other separators, which would number
+lines differently from the client and replace the wrong ones.
+"""
+
+import re
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+HUNK_RE = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+LINE_RE = re.compile(r"[^\n]*\n|[^\n]+\Z")
+
+
+class PatchError(ValueError):
+    """A patch does not apply to the base document"""
+
+
+def split_lines(text: str) -> List[str]:
+    """Lines of a text, each with its line ending, split on ``\n`` only"""
+    return LINE_RE.findall(text)
+
+
+def line_ending(text: str) -> str:
+    """``"\r\n"`` if every line of a text ends with CRLF, otherwise ``"\n"``"""
+    breaks = text.count("\n")
+    return "\r\n" if breaks and text.count("\r\n") == breaks else "\n"
+
+
+def with_line_ending(edits: List[Dict], newline: str) -> List[Dict]:
+    """
+    Edits whose replacement text uses the given line ending
+
+    Clients edit the LF-normalized content served by GET; this keeps a CRLF
+    document CRLF throughout.
+    """
+    if newline == "\n":
+        return edits
+    return [
+        {**edit, "text": edit["text"].replace("\r\n", "\n").replace("\n", newline)}
+        for edit in edits
+    ]
+
+
+def apply_line_edits(text: str, edits: List[Dict]) -> Tuple[str, int]:
+    """
+    Replace line ranges of a document
+
+    Args:
+        text: Base document
+        edits: Dictionaries with ``start`` and ``end`` (0-based line range of
+            the base, end exclusive) and ``text`` (replacement, including
+            line endings). Ranges must not overlap.
+
+    Returns:
+        Tuple of (new document, index of the first changed line)
+
+    Raises:
+        PatchError: If a range is out of bounds or ranges overlap
+    """
+    lines = split_lines(text)
+    if not edits:
+        return text, len(lines)
+
+    ordered = sorted(enumerate(edits), key=lambda item: (item[1]["start"], item[0]))
+    parts = []
+    position = 0
+    for _, edit in ordered:
+        start, end = edit["start"], edit["end"]
+        if not 0 <= start <= end <= len(lines):
+            raise PatchError(f"Line range {start}-{end} is outside the document ({len(lines)} lines)")
+        if start < position:
+            raise PatchError(f"Line range {start}-{end} overlaps a previous edit")
+        parts.extend(lines[position:start])
+        parts.append(edit["text"])
+        position = end
+    parts.extend(lines[position:])
+
+    return "".join(parts), ordered[0][1]["start"]
+
+
+def diff_to_edits(text: str, diff: str) -> List[Dict]:
+    """
+    Convert a unified diff into line edits, verifying it against the base
+
+    Args:
+        text: Base document
+        diff: Unified diff (file headers are optional)
+
+    Returns:
+        Line edits for apply_line_edits
+
+    Raises:
+        PatchError: If the diff is malformed or its context does not match
+    """
+    base = split_lines(text)
+    edits = []
+    hunk = None
+
+    def finish(hunk):
+        start, old_count, old_lines, new_lines = hunk
+        if len(old_lines) != old_count:
+            raise PatchError(f"Hunk at line {start + 1} expects {old_count} line(s), found {len(old_lines)}")
+        actual = base[start:start + old_count]
+        if [line.rstrip("\r\n") for line in actual] != [line.rstrip("\r\n") for line in old_lines]:
+            raise PatchError(f"Hunk at line {start + 1} does not match the document")
+        edits.append({"start": start, "end": start + old_count, "text": "".join(new_lines)})
+
+    last: Tuple[List[str], ...] = ()
+    for line in split_lines(diff):
+        match = HUNK_RE.match(line)
+        if match:
+            if hunk is not None:
+                finish(hunk)
+            old_start = int(match.group(1))
+            old_count = int(match.group(2)) if match.group(2) is not None else 1
+            # A zero-length hunk inserts after line old_start
+            start = old_start if old_count == 0 else old_start - 1
+            hunk = (start, old_count, [], [])
+            last = ()
+        elif hunk is None:
+            # File headers and anything else before the first hunk
+            continue
+        elif line.startswith("\\"):
+            # "\ No newline at end of file" applies to the previous line
+            for target in last:
+                target[-1] = target[-1][:-1]
+        else:
+            kind, content = line[:1], line[1:]
+            if line in ("\n", "\r\n"):
+                # Some tools drop the space of empty context lines
+                kind, content = " ", "\n"
+            if kind not in " -+":
+                raise PatchError(f"Unexpected line in diff: {line.rstrip()!r}")
+            if not content.endswith("\n"):
+                content += "\n"
+            last = {" ": (hunk[2], hunk[3]), "-": (hunk[2],), "+": (hunk[3],)}[kind]
+            for target in last:
+                target.append(content)
+
+    if hunk is None:
+        raise PatchError("Diff contains no hunks")
+    finish(hunk)
+    return edits
+
+
+def write_changed_suffix(path: Path, old: bytes, new: bytes, prefix_length: int) -> int:
+    """
+    Rewrite a file from the first changed byte onwards
+
+    Args:
+        path: File currently containing ``old``
+        old: Current content
+        new: New content
+        prefix_length: Number of leading bytes known to be identical
+
+    Returns:
+        Number of bytes written
+    """
+    prefix_length = min(prefix_length, len(old), len(new))
+    with open(path, "r+b") as f:
+        f.seek(prefix_length)
+        f.write(new[prefix_length:])
+        f.truncate()
+    return len(new) - prefix_length
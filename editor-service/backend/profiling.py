@@ -0,0 +1,389 @@
+"""
+Opt-in profiling of individual requests
+
+A profiled request runs under cProfile on the event loop thread and in
+every worker thread that does blocking work for it (run_fs / run_git), and
+the git subprocesses it starts are timed separately, since a profiler only
+sees a thread waiting on them. Profiles are kept in a bounded ring buffer
+and can be downloaded as pstats data or as a speedscope file.
+
+The event loop profile also covers whatever other requests the loop serves
+in the meantime, and only one request at a time gets one; others profiled
+concurrently are recorded without it.
+"""
+
+import hmac
+import json
+import time
+import uuid
+import marshal
+import pstats
+import cProfile
+import threading
+import contextvars
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+PSTATS_MEDIA_TYPE = "application/octet-stream"
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+# Calls that are the event loop waiting for I/O rather than running Python
+_LOOP_WAITS = ("<method 'poll' of 'select.epoll' objects>", "<method 'control' of 'select.kqueue' objects>",
+               "<method 'select' of 'select' objects>")
+
+# Call tree branches below this share of the total are folded into their parent
+_MIN_SHARE = 0.001
+_MAX_DEPTH = 128
+
+_current: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar("request_profile", default=None)
+_loop_profiler_lock = threading.Lock()
+
+
+def current_profile() -> Optional["RequestProfile"]:
+    """The profile of the request being handled, if it is profiled"""
+    return _current.get()
+
+
+def record_subprocess(command: Sequence[str], started: float, duration: float, blocking: bool) -> None:
+    """
+    Note a subprocess run for the current request, if it is profiled
+
+    Args:
+        command: Command line
+        started: time.perf_counter() at start
+        duration: Wall time in seconds
+        blocking: Whether a worker thread waited for it (as opposed to the event loop)
+    """
+    profile = _current.get()
+    if profile is not None:
+        profile.add_subprocess(command, started, duration, blocking)
+
+
+def profiled(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap blocking work so it is profiled in its worker thread if the request is"""
+    profile = _current.get()
+    if profile is None:
+        return func
+
+    def run(*args, **kwargs):
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(func, *args, **kwargs)
+        finally:
+            profile.add_profiler(profiler, loop=False)
+    return run
+
+
+class RequestProfile:
+    """
+    Profiling data of one request
+
+    Args:
+        method: HTTP method
+        path: Request path
+        reason: "requested" (header or flag) or "slow"
+    """
+
+    def __init__(self, method: str, path: str, reason: str = "requested"):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.reason = reason
+        self.status: Optional[int] = None
+        self.started = time.perf_counter()
+        self.started_at = datetime.now().isoformat()
+        self.wall = 0.0
+        self.loop_profiled = False
+        self._lock = threading.Lock()
+        self._profilers: List[Tuple[cProfile.Profile, bool]] = []
+        self.subprocesses: List[Dict[str, Any]] = []
+        self.stats: Dict[Tuple, Tuple] = {}
+        self.loop_wait = 0.0
+
+    def add_profiler(self, profiler: cProfile.Profile, loop: bool) -> None:
+        with self._lock:
+            self._profilers.append((profiler, loop))
+
+    def add_subprocess(self, command: Sequence[str], started: float, duration: float, blocking: bool) -> None:
+        with self._lock:
+            self.subprocesses.append({
+                "command": " ".join(command),
+                "start": max(0.0, started - self.started),
+                "duration": duration,
+                "blocking": blocking
+            })
+
+    def finish(self, status: Optional[int]) -> None:
+        """Stop timing and merge the collected profilers"""
+        self.wall = time.perf_counter() - self.started
+        self.status = status
+        with self._lock:
+            profilers = list(self._profilers)
+            self._profilers = []
+        merged: Optional[pstats.Stats] = None
+        for profiler, loop in profilers:
+            stats = pstats.Stats(profiler)
+            if loop:
+                self.loop_wait += sum(
+                    entry[2] for func, entry in stats.stats.items() if func[0] == "~" and func[2] in _LOOP_WAITS
+                )
+            if merged is None:
+                merged = stats
+            else:
+                merged.add(stats)
+        self.stats = merged.stats if merged is not None else {}
+
+    def summary(self) -> Dict[str, Any]:
+        """Timing overview of the request"""
+        profiled = sum(entry[2] for entry in self.stats.values())
+        subprocess_time = sum(span["duration"] for span in self.subprocesses)
+        # Worker threads wait inside Python for blocking subprocesses; the
+        # event loop waits for asynchronous ones in its selector
+        waiting = self.loop_wait + sum(span["duration"] for span in self.subprocesses if span["blocking"])
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "reason": self.reason,
+            "started_at": self.started_at,
+            "wall_ms": round(self.wall * 1000, 3),
+            "python_ms": round(max(0.0, profiled - waiting) * 1000, 3),
+            "subprocess_ms": round(subprocess_time * 1000, 3),
+            "subprocesses": len(self.subprocesses),
+            "loop_profiled": self.loop_profiled
+        }
+
+    # Export
+
+    def to_pstats(self) -> bytes:
+        """Profile in the format written by ``pstats.Stats.dump_stats``"""
+        return marshal.dumps(self.stats)
+
+    def to_speedscope(self) -> str:
+        """
+        Profile as a speedscope file
+
+        The Python profile is a call tree reconstructed from cProfile's
+        caller/callee times, so time is split between call paths in
+        proportion to each edge. Subprocesses are a separate timeline.
+        """
+        frames: List[Dict[str, Any]] = []
+        frame_ids: Dict[Any, int] = {}
+
+        def frame(key: Any, name: str, file: Optional[str] = None, line: Optional[int] = None) -> int:
+            index = frame_ids.get(key)
+            if index is None:
+                index = frame_ids[key] = len(frames)
+                entry: Dict[str, Any] = {"name": name}
+                if file and file != "~":
+                    entry["file"] = file
+                    entry["line"] = line
+                frames.append(entry)
+            return index
+
+        samples, weights = self._call_tree(lambda func: frame(func, func[2], func[0], func[1]))
+        profiles: List[Dict[str, Any]] = [{
+            "type": "sampled",
+            "name": f"{self.method} {self.path} (Python)",
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": samples,
+            "weights": weights
+        }]
+
+        # Overlapping subprocesses go to separate lanes so each timeline nests
+        lanes: List[List[Dict[str, Any]]] = []
+        for span in sorted(self.subprocesses, key=lambda span: span["start"]):
+            for lane in lanes:
+                if lane[-1]["start"] + lane[-1]["duration"] <= span["start"]:
+                    lane.append(span)
+                    break
+            else:
+                lanes.append([span])
+        for number, lane in enumerate(lanes):
+            events = []
+            for span in lane:
+                index = frame(("subprocess", span["command"]), span["command"])
+                events.append({"type": "O", "frame": index, "at": span["start"]})
+                events.append({"type": "C", "frame": index, "at": span["start"] + span["duration"]})
+            profiles.append({
+                "type": "evented",
+                "name": f"Subprocesses ({number + 1})" if len(lanes) > 1 else "Subprocesses",
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": max(self.wall, events[-1]["at"]),
+                "events": events
+            })
+
+        return json.dumps({
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": f"{self.method} {self.path}",
+            "exporter": "phronidoc-editor",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": profiles
+        })
+
+    def _call_tree(self, frame: Callable[[Tuple], int]) -> Tuple[List[List[int]], List[float]]:
+        stats = self.stats
+        callees: Dict[Tuple, List[Tuple[Tuple, float]]] = {}
+        roots = []
+        for func, (_, _, _, _, callers) in stats.items():
+            known = [caller for caller in callers if caller in stats]
+            if not known:
+                roots.append(func)
+            for caller in known:
+                callees.setdefault(caller, []).append((func, callers[caller][3]))
+
+        total = sum(stats[func][3] for func in roots) or 1.0
+        minimum = total * _MIN_SHARE
+        samples: List[List[int]] = []
+        weights: List[float] = []
+
+        def expand(func: Tuple, weight: float, stack: List[Tuple]) -> None:
+            cumulative = stats[func][3]
+            scale = weight / cumulative if cumulative else 0.0
+            children = 0.0
+            if len(stack) < _MAX_DEPTH:
+                for callee, edge_time in callees.get(func, ()):
+                    share = edge_time * scale
+                    if share < minimum or callee in stack:
+                        continue
+                    stack.append(callee)
+                    expand(callee, share, stack)
+                    stack.pop()
+                    children += share
+            own = weight - children
+            if own >= minimum:
+                samples.append([frame(item) for item in stack])
+                weights.append(own)
+
+        for root in roots:
+            if stats[root][3] >= minimum:
+                expand(root, stats[root][3], [root])
+        return samples, weights
+
+
+class ProfileStore:
+    """
+    Ring buffer of recent profiles
+
+    Args:
+        history: Number of profiles kept
+    """
+
+    def __init__(self, history: int = 20):
+        self.history = history
+        self._profiles: "OrderedDict[str, RequestProfile]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > self.history:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Summaries, newest first"""
+        with self._lock:
+            profiles = list(self._profiles.values())
+        return [profile.summary() for profile in reversed(profiles)]
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles selected requests
+
+    A request is profiled when it carries the profiling header with the
+    configured token, or when ``profile_all`` is set. Requested profiles are
+    always kept and their id returned in the ``X-Profile-Id`` response
+    header; with ``profile_all`` only requests slower than ``slow`` seconds
+    are kept.
+
+    Args:
+        app: The ASGI application
+        store: Where finished profiles go
+        token: Value of the ``X-Profile`` header that enables profiling (None disables the header)
+        profile_all: Profile every request
+        slow: Minimum duration of automatically profiled requests that are kept
+        skip: Path prefixes never profiled, e.g. event streams
+    """
+
+    def __init__(
+        self,
+        app,
+        store: ProfileStore,
+        token: Optional[str] = None,
+        profile_all: bool = False,
+        slow: float = 1.0,
+        skip: Sequence[str] = ()
+    ):
+        self.app = app
+        self.store = store
+        self.token = token.encode("latin-1") if token else None
+        self.profile_all = profile_all
+        self.slow = slow
+        self.skip = tuple(skip)
+
+    def requested(self, scope) -> bool:
+        """Whether the request carries the profiling token"""
+        if self.token is None:
+            return False
+        for name, value in scope.get("headers", ()):
+            if name == b"x-profile":
+                return hmac.compare_digest(value, self.token)
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.skip):
+            await self.app(scope, receive, send)
+            return
+        requested = self.requested(scope)
+        if not requested and not self.profile_all:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"], "requested" if requested else "slow")
+        status = [None]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                if requested:
+                    headers = list(message.get("headers", ()))
+                    headers.append((b"x-profile-id", profile.id.encode("ascii")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        loop_profiler = None
+        if _loop_profiler_lock.acquire(blocking=False):
+            loop_profiler = cProfile.Profile()
+            profile.loop_profiled = True
+        token = _current.set(profile)
+        try:
+            if loop_profiler is not None:
+                loop_profiler.enable()
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if loop_profiler is not None:
+                loop_profiler.disable()
+                _loop_profiler_lock.release()
+                profile.add_profiler(loop_profiler, loop=True)
+            _current.reset(token)
+            elapsed = time.perf_counter() - profile.started
+            if requested or elapsed >= self.slow:
+                try:
+                    profile.finish(status[0])
+                    self.store.add(profile)
+                except Exception as e:
+                    logger.warning(f"Could not record profile of {scope['path']}: {e}")
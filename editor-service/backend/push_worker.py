@@ -0,0 +1,168 @@
+"""
+Asynchronous push worker
+
+Commits are made locally and a single background worker pushes them. Any
+number of push requests that arrive while a push is running (or while the
+worker is backing off after a failure) are coalesced into one ``git push``.
+"""
+
+import threading
+import time
+import logging
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from git_utils import git_push
+from metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class PushWorker:
+    """
+    Push local commits to the remote in the background
+
+    Args:
+        remote: Remote name to push to
+        branch: Branch to push ("main" resolves to the current branch)
+        retry_base: Initial retry delay in seconds after a failed push
+        retry_max: Upper bound for the retry delay in seconds
+        on_result: Called with the result of each push attempt
+    """
+
+    def __init__(
+        self,
+        remote: str = "origin",
+        branch: str = "main",
+        retry_base: float = 1.0,
+        retry_max: float = 300.0,
+        on_result: Optional[Callable[[Dict], None]] = None
+    ):
+        self.remote = remote
+        self.branch = branch
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.on_result = on_result
+        self._requested = 0
+        self._in_progress = False
+        self._failures = 0
+        self._next_attempt_at: Optional[float] = None
+        self._last_result: Optional[Dict] = None
+        self._last_success_at: Optional[str] = None
+        self._total_pushes = 0
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    def start(self) -> None:
+        """Start the worker thread"""
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="push-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """
+        Stop the worker, making one last attempt if pushes are pending
+
+        Args:
+            timeout: Seconds to wait for the final push
+        """
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def request_push(self) -> None:
+        """Ask for the current local commits to be pushed"""
+        with self._condition:
+            self._requested += 1
+            self._condition.notify_all()
+
+    def status(self) -> Dict:
+        """Queue depth, retry state and the result of the last push"""
+        with self._condition:
+            next_retry = None
+            if self._next_attempt_at is not None:
+                next_retry = max(0.0, round(self._next_attempt_at - time.monotonic(), 3))
+            return {
+                "remote": self.remote,
+                "queue_depth": self._requested,
+                "in_progress": self._in_progress,
+                "consecutive_failures": self._failures,
+                "next_retry_in": next_retry,
+                "total_pushes": self._total_pushes,
+                "last_success_at": self._last_success_at,
+                "last_result": self._last_result
+            }
+
+    # Internals
+
+    def _backoff_delay(self) -> float:
+        return min(self.retry_max, self.retry_base * (2 ** (self._failures - 1)))
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._stopping:
+                    if self._requested and self._next_attempt_at is None:
+                        break
+                    if self._requested and self._next_attempt_at is not None:
+                        remaining = self._next_attempt_at - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._condition.wait(remaining)
+                    else:
+                        self._condition.wait()
+
+                if not self._requested:
+                    return
+
+                # Everything requested so far is covered by this push
+                covered = self._requested
+                self._in_progress = True
+
+            started = time.monotonic()
+            try:
+                success, message = git_push(self.remote, self.branch)
+            except Exception as e:
+                logger.error(f"Push raised an exception: {e}", exc_info=True)
+                success, message = False, f"Git error: {str(e)}"
+            duration = time.monotonic() - started
+            STAGE_SECONDS.labels("push").observe(duration)
+
+            with self._condition:
+                self._in_progress = False
+                self._last_result = {
+                    "success": success,
+                    "message": message,
+                    "coalesced_requests": covered,
+                    "duration": round(duration, 3),
+                    "finished_at": datetime.now().isoformat()
+                }
+                if success:
+                    self._requested -= covered
+                    self._failures = 0
+                    self._next_attempt_at = None
+                    self._total_pushes += 1
+                    self._last_success_at = self._last_result["finished_at"]
+                    logger.info(f"Push of {covered} request(s) succeeded: {message}")
+                else:
+                    self._failures += 1
+                    delay = self._backoff_delay()
+                    self._next_attempt_at = time.monotonic() + delay
+                    logger.warning(f"Push failed (attempt {self._failures}), retrying in {delay:.1f}s: {message}")
+                result = dict(self._last_result)
+                stopping = self._stopping
+
+            if self.on_result is not None:
+                try:
+                    self.on_result(result)
+                except Exception as e:
+                    logger.error(f"Push listener failed: {e}", exc_info=True)
+
+            if stopping:
+                return
@@ -0,0 +1,275 @@
+"""
+Server-side markdown preview rendering
+
+Renders markdown with the same ``markdown_extensions`` the site is built
+with, so previews show admonitions, tabs, superfences and so on. The
+Markdown instance is built once per mkdocs.yml version and rendered HTML is
+kept in a size-bounded LRU cache keyed by content hash and extension
+configuration.
+"""
+
+import hashlib
+import importlib
+import threading
+import time
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from mkdocs_utils import PythonName, config_cache
+
+try:
+    import markdown
+    MARKDOWN_AVAILABLE = True
+except ImportError:  # pragma: no cover - Python-Markdown is optional
+    markdown = None
+    MARKDOWN_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks of mkdocs.yml for extension changes
+CONFIG_CHECK_INTERVAL = 1.0
+
+
+def _resolve_python_name(name: PythonName) -> Any:
+    module_name, _, attribute = name.rpartition(".")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def _resolve_config(value: Any) -> Any:
+    """Replace ``!!python/name:`` references with the objects they name"""
+    if isinstance(value, PythonName):
+        return _resolve_python_name(value)
+    if isinstance(value, dict):
+        return {key: _resolve_config(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_resolve_config(item) for item in value]
+    return value
+
+
+def _strip_unresolvable(name: str, config: Dict[str, Any]) -> Dict[str, Any]:
+    """Resolve an extension's options, dropping those that name missing modules"""
+    resolved = {}
+    for key, value in config.items():
+        try:
+            resolved[key] = _resolve_config(value)
+        except (ImportError, AttributeError) as e:
+            logger.warning(f"Ignoring option '{key}' of markdown extension '{name}': {e}")
+    return resolved
+
+
+def parse_extensions(config: Dict[str, Any]) -> Tuple[List[str], Dict[str, Dict[str, Any]]]:
+    """
+    Split mkdocs ``markdown_extensions`` into names and per-extension options
+
+    Args:
+        config: Parsed mkdocs.yml
+
+    Returns:
+        Tuple of (extension names, options by extension name)
+    """
+    names = []
+    configs = {}
+    for item in config.get("markdown_extensions") or []:
+        if isinstance(item, str):
+            names.append(item)
+        elif isinstance(item, dict):
+            for name, options in item.items():
+                names.append(name)
+                if options:
+                    configs[name] = options
+    return names, configs
+
+
+class MarkdownRenderer:
+    """
+    Render markdown with the mkdocs.yml extension stack
+
+    Args:
+        mkdocs_path: Path to mkdocs.yml
+        docs_dir: Docs directory; snippets can only include files below it
+            (defaults to ``docs`` next to mkdocs.yml)
+        cache_bytes: Upper bound for the total size of cached HTML
+    """
+
+    def __init__(self, mkdocs_path: Path, docs_dir: Optional[Path] = None, cache_bytes: int = 32 * 1024 * 1024):
+        self.mkdocs_path = Path(mkdocs_path)
+        self.docs_dir = Path(docs_dir) if docs_dir is not None else self.mkdocs_path.parent / "docs"
+        self.cache_bytes = cache_bytes
+        self._cache: "OrderedDict[Tuple[bytes, str], str]" = OrderedDict()
+        self._cache_size = 0
+        self._cache_lock = threading.Lock()
+        self._render_lock = threading.Lock()
+        self._md = None
+        self._version = None
+        self._signature = ""
+        self._checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def available(self) -> bool:
+        return MARKDOWN_AVAILABLE
+
+    def lookup(self, content: str) -> Optional[str]:
+        """
+        Return cached HTML for content without rendering
+
+        Returns None on a miss, or when mkdocs.yml is due for a change check,
+        so callers fall through to ``render``.
+        """
+        if time.monotonic() - self._checked_at > CONFIG_CHECK_INTERVAL:
+            return None
+        key = (self._content_key(content), self._signature)
+        with self._cache_lock:
+            html = self._cache.get(key)
+            if html is None:
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return html
+
+    def render(self, content: str) -> Tuple[str, bool]:
+        """
+        Render markdown to HTML
+
+        Args:
+            content: Markdown source
+
+        Returns:
+            Tuple of (HTML, whether it came from the cache)
+
+        Raises:
+            RuntimeError: If Python-Markdown is not installed
+        """
+        if not MARKDOWN_AVAILABLE:
+            raise RuntimeError("Python-Markdown is not installed")
+
+        with self._render_lock:
+            self._check_config()
+            key = (self._content_key(content), self._signature)
+            with self._cache_lock:
+                html = self._cache.get(key)
+                if html is not None:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    return html, True
+                self.misses += 1
+
+            # Markdown instances are stateful and not thread-safe
+            try:
+                html = self._md.reset().convert(content)
+            finally:
+                self._md.reset()
+
+        self._store(key, html)
+        return html, False
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache occupancy and hit counters"""
+        with self._cache_lock:
+            return {
+                "entries": len(self._cache),
+                "bytes": self._cache_size,
+                "max_bytes": self.cache_bytes,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+    def clear(self) -> None:
+        """Drop all cached HTML"""
+        with self._cache_lock:
+            self._cache.clear()
+            self._cache_size = 0
+
+    # Internals
+
+    @staticmethod
+    def _content_key(content: str) -> bytes:
+        return hashlib.sha1(content.encode("utf-8")).digest()
+
+    def _store(self, key: Tuple[bytes, str], html: str) -> None:
+        size = len(html)
+        if size > self.cache_bytes:
+            return
+        with self._cache_lock:
+            if key in self._cache:
+                return
+            self._cache[key] = html
+            self._cache_size += size
+            while self._cache_size > self.cache_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_size -= len(evicted)
+
+    def _snippets_config(self, options: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Confine pymdownx.snippets to the docs directory
+
+        Preview content comes from any client, so an include must not reach
+        the rest of the repository (mkdocs.yml, .git) or the network. Base
+        paths from mkdocs.yml are kept only if they lie inside the docs
+        directory, and a missing snippet renders as nothing instead of
+        failing the preview.
+        """
+        options = dict(options or {})
+        docs_dir = self.docs_dir.resolve()
+        base_paths = options.get("base_path", ["."])
+        if isinstance(base_paths, str):
+            base_paths = [base_paths]
+        allowed = []
+        for path in base_paths:
+            # mkdocs resolves snippet paths from the directory it runs in
+            full_path = (self.mkdocs_path.parent / path).resolve()
+            if full_path == docs_dir or docs_dir in full_path.parents:
+                allowed.append(str(full_path))
+        options["base_path"] = allowed or [str(docs_dir)]
+        options["restrict_base_path"] = True
+        options["check_paths"] = False
+        options["url_download"] = False
+        options["auto_append"] = []
+        return options
+
+    def _check_config(self) -> None:
+        now = time.monotonic()
+        if self._md is not None and now - self._checked_at <= CONFIG_CHECK_INTERVAL:
+            return
+        self._checked_at = now
+
+        try:
+            version = config_cache.version(self.mkdocs_path)
+        except OSError:
+            version = None
+        if self._md is not None and version == self._version:
+            return
+
+        try:
+            config = config_cache.get(self.mkdocs_path) if version is not None else {}
+        except Exception as e:
+            logger.warning(f"Could not read markdown extensions from {self.mkdocs_path}: {e}")
+            config = {}
+
+        names, configs = parse_extensions(config)
+        self._md = self._build(names, configs)
+        self._version = version
+        self._signature = hashlib.sha1(repr((names, configs)).encode("utf-8")).hexdigest()[:16]
+
+    def _build(self, names: List[str], configs: Dict[str, Dict[str, Any]]):
+        resolved = {name: _strip_unresolvable(name, options) for name, options in configs.items()}
+
+        if "pymdownx.snippets" in names:
+            resolved["pymdownx.snippets"] = self._snippets_config(resolved.get("pymdownx.snippets"))
+
+        usable = []
+        for name in names:
+            try:
+                markdown.Markdown(extensions=[name], extension_configs={name: resolved.get(name, {})})
+                usable.append(name)
+            except Exception as e:
+                logger.warning(f"Skipping markdown extension '{name}' in preview: {e}")
+
+        logger.info(f"Preview renderer built with {len(usable)} markdown extension(s)")
+        return markdown.Markdown(
+            extensions=usable,
+            extension_configs={name: resolved[name] for name in usable if name in resolved}
+        )
@@ -0,0 +1,441 @@
+"""
+Full-text search over the markdown documents
+
+An inverted index with BM25 ranking, maintained incrementally from
+DocumentIndex change notifications and persisted to disk (as a SQLite
+snapshot, see ``snapshot_utils``) so a restart only re-reads documents
+whose size or mtime changed.
+"""
+
+import re
+import sys
+import html
+import math
+import heapq
+import sqlite3
+import hashlib
+import threading
+import time
+import logging
+from array import array
+from bisect import bisect_left
+from operator import itemgetter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from metadata_utils import extract_title
+from snapshot_utils import SNAPSHOT_SUFFIX, read_snapshot, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Bump when the on-disk format changes
+INDEX_VERSION = 3
+
+INDEX_DOCUMENT_COLUMNS = (
+    "id INTEGER PRIMARY KEY, path TEXT, size INTEGER, mtime REAL, title TEXT, "
+    "length INTEGER NOT NULL, terms TEXT"
+)
+INDEX_POSTING_COLUMNS = "term TEXT PRIMARY KEY, ids BLOB NOT NULL, tfs BLOB NOT NULL"
+
+TOKEN_RE = re.compile(r"[^\W_]+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have if in into is it its of on or "
+    "so such that the their then there these they this to was were will with".split()
+)
+
+SNIPPET_BEFORE = 60
+SNIPPET_AFTER = 160
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens, without stopwords and single characters"""
+    return [
+        token for token in TOKEN_RE.findall(text.lower())
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+def default_index_file(cache_dir: Path, docs_dir: Path, name: str = "search", suffix: str = SNAPSHOT_SUFFIX) -> Path:
+    """Per-docs-directory index file inside the cache directory"""
+    key = hashlib.sha1(str(Path(docs_dir).resolve()).encode("utf-8")).hexdigest()[:12]
+    return Path(cache_dir) / f"{name}-{key}{suffix}"
+
+
+class SearchIndex:
+    """
+    BM25-ranked inverted index over DOCS_DIR
+
+    Postings are stored per term as two parallel arrays of document ids and
+    term frequencies, which keeps a 50k-page corpus in tens of megabytes.
+
+    Args:
+        docs_dir: Base docs directory
+        index_file: Where to persist the index (None disables persistence)
+        k1, b: BM25 parameters
+    """
+
+    def __init__(self, docs_dir: Path, index_file: Optional[Path] = None, k1: float = 1.2, b: float = 0.75):
+        self.docs_dir = Path(docs_dir)
+        self.index_file = index_file
+        self.k1 = k1
+        self.b = b
+        self.ready = False
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._reset()
+
+    def _reset(self) -> None:
+        self._paths: List[Optional[str]] = []
+        self._ids: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._stamps: Dict[str, Tuple[int, float]] = {}
+        self._titles: Dict[str, Optional[str]] = {}
+        self._lengths = array("I")
+        # Space-separated terms per document, split only to remove it
+        self._doc_terms: List[Optional[str]] = []
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._total_length = 0
+        # BM25 length normalisation per document, for the average length in _norms_avg
+        self._norms = array("d")
+        self._norms_avg = 0.0
+
+    # Maintenance
+
+    def index_document(self, rel_path: str, text: str, stamp: Tuple[int, float]) -> None:
+        """
+        Add or replace a document
+
+        Args:
+            rel_path: Path relative to the docs directory
+            text: Document content
+            stamp: (size, mtime) of the file when it was read
+        """
+        counts: Dict[str, int] = {}
+        for token in tokenize(text):
+            counts[token] = counts.get(token, 0) + 1
+        title = extract_title(text)
+
+        with self._lock:
+            current = self._stamps.get(rel_path)
+            if current is not None and current[1] > stamp[1]:
+                # A newer version was indexed concurrently
+                return
+            self._remove(rel_path)
+
+            doc_id = self._free.pop() if self._free else len(self._paths)
+            length = sum(counts.values())
+            terms = " ".join(counts)
+            if doc_id == len(self._paths):
+                self._paths.append(rel_path)
+                self._lengths.append(length)
+                self._doc_terms.append(terms)
+            else:
+                self._paths[doc_id] = rel_path
+                self._lengths[doc_id] = length
+                self._doc_terms[doc_id] = terms
+
+            # Postings stay sorted by document id, so _remove can bisect
+            for term, count in counts.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[sys.intern(term)] = (array("I"), array("I"))
+                ids, tfs = postings
+                if not ids or ids[-1] < doc_id:
+                    ids.append(doc_id)
+                    tfs.append(count)
+                else:
+                    # A reused id of a removed document
+                    position = bisect_left(ids, doc_id)
+                    ids.insert(position, doc_id)
+                    tfs.insert(position, count)
+
+            if doc_id < len(self._norms):
+                self._norms[doc_id] = self._norm(length, self._norms_avg)
+
+            self._ids[rel_path] = doc_id
+            self._stamps[rel_path] = stamp
+            self._titles[rel_path] = title
+            self._total_length += length
+            self._dirty = True
+
+    def remove_document(self, rel_path: str) -> None:
+        """Remove a document from the index"""
+        with self._lock:
+            if self._remove(rel_path):
+                self._dirty = True
+
+    def refresh(self, rel_path: str) -> None:
+        """Re-read a document from disk, or drop it if it no longer exists"""
+        full_path = self.docs_dir / rel_path
+        try:
+            stat = full_path.stat()
+            text = full_path.read_text(encoding="utf-8", errors="replace")
+        except OSError:
+            self.remove_document(rel_path)
+            return
+        self.index_document(rel_path, text, (stat.st_size, stat.st_mtime))
+
+    def on_documents_changed(self, changed: List[str], removed: List[str], created: List[str]) -> None:
+        """DocumentIndex listener"""
+        for rel_path in removed:
+            self.remove_document(rel_path)
+        for rel_path in changed:
+            self.refresh(rel_path)
+
+    def sync(self, snapshot: Dict[str, Tuple[int, float]]) -> Tuple[int, int]:
+        """
+        Bring the index in line with the current document set
+
+        Only documents whose (size, mtime) differ from the indexed version
+        are re-read.
+
+        Args:
+            snapshot: (size, mtime) per document, from DocumentIndex.snapshot
+
+        Returns:
+            Tuple of (documents re-indexed, documents removed)
+        """
+        with self._lock:
+            stale = [path for path in self._stamps if path not in snapshot]
+        for rel_path in stale:
+            self.remove_document(rel_path)
+
+        reindexed = 0
+        for rel_path, stamp in snapshot.items():
+            if self._stamps.get(rel_path) != stamp:
+                self.refresh(rel_path)
+                reindexed += 1
+
+        self.ready = True
+        return reindexed, len(stale)
+
+    # Queries
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> Dict:
+        """
+        Rank documents for a query
+
+        Args:
+            query: Free-text query
+            limit: Maximum number of results
+            offset: Number of top results to skip
+
+        Returns:
+            Dictionary with the total match count and ranked results with
+            highlighted snippets
+        """
+        started = time.perf_counter()
+        terms = list(dict.fromkeys(tokenize(query)))
+
+        with self._lock:
+            ranked, total = self._rank(terms, offset + limit)
+            hits = [
+                (self._paths[doc_id], self._titles.get(self._paths[doc_id]), score)
+                for doc_id, score in ranked[offset:offset + limit]
+            ]
+
+        results = [
+            {
+                "path": path,
+                "title": title,
+                "score": round(score, 4),
+                "snippet": self._snippet(path, terms)
+            }
+            for path, title, score in hits
+        ]
+
+        return {
+            "query": query,
+            "total": total,
+            "results": results,
+            "ready": self.ready,
+            "took_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    # Persistence
+
+    def save(self) -> bool:
+        """Write the index to disk if it changed since the last save"""
+        if self.index_file is None or not self._dirty:
+            return False
+        with self._lock:
+            documents = []
+            for doc_id, path in enumerate(self._paths):
+                if path is None:
+                    documents.append((doc_id, None, None, None, None, 0, None))
+                    continue
+                size, mtime = self._stamps[path]
+                documents.append((
+                    doc_id, path, size, mtime, self._titles.get(path), self._lengths[doc_id], self._doc_terms[doc_id]
+                ))
+            postings = [(term, ids.tobytes(), tfs.tobytes()) for term, (ids, tfs) in self._postings.items()]
+            self._dirty = False
+
+        try:
+            write_snapshot(self.index_file, self._snapshot_header(), {
+                "documents": (INDEX_DOCUMENT_COLUMNS, documents),
+                "postings": (INDEX_POSTING_COLUMNS, postings)
+            })
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Could not save search index: {e}")
+            self._dirty = True
+            return False
+        logger.info(f"Search index saved: {len(postings)} terms")
+        return True
+
+    def load(self) -> bool:
+        """Load a previously saved index; returns False if none was usable"""
+        if self.index_file is None:
+            return False
+        state = read_snapshot(self.index_file, self._snapshot_header(), self._read_snapshot, "search index")
+        if state is None:
+            return False
+
+        with self._lock:
+            self._reset()
+            self._paths, self._stamps, self._titles, self._lengths, self._doc_terms, self._postings = state
+            self._free = [doc_id for doc_id, path in enumerate(self._paths) if path is None]
+            self._total_length = sum(self._lengths)
+            self._ids = {path: doc_id for doc_id, path in enumerate(self._paths) if path is not None}
+            self._dirty = False
+        logger.info(f"Search index loaded: {len(self._ids)} documents")
+        return True
+
+    def _snapshot_header(self) -> Dict[str, str]:
+        return {
+            "format": "search-index",
+            "version": str(INDEX_VERSION),
+            "docs_dir": str(self.docs_dir.resolve()),
+            # Postings are stored as raw array bytes
+            "arrays": f"I{array('I').itemsize}-{sys.byteorder}"
+        }
+
+    @staticmethod
+    def _read_snapshot(connection: sqlite3.Connection) -> Tuple:
+        postings: Dict[str, Tuple[array, array]] = {}
+        posting_count = 0
+        last_id = -1
+        for term, ids_bytes, tfs_bytes in connection.execute("SELECT * FROM postings"):
+            ids = array("I")
+            ids.frombytes(ids_bytes)
+            tfs = array("I")
+            tfs.frombytes(tfs_bytes)
+            if len(ids) != len(tfs) or not ids:
+                raise ValueError(f"postings of {term!r} are malformed")
+            postings[sys.intern(term)] = (ids, tfs)
+            posting_count += len(ids)
+            last_id = max(last_id, max(ids))
+
+        paths: List[Optional[str]] = []
+        stamps: Dict[str, Tuple[int, float]] = {}
+        titles: Dict[str, Optional[str]] = {}
+        lengths = array("I")
+        doc_terms: List[Optional[str]] = []
+        term_count = 0
+        for doc_id, path, size, mtime, title, length, terms in connection.execute(
+            "SELECT * FROM documents ORDER BY id"
+        ):
+            if doc_id != len(paths):
+                raise ValueError(f"document {doc_id} is out of sequence")
+            paths.append(path)
+            lengths.append(length)
+            if path is None:
+                doc_terms.append(None)
+                continue
+            if not isinstance(size, int) or not isinstance(mtime, float) or not isinstance(terms, str):
+                raise TypeError(f"document {path!r} has columns of unexpected types")
+            stamps[path] = (size, mtime)
+            titles[path] = title
+            doc_terms.append(terms)
+            term_count += terms.count(" ") + 1 if terms else 0
+        # Splitting every document's terms to match them against the postings
+        # would dominate the load time; counting them catches a mismatch
+        if term_count != posting_count or last_id >= len(paths):
+            raise ValueError("documents and postings disagree")
+        return paths, stamps, titles, lengths, doc_terms, postings
+
+    # Internals
+
+    def _remove(self, rel_path: str) -> bool:
+        doc_id = self._ids.pop(rel_path, None)
+        if doc_id is None:
+            return False
+        for term in self._doc_terms[doc_id].split():
+            ids, tfs = self._postings[term]
+            position = bisect_left(ids, doc_id)
+            del ids[position]
+            del tfs[position]
+            if not ids:
+                del self._postings[term]
+        self._total_length -= self._lengths[doc_id]
+        self._paths[doc_id] = None
+        self._doc_terms[doc_id] = None
+        self._lengths[doc_id] = 0
+        self._free.append(doc_id)
+        self._stamps.pop(rel_path, None)
+        self._titles.pop(rel_path, None)
+        return True
+
+    def _norm(self, length: int, avg_length: float) -> float:
+        return self.k1 * (1 - self.b + self.b * length / avg_length)
+
+    def _current_norms(self, avg_length: float) -> array:
+        # Recomputed by the first query after the corpus or its average length
+        # changed, once per batch of updates rather than per update
+        if len(self._norms) != len(self._lengths) or avg_length != self._norms_avg:
+            self._norms_avg = avg_length
+            self._norms = array("d", (self._norm(length, avg_length) for length in self._lengths))
+        return self._norms
+
+    def _rank(self, terms: List[str], count: int) -> Tuple[List[Tuple[int, float]], int]:
+        doc_count = len(self._ids)
+        matched = [(term, self._postings[term]) for term in terms if term in self._postings]
+        if not doc_count or not matched:
+            return [], 0
+
+        k1 = self.k1
+        norms = self._current_norms(self._total_length / doc_count or 1.0)
+        scores: Dict[int, float] = {}
+
+        # Every posting of every query term is scored, so totals and ordering are exact
+        for term, (ids, tfs) in matched:
+            df = len(ids)
+            weight = math.log(1 + (doc_count - df + 0.5) / (df + 0.5)) * (k1 + 1)
+            if not scores:
+                scores = {doc_id: weight * tf / (tf + norms[doc_id]) for doc_id, tf in zip(ids, tfs)}
+                continue
+            get = scores.get
+            for doc_id, tf in zip(ids, tfs):
+                scores[doc_id] = get(doc_id, 0.0) + weight * tf / (tf + norms[doc_id])
+
+        return heapq.nlargest(count, scores.items(), key=itemgetter(1)), len(scores)
+
+    def _snippet(self, rel_path: str, terms: List[str]) -> str:
+        try:
+            text = (self.docs_dir / rel_path).read_text(encoding="utf-8", errors="replace")
+        except OSError:
+            return ""
+        if not terms:
+            return html.escape(text[:SNIPPET_AFTER])
+
+        pattern = re.compile(r"(?<!\w)(" + "|".join(re.escape(term) for term in terms) + r")", re.IGNORECASE)
+        match = pattern.search(text)
+        start = max(0, match.start() - SNIPPET_BEFORE) if match else 0
+        end = min(len(text), (match.end() if match else 0) + SNIPPET_AFTER)
+        excerpt = " ".join(text[start:end].split())
+
+        highlighted = []
+        last = 0
+        for hit in pattern.finditer(excerpt):
+            highlighted.append(html.escape(excerpt[last:hit.start()]))
+            highlighted.append(f"<mark>{html.escape(hit.group(0))}</mark>")
+            last = hit.end()
+        highlighted.append(html.escape(excerpt[last:]))
+
+        prefix = "…" if start > 0 else ""
+        suffix = "…" if end < len(text) else ""
+        return prefix + "".join(highlighted) + suffix
@@ -7,12 +7,24 @@ from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 import logging
 
+from document_index import scan_tree, section_structure_of
+
 logger = logging.getLogger(__name__)
 
 # Base directory for documentation
 DOCS_DIR = Path(__file__).parent.parent.parent / "docs"
 
 
+def section_index_content(section_name: str) -> str:
+    """Starting content of a new section's index.md"""
+    return f"# {section_name}\n\nWelcome to the {section_name} documentation.\n\n## Overview\n\nAdd your documentation here.\n"
+
+
+def subsection_index_content(subsection_name: str) -> str:
+    """Starting content of a new sub-section's index.md"""
+    return f"# {subsection_name}\n\n## Overview\n\nAdd your {subsection_name} documentation here.\n"
+
+
 def create_section(section_name: str, docs_dir: Optional[Path] = None) -> Tuple[bool, str, Path]:
     """
     Create a new top-level section
@@ -44,8 +56,7 @@ def create_section(section_name: str, docs_dir: Optional[Path] = None) -> Tuple[
         
         # Create index.md
         index_path = section_path / "index.md"
-        index_content = f"# {section_name}\n\nWelcome to the {section_name} documentation.\n\n## Overview\n\nAdd your documentation here.\n"
-        index_path.write_text(index_content, encoding="utf-8")
+        index_path.write_text(section_index_content(section_name), encoding="utf-8")
         
         return True, f"Section '{sanitized_name}' created successfully", section_path
     except Exception as e:
@@ -92,8 +103,7 @@ def create_subsection(section: str, subsection_name: str, docs_dir: Optional[Pat
         
         # Create index.md
         index_path = subsection_path / "index.md"
-        index_content = f"# {subsection_name}\n\n## Overview\n\nAdd your {subsection_name} documentation here.\n"
-        index_path.write_text(index_content, encoding="utf-8")
+        index_path.write_text(subsection_index_content(subsection_name), encoding="utf-8")
         
         return True, f"Sub-section '{sanitized_subsection}' created successfully", subsection_path
     except Exception as e:
@@ -105,6 +115,9 @@ def get_section_structure(docs_dir: Optional[Path] = None) -> Dict:
     """
     Get the complete structure of sections and sub-sections
     
+    Walks the docs directory once; the running service answers from its
+    DocumentIndex instead.
+    
     Args:
         docs_dir: Base docs directory (defaults to DOCS_DIR)
     
@@ -114,58 +127,7 @@ def get_section_structure(docs_dir: Optional[Path] = None) -> Dict:
     if docs_dir is None:
         docs_dir = DOCS_DIR
     
-    structure = {
-        "sections": [],
-        "total_sections": 0,
-        "total_documents": 0
-    }
-    
-    if not docs_dir.exists():
-        return structure
-    
-    # Get all top-level directories (sections)
-    for item in docs_dir.iterdir():
-        if item.is_dir() and not item.name.startswith(".") and item.name not in ["assets", "overrides"]:
-            section_info = {
-                "name": item.name,
-                "path": str(item.relative_to(docs_dir)).replace("\\", "/"),
-                "subsections": [],
-                "documents": []
-            }
-            
-            # Get sub-sections and documents
-            for subitem in item.iterdir():
-                if subitem.is_dir():
-                    subsection_info = {
-                        "name": subitem.name,
-                        "path": str(subitem.relative_to(docs_dir)).replace("\\", "/"),
-                        "documents": []
-                    }
-                    
-                    # Get documents in sub-section
-                    for doc in subitem.rglob("*.md"):
-                        if doc.is_file():
-                            rel_path = doc.relative_to(docs_dir)
-                            subsection_info["documents"].append({
-                                "name": doc.name,
-                                "path": str(rel_path).replace("\\", "/")
-                            })
-                    
-                    section_info["subsections"].append(subsection_info)
-                elif subitem.is_file() and subitem.suffix == ".md":
-                    rel_path = subitem.relative_to(docs_dir)
-                    section_info["documents"].append({
-                        "name": subitem.name,
-                        "path": str(rel_path).replace("\\", "/")
-                    })
-            
-            structure["sections"].append(section_info)
-            structure["total_sections"] += 1
-            structure["total_documents"] += len(section_info["documents"])
-            for sub in section_info["subsections"]:
-                structure["total_documents"] += len(sub["documents"])
-    
-    return structure
+    return section_structure_of(scan_tree(docs_dir))
 
 
 def delete_section(path: str, docs_dir: Optional[Path] = None) -> Tuple[bool, str]:
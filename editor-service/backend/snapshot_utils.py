@@ -0,0 +1,101 @@
+"""
+On-disk snapshots of the in-memory indexes
+
+The document index, search index and link graph save their state to the
+cache directory as SQLite databases of plain rows: strings, numbers, JSON
+text and array bytes. Reading one cannot run code, so write access to the
+cache directory does not give access to the server process.
+
+Every snapshot starts with a ``snapshot`` table of key/value pairs naming
+the format, its version and the docs directory it describes. A snapshot
+whose header does not match, that is not a SQLite database, or whose rows
+do not decode is discarded as a whole, and the index falls back to a full
+scan of the docs directory.
+"""
+
+import os
+import sqlite3
+import logging
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_SUFFIX = ".sqlite"
+
+T = TypeVar("T")
+
+# Table name -> (column definitions, rows)
+Tables = Dict[str, Tuple[str, Iterable[Tuple]]]
+
+
+class SnapshotMismatch(ValueError):
+    """The snapshot is of another format, version or docs directory"""
+
+
+def write_snapshot(path: Path, header: Dict[str, str], tables: Tables) -> None:
+    """
+    Write a snapshot to a temporary file and move it into place
+
+    Args:
+        path: Snapshot file
+        header: Format, version and docs directory, checked on load
+        tables: Rows to store per table
+
+    Raises:
+        OSError, sqlite3.Error: If the snapshot could not be written
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_file.unlink(missing_ok=True)
+    connection = sqlite3.connect(tmp_file)
+    try:
+        # A crash mid-write leaves only the temporary file behind
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.execute("PRAGMA synchronous = OFF")
+        connection.execute("CREATE TABLE snapshot (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        connection.executemany("INSERT INTO snapshot VALUES (?, ?)", header.items())
+        for name, (columns, rows) in tables.items():
+            connection.execute(f"CREATE TABLE {name} ({columns})")
+            placeholders = ", ".join("?" * (columns.count(",") + 1))
+            connection.executemany(f"INSERT INTO {name} VALUES ({placeholders})", rows)
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(tmp_file, path)
+
+
+def read_snapshot(path: Path, header: Dict[str, str], read: Callable[[sqlite3.Connection], T], what: str) -> Optional[T]:
+    """
+    Open a snapshot read-only, check its header and decode it
+
+    Args:
+        path: Snapshot file
+        header: Expected format, version and docs directory
+        read: Decodes the rows into the index's state
+        what: Description for log messages, e.g. "search index"
+
+    Returns:
+        Whatever ``read`` returns, or None if there is no usable snapshot
+    """
+    if not path.exists():
+        return None
+    try:
+        connection = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True)
+    except sqlite3.Error as e:
+        logger.warning(f"Discarding unreadable {what} snapshot: {e}")
+        return None
+    try:
+        stored = dict(connection.execute("SELECT key, value FROM snapshot"))
+        mismatched = [key for key, value in header.items() if stored.get(key) != value]
+        if mismatched:
+            raise SnapshotMismatch(f"{', '.join(mismatched)} differ")
+        return read(connection)
+    except SnapshotMismatch as e:
+        logger.info(f"Ignoring {what} snapshot: {e}")
+    except Exception as e:
+        # Not a database, truncated, or rows of an unexpected shape
+        logger.warning(f"Discarding unreadable {what} snapshot: {e}")
+    finally:
+        connection.close()
+    return None
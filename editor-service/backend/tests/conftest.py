@@ -0,0 +1,116 @@
+"""
+Shared fixtures for the backend tests
+
+The backend reads its paths from the environment when its modules are
+imported, so a throwaway workspace (a git checkout with a small docs tree
+and mkdocs.yml, pushing to a bare remote) is created and configured here,
+before any test module imports the backend.
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+MKDOCS_YML = """\
+site_name: Test Docs
+docs_dir: docs
+
+nav:
+  - Home: index.md
+  - Guide:
+    - Overview: guide/index.md
+
+markdown_extensions:
+  - toc:
+      permalink: true
+  - attr_list
+  - admonition
+  - pymdownx.snippets
+"""
+
+
+def git(cwd: Path, *args: str) -> str:
+    """Run a git command and return its stripped stdout"""
+    result = subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True, text=True,
+        env={**os.environ, "GIT_AUTHOR_NAME": "Test", "GIT_AUTHOR_EMAIL": "test@example.com",
+             "GIT_COMMITTER_NAME": "Test", "GIT_COMMITTER_EMAIL": "test@example.com"}
+    )
+    return result.stdout.strip()
+
+
+def make_repo(root: Path) -> tuple:
+    """
+    Create a checkout with a docs tree and a bare remote it tracks
+
+    Returns:
+        Tuple of (checkout path, bare remote path)
+    """
+    bare = root / "origin.git"
+    repo = root / "repo"
+    git(root, "init", "-q", "--bare", "-b", "main", str(bare))
+    (repo / "docs" / "guide").mkdir(parents=True)
+    (repo / "docs" / "index.md").write_text("# Home\n\nWelcome.\n")
+    (repo / "docs" / "guide" / "index.md").write_text("# Guide\n\n## Setup\n\nSteps.\n")
+    (repo / "mkdocs.yml").write_text(MKDOCS_YML)
+    git(repo, "init", "-q", "-b", "main")
+    git(repo, "config", "user.name", "Test")
+    git(repo, "config", "user.email", "test@example.com")
+    git(repo, "add", "-A")
+    git(repo, "commit", "-qm", "Initial commit")
+    git(repo, "remote", "add", "origin", str(bare))
+    git(repo, "push", "-q", "origin", "main")
+    return repo, bare
+
+
+WORKSPACE = Path(tempfile.mkdtemp(prefix="phronidoc-tests-"))
+REPO, REMOTE = make_repo(WORKSPACE)
+os.environ.update(
+    GIT_REPO_PATH=str(REPO),
+    DOCS_DIR=str(REPO / "docs"),
+    MKDOCS_CONFIG_PATH=str(REPO / "mkdocs.yml"),
+    CACHE_DIR=str(WORKSPACE / "cache"),
+    DOCS_WATCH_MODE="off",
+    COMMIT_WINDOW="0.05",
+)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(WORKSPACE, ignore_errors=True)
+
+
+@pytest.fixture
+def git_repo(tmp_path, monkeypatch):
+    """
+    A fresh checkout and bare remote that git_utils operates on
+
+    Yields:
+        Tuple of (checkout path, bare remote path)
+    """
+    import git_utils
+    from git_session import GitSession
+
+    repo, bare = make_repo(tmp_path)
+    session = GitSession(repo, scratch_dir=tmp_path / "scratch")
+    monkeypatch.setattr(git_utils, "REPO_ROOT", repo)
+    monkeypatch.setattr(git_utils, "SESSION", session)
+    yield repo, bare
+    session.close()
+
+
+@pytest.fixture
+def client():
+    """TestClient for the app, running against the shared workspace"""
+    from fastapi.testclient import TestClient
+    import main
+
+    with TestClient(main.app) as test_client:
+        yield test_client
@@ -0,0 +1,111 @@
+"""Tests for batch rollback of documents, sections and mkdocs.yml"""
+
+import threading
+
+import pytest
+
+import batch_utils
+from batch_utils import BatchError, BatchTransaction, run_batch
+from mkdocs_utils import add_section_to_nav
+
+OPERATIONS = [
+    {"op": "create_section", "name": "Platform"},
+    {"op": "update", "path": "index.md", "content": "# Home\n\nRewritten.\n"},
+    {"op": "move", "path": "guide/index.md", "to": "platform/guide.md"},
+    {"op": "create", "path": "platform/new/page.md", "content": "# New\n"},
+    {"op": "delete_section", "path": "guide"},
+]
+
+
+def tree(repo):
+    """Every file and directory outside .git, with file contents"""
+    return {
+        path.relative_to(repo).as_posix(): path.read_bytes() if path.is_file() else None
+        for path in sorted(repo.rglob("*"))
+        if ".git" not in path.relative_to(repo).parts
+    }
+
+
+def committed(paths, message):
+    return True, "Committed", "0" * 40
+
+
+def run(repo, operations, commit_paths=committed, navigation=None):
+    transaction = BatchTransaction(repo / "docs", repo / "mkdocs.yml")
+    return run_batch(transaction, operations, navigation, "Batch", commit_paths=commit_paths)
+
+
+def test_failing_middle_operation_restores_the_tree(git_repo):
+    repo, _ = git_repo
+    before = tree(repo)
+    operations = OPERATIONS[:3] + [{"op": "delete", "path": "missing.md"}] + OPERATIONS[3:]
+
+    with pytest.raises(BatchError) as error:
+        run(repo, operations)
+
+    assert error.value.index == 3
+    assert tree(repo) == before
+
+
+def test_failing_commit_restores_the_tree_and_navigation(git_repo):
+    repo, _ = git_repo
+    before = tree(repo)
+
+    def rejected(paths, message):
+        # Everything, including the rewritten mkdocs.yml, was applied
+        assert b"Platform" in (repo / "mkdocs.yml").read_bytes()
+        return False, "Commit failed", None
+
+    with pytest.raises(BatchError, match="commit"):
+        run(repo, OPERATIONS, commit_paths=rejected)
+
+    assert tree(repo) == before
+
+
+def test_failing_navigation_write_restores_mkdocs_yml(git_repo, monkeypatch):
+    repo, _ = git_repo
+    before = tree(repo)
+
+    def half_written(config, mkdocs_path):
+        mkdocs_path.write_text("nav:\n  - Pla")
+        return False
+
+    monkeypatch.setattr(batch_utils, "write_mkdocs_config", half_written)
+    with pytest.raises(BatchError, match="navigation"):
+        run(repo, OPERATIONS, navigation=[{"Home": "index.md"}])
+
+    assert tree(repo) == before
+
+
+def test_navigation_edit_during_the_commit_survives_the_rollback(git_repo):
+    repo, _ = git_repo
+    mkdocs_path = repo / "mkdocs.yml"
+    editor = threading.Thread(target=add_section_to_nav, args=("Other", "other", mkdocs_path))
+
+    def rejected(paths, message):
+        editor.start()
+        editor.join(0.3)
+        # Waits for the batch instead of editing the nav it is about to restore
+        assert editor.is_alive()
+        return False, "Commit failed", None
+
+    with pytest.raises(BatchError):
+        run(repo, OPERATIONS[:1], commit_paths=rejected)
+    editor.join(10)
+
+    nav = mkdocs_path.read_text()
+    assert "Other" in nav
+    assert "Platform" not in nav
+
+
+def test_commit_that_may_still_land_leaves_the_batch_applied(git_repo):
+    repo, _ = git_repo
+
+    def pending(paths, message):
+        return True, "Commit still pending (ticket 1)", None
+
+    result = run(repo, OPERATIONS[:2], commit_paths=pending)
+
+    assert result["git_status"] == "Commit still pending (ticket 1)"
+    assert (repo / "docs" / "platform" / "index.md").exists()
+    assert "Rewritten" in (repo / "docs" / "index.md").read_text()
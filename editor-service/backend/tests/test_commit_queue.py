@@ -0,0 +1,148 @@
+"""Tests for committing through the commit queue, locally and across workers"""
+
+import threading
+import time
+
+from commit_queue import CommitQueue
+from conftest import REPO, git
+from coordination import TicketSpool
+
+
+class Election:
+    """Stand-in for LeaderElection with a fixed outcome"""
+
+    def __init__(self, is_leader: bool):
+        self.is_leader = is_leader
+
+
+def test_commit_skips_the_window_and_returns_the_outcome(git_repo):
+    repo, _ = git_repo
+    queue = CommitQueue(window=30)
+    queue.start()
+    try:
+        (repo / "docs" / "now.md").write_text("now")
+        started = time.monotonic()
+        status = queue.commit([repo / "docs" / "now.md"], "Add now", push=False, timeout=10)
+    finally:
+        queue.stop()
+
+    assert time.monotonic() - started < 5
+    assert status["status"] == "committed"
+    assert status["commit"] == git(repo, "rev-parse", "HEAD")
+    assert git(repo, "log", "-1", "--format=%s") == "Add now"
+
+
+def test_commit_from_another_worker_goes_through_the_spool(git_repo, tmp_path):
+    repo, _ = git_repo
+    spool = TicketSpool(tmp_path / "spool")
+    committer = CommitQueue(window=30, election=Election(True), spool=spool, poll=0.05)
+    forwarder = CommitQueue(window=30, election=Election(False), spool=spool, poll=0.05)
+    committer.start()
+    try:
+        (repo / "docs" / "spooled.md").write_text("spooled")
+        status = forwarder.commit([repo / "docs" / "spooled.md"], "Add spooled", push=False, timeout=10)
+    finally:
+        committer.stop()
+
+    assert status["status"] == "committed"
+    assert status["commit"] == git(repo, "rev-parse", "HEAD")
+    assert forwarder.depth == 0
+
+
+def test_commit_is_withdrawn_when_no_committer_answers(git_repo, tmp_path):
+    repo, _ = git_repo
+    spool = TicketSpool(tmp_path / "spool")
+    forwarder = CommitQueue(election=Election(False), spool=spool, poll=0.05)
+    (repo / "docs" / "orphan.md").write_text("orphan")
+
+    status = forwarder.commit([repo / "docs" / "orphan.md"], "Add orphan", push=False, timeout=0.2)
+
+    assert status["status"] == "withdrawn"
+    # A committer starting later does not find it
+    assert spool.claim() == []
+
+
+def test_ticket_the_committer_took_cannot_be_withdrawn(tmp_path):
+    spool = TicketSpool(tmp_path / "spool")
+    forwarder = CommitQueue(election=Election(False), spool=spool, poll=0.05)
+    ticket_id = forwarder.submit([tmp_path / "taken.md"], "Add taken", push=False, urgent=True)
+    assert [ticket["id"] for ticket in spool.claim()] == [ticket_id]
+
+    assert not forwarder.withdraw(ticket_id)
+    assert forwarder.get(ticket_id)["status"] == "pending"
+
+
+def test_local_ticket_is_withdrawn_before_the_committer_takes_it(tmp_path):
+    queue = CommitQueue(window=30)
+    ticket_id = queue.submit([tmp_path / "queued.md"], "Add queued", push=False)
+
+    assert queue.withdraw(ticket_id)
+    assert queue.depth == 0
+    assert queue.get(ticket_id)["status"] == "withdrawn"
+    assert not queue.withdraw(ticket_id)
+
+
+def commit_events(since):
+    import main
+    return [event for event in main.event_feed.since(since) if event.type.startswith("commit.")]
+
+
+def test_section_and_navigation_commits_go_through_the_queue(client):
+    import main
+    since = main.event_feed.last_sequence
+
+    created = client.post("/api/sections", json={"name": "Queued Section", "push": False}).json()
+    assert created["git_status"].startswith("Committed: docs: Add section 'Queued Section'")
+    assert "git_error" not in created
+    assert git(REPO, "log", "-1", "--format=%s") == "docs: Add section 'Queued Section'"
+
+    navigation = client.get("/api/navigation").json()["navigation"]
+    updated = client.put("/api/navigation", json={"navigation": navigation[:1]}).json()
+    assert updated["git_status"].startswith("Committed: docs: Update navigation structure")
+
+    deleted = client.delete("/api/sections/queued-section").json()
+    assert deleted["git_status"].startswith("Committed: docs: Delete section 'queued-section'")
+
+    # Each commit is announced once, by the committer
+    events = commit_events(since)
+    assert [event.type for event in events] == ["commit.landed"] * 3
+    assert git(REPO, "status", "--porcelain", "--", "docs/queued-section", "mkdocs.yml") == ""
+
+
+def test_batch_commit_goes_through_the_queue(client):
+    import main
+    since = main.event_feed.last_sequence
+
+    response = client.post("/api/batch", json={
+        "operations": [{"op": "create", "path": "batch-one.md", "content": "# One\n"}],
+        "commit_message": "Batch through the queue",
+        "push": False
+    })
+
+    assert response.status_code == 200
+    result = response.json()
+    assert result["commit"] == git(REPO, "rev-parse", "HEAD")
+    assert git(REPO, "log", "-1", "--format=%s") == "Batch through the queue"
+    assert [event.data["commit"] for event in commit_events(since)] == [result["commit"]]
+
+
+def test_create_document_waits_for_the_document_write_lock(client):
+    import main
+    responses = []
+    # Another worker holding the lock, e.g. while creating the same path
+    main.document_write_lock.acquire()
+    try:
+        creator = threading.Thread(target=lambda: responses.append(
+            client.post("/api/documents", json={"path": "locked.md", "content": "# Locked\n", "push": False})
+        ))
+        creator.start()
+        creator.join(0.3)
+        assert creator.is_alive()
+        assert not (REPO / "docs" / "locked.md").exists()
+    finally:
+        main.document_write_lock.release()
+    creator.join(10)
+
+    assert responses[0].status_code == 200
+    again = client.post("/api/documents", json={"path": "locked.md", "content": "# Again\n", "push": False})
+    assert again.status_code == 409
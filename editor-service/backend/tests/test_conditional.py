@@ -0,0 +1,84 @@
+"""Tests for ETags, If-None-Match and If-Match on documents, listings and navigation"""
+
+import pytest
+
+
+@pytest.fixture
+def document(client, request):
+    """A fresh document and its ETag"""
+    created = client.post("/api/documents", json={
+        "path": f"conditional/{request.node.name}.md", "content": "# Conditional\n", "push": False
+    })
+    assert created.status_code == 200
+    path = created.json()["path"]
+    response = client.get(f"/api/documents/{path}")
+    return path, response.headers["etag"]
+
+
+def test_matching_if_none_match_gets_304(client, document):
+    path, etag = document
+    assert not etag.startswith("W/")
+
+    response = client.get(f"/api/documents/{path}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+
+    stale = client.get(f"/api/documents/{path}", headers={"If-None-Match": '"0000"'})
+    assert stale.status_code == 200
+    assert stale.json()["content"] == "# Conditional\n"
+
+
+def test_stale_if_match_is_rejected_with_412(client, document):
+    path, etag = document
+    saved = client.put(f"/api/documents/{path}", headers={"If-Match": etag},
+                       json={"content": "# Second\n", "push": False})
+    assert saved.status_code == 200
+    assert saved.headers["etag"] != etag
+
+    # A second editor still holding the first version
+    stale = client.put(f"/api/documents/{path}", headers={"If-Match": etag},
+                       json={"content": "# Lost update\n", "push": False})
+    assert stale.status_code == 412
+    assert client.get(f"/api/documents/{path}").json()["content"] == "# Second\n"
+
+
+def test_if_match_star_and_weak_tags(client, document):
+    path, etag = document
+    weak = client.put(f"/api/documents/{path}", headers={"If-Match": f"W/{etag}"},
+                      json={"content": "# Weak\n", "push": False})
+    # If-Match uses strong comparison
+    assert weak.status_code == 412
+
+    star = client.put(f"/api/documents/{path}", headers={"If-Match": "*"},
+                      json={"content": "# Any\n", "push": False})
+    assert star.status_code == 200
+    assert client.get(f"/api/documents/{path}").json()["content"] == "# Any\n"
+
+
+def test_listing_etag_changes_after_a_write(client, document):
+    path, _ = document
+    for url in ("/api/documents", "/api/directories", "/api/sections"):
+        first = client.get(url)
+        etag = first.headers["etag"]
+        assert etag.startswith("W/")
+        assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+        client.put(f"/api/documents/{path}", json={"content": f"# Changed for {url}\n", "push": False})
+        changed = client.get(url, headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
+
+
+def test_navigation_etag_follows_mkdocs_yml(client):
+    first = client.get("/api/navigation")
+    etag = first.headers["etag"]
+    assert client.get("/api/navigation", headers={"If-None-Match": etag}).status_code == 304
+
+    # Rewriting mkdocs.yml, even with the same navigation, is a new version
+    saved = client.put("/api/navigation", json={"navigation": first.json()["navigation"]})
+    assert saved.status_code == 200
+    changed = client.get("/api/navigation", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert changed.json()["navigation"] == first.json()["navigation"]
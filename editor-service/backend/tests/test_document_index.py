@@ -0,0 +1,150 @@
+"""Tests for document index snapshots"""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from document_index import DocumentIndex
+from metadata_utils import extract_metadata
+
+
+@pytest.fixture
+def docs(tmp_path):
+    docs = tmp_path / "docs"
+    (docs / "guide" / "empty").mkdir(parents=True)
+    (docs / "index.md").write_text("---\ntitle: Home\ntags: [a, b]\n---\n# Welcome\n\nSome words here.\n")
+    (docs / "guide" / "setup.md").write_text("# Setup\n\n## Install\n\nRun it.\n")
+    return docs
+
+
+def saved_index(docs, snapshot):
+    index = DocumentIndex(docs, snapshot, extractor=extract_metadata)
+    index.build()
+    index.extract_missing()
+    assert index.save()
+    return index
+
+
+def test_snapshot_round_trip(docs, tmp_path):
+    snapshot = tmp_path / "documents.sqlite"
+    original = saved_index(docs, snapshot)
+
+    loaded = DocumentIndex(docs, snapshot, extractor=extract_metadata)
+    assert loaded.load()
+
+    assert loaded.list_documents() == original.list_documents()
+    assert loaded.list_directories() == original.list_directories()
+    for path in ("index.md", "guide/setup.md"):
+        assert loaded.get_metadata(path).to_dict() == original.get_metadata(path).to_dict()
+    assert loaded.get_metadata("index.md").frontmatter == {"title": "Home", "tags": ["a", "b"]}
+    # Not trusted for revalidation until reconciled with a scan
+    assert loaded.get_etag("index.md") is None
+
+
+def test_pickle_in_the_cache_directory_is_never_unpickled(docs, tmp_path):
+    snapshot = tmp_path / "documents.sqlite"
+    marker = tmp_path / "pwned"
+
+    class Payload:
+        def __reduce__(self):
+            return os.system, (f"touch {marker}",)
+
+    snapshot.write_bytes(pickle.dumps(Payload()))
+
+    index = DocumentIndex(docs, snapshot, extractor=extract_metadata)
+    assert not index.load()
+    assert not marker.exists()
+    # Falls back to a full scan
+    assert [row["path"] for row in index.list_documents()] == ["guide/setup.md", "index.md"]
+
+
+@pytest.mark.parametrize("damage", [
+    "truncate",
+    "version",
+    "docs_dir",
+    "format",
+    "bad_row",
+    "bad_outline",
+    "orphan_directory",
+])
+def test_damaged_or_foreign_snapshot_is_ignored(docs, tmp_path, damage):
+    snapshot = tmp_path / "documents.sqlite"
+    saved_index(docs, snapshot)
+
+    if damage == "truncate":
+        snapshot.write_bytes(snapshot.read_bytes()[:200])
+    else:
+        connection = sqlite3.connect(snapshot)
+        statements = {
+            "version": "UPDATE snapshot SET value = '1' WHERE key = 'version'",
+            "docs_dir": "UPDATE snapshot SET value = '/elsewhere' WHERE key = 'docs_dir'",
+            "format": "UPDATE snapshot SET value = 'search-index' WHERE key = 'format'",
+            "bad_row": "UPDATE documents SET size = 'big'",
+            "bad_outline": "UPDATE documents SET outline = '[[1, \"x\"' WHERE outline IS NOT NULL",
+            "orphan_directory": "INSERT INTO directories VALUES (99, 'missing/child')",
+        }
+        connection.execute(statements[damage])
+        connection.commit()
+        connection.close()
+
+    assert not DocumentIndex(docs, snapshot, extractor=extract_metadata).load()
+
+
+def test_document_count_is_maintained_through_every_change(docs, tmp_path):
+    index = DocumentIndex(docs, extractor=extract_metadata)
+    index.build()
+    assert len(index) == 2
+
+    (docs / "guide" / "more.md").write_text("# More\n")
+    index.refresh_path("guide/more.md")
+    index.set_etag("guide/more.md", "etag", 7, 1.0)
+    index.refresh_path("index.md")
+    assert len(index) == 3
+
+    (docs / "extra" / "deep").mkdir(parents=True)
+    (docs / "extra" / "a.md").write_text("# A\n")
+    (docs / "extra" / "deep" / "b.md").write_text("# B\n")
+    index.refresh_tree("extra")
+    assert len(index) == 5
+
+    index.remove_path("extra")
+    (docs / "index.md").unlink()
+    index.refresh_path("index.md")
+    assert len(index) == 2
+    assert len(index) == len(index.snapshot())
+
+
+def test_listings_wait_for_the_index_off_the_event_loop(client):
+    import main
+    finished = []
+    release = threading.Event()
+
+    def hold_index_lock():
+        # e.g. reconcile comparing the whole tree with a fresh scan
+        with main.document_index._lock:
+            holding.set()
+            release.wait(5)
+
+    holding = threading.Event()
+    threading.Thread(target=hold_index_lock).start()
+    holding.wait()
+    try:
+        for url in ("/api/documents", "/api/directories", "/api/sections"):
+            threading.Thread(target=lambda url=url: finished.append(client.get(url).status_code)).start()
+        time.sleep(0.2)
+        started = time.monotonic()
+        # Other requests, including a metrics scrape, are still served
+        assert client.get("/metrics").status_code == 200
+        assert client.get("/").status_code == 200
+        assert time.monotonic() - started < 2
+        assert finished == []
+    finally:
+        release.set()
+    deadline = time.monotonic() + 10
+    while len(finished) < 3 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert finished == [200, 200, 200]
@@ -0,0 +1,104 @@
+"""Tests for the change feed history and event stream"""
+
+import asyncio
+import json
+import threading
+
+import pytest
+
+from event_feed import EventFeed, parse_types
+
+
+def seqs(events):
+    return [event.seq for event in events]
+
+
+def test_since_boundaries():
+    feed = EventFeed(history=3)
+    start = feed.last_sequence
+    # Nothing published yet: only the current number is valid
+    assert feed.since(start) == []
+    assert feed.since(start - 1) is None
+
+    published = [feed.publish("document.updated", path=f"{n}.md") for n in range(3)]
+    assert published == [start + 1, start + 2, start + 3]
+
+    assert seqs(feed.since(start)) == published
+    assert seqs(feed.since(start + 1)) == published[1:]
+    assert feed.since(feed.last_sequence) == []
+    assert feed.since(feed.last_sequence + 1) is None
+
+    # The oldest event is dropped; only its predecessor's number can still resume
+    feed.publish("document.updated", path="3.md")
+    assert feed.since(start) is None
+    assert seqs(feed.since(start + 1)) == [start + 2, start + 3, start + 4]
+
+
+@pytest.mark.parametrize("after", [-1, 0, 10 ** 15, 2 ** 63])
+def test_foreign_or_future_ids_are_not_resumed(after):
+    feed = EventFeed()
+    feed.publish("document.updated", path="a.md")
+    assert feed.since(after) is None
+
+
+async def messages(stream, count, timeout=5.0):
+    """The next ``count`` SSE messages, as (event, data) pairs; comments and retry hints are skipped"""
+    found = []
+    buffered = ""
+    while len(found) < count:
+        buffered += await asyncio.wait_for(stream.__anext__(), timeout)
+        *complete, buffered = buffered.split("\n\n")
+        for message in complete:
+            fields = dict(line.split(": ", 1) for line in message.split("\n") if not line.startswith(":"))
+            if "event" in fields:
+                found.append((fields["event"], json.loads(fields["data"])))
+    return found
+
+
+def test_stream_follows_publishes_from_other_threads():
+    feed = EventFeed()
+
+    async def follow():
+        stream = feed.stream(types=parse_types("document, commit.landed"))
+        [(event, data)] = await messages(stream, 1)
+        assert event == "ready" and data["seq"] == feed.last_sequence
+
+        def publish():
+            feed.publish("push.completed", ok=True)
+            feed.publish("document.updated", path="a.md")
+            feed.publish("commit.failed", ticket=1)
+            feed.publish("commit.landed", ticket=2)
+
+        threading.Timer(0.1, publish).start()
+        received = await messages(stream, 2)
+        assert feed.subscribers == 1
+        await stream.aclose()
+        assert feed.subscribers == 0
+        return received
+
+    received = asyncio.run(follow())
+    assert [(event, data.get("path", data.get("ticket"))) for event, data in received] == [
+        ("document.updated", "a.md"), ("commit.landed", 2)
+    ]
+    assert received[1][1]["seq"] == feed.last_sequence
+
+
+def test_stream_resumes_or_resets():
+    feed = EventFeed(history=2)
+    first = feed.publish("document.created", path="a.md")
+    feed.publish("document.updated", path="a.md")
+
+    async def replay(after, count):
+        stream = feed.stream(after=after, keepalive=0.05)
+        try:
+            return await messages(stream, count)
+        finally:
+            await stream.aclose()
+
+    assert [event for event, _ in asyncio.run(replay(first, 1))] == ["document.updated"]
+    assert [event for event, _ in asyncio.run(replay(first - 1, 2))] == ["document.created", "document.updated"]
+
+    # Overflow: the client missed events that are gone, and must reload
+    feed.publish("document.deleted", path="a.md")
+    [(event, data)] = asyncio.run(replay(first - 1, 1))
+    assert event == "reset" and data["seq"] == feed.last_sequence
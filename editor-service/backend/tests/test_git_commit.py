@@ -0,0 +1,91 @@
+"""Tests for plumbing commits racing other writers of the branch"""
+
+import threading
+
+import pytest
+
+from conftest import git
+
+
+@pytest.fixture
+def racing(git_repo, monkeypatch):
+    """
+    Make another writer commit just before each ref update of the session
+
+    Yields:
+        Tuple of (checkout path, ids of the commits the other writer made,
+        number of races to lose, as a one-item list)
+    """
+    import git_utils
+    repo, _ = git_repo
+    update_ref = git_utils.SESSION.update_ref
+    theirs = []
+    races = [1]
+
+    def moved_first(ref, new, old):
+        if len(theirs) < races[0]:
+            other = repo / "docs" / f"other-{len(theirs)}.md"
+            other.write_text("# Other writer\n")
+            git(repo, "add", str(other))
+            git(repo, "commit", "-qm", f"Other writer {len(theirs)}")
+            theirs.append(git(repo, "rev-parse", "HEAD"))
+        return update_ref(ref, new, old)
+
+    monkeypatch.setattr(git_utils.SESSION, "update_ref", moved_first)
+    yield repo, theirs, races
+
+
+def test_commit_is_reapplied_on_a_head_that_moved(racing):
+    import git_utils
+    repo, theirs, _ = racing
+    (repo / "docs" / "mine.md").write_text("# Mine\n")
+
+    success, message, commit_id = git_utils.git_commit_paths([repo / "docs" / "mine.md"], "Add mine")
+
+    assert success, message
+    assert git(repo, "rev-parse", "HEAD") == commit_id
+    # On top of the other writer's commit, not instead of it
+    assert git(repo, "rev-parse", f"{commit_id}^") == theirs[0]
+    assert git(repo, "show", "HEAD:docs/other-0.md") == "# Other writer"
+    assert git(repo, "show", "HEAD:docs/mine.md") == "# Mine"
+    assert git(repo, "status", "--porcelain") == ""
+
+
+def test_commit_gives_up_when_head_keeps_moving(racing):
+    import git_utils
+    repo, theirs, races = racing
+    races[0] = git_utils.COMMIT_ATTEMPTS
+    (repo / "docs" / "mine.md").write_text("# Mine\n")
+
+    success, message, commit_id = git_utils.git_commit_paths([repo / "docs" / "mine.md"], "Add mine")
+
+    assert not success and commit_id is None
+    assert "kept moving" in message
+    # Every commit of the other writer is kept
+    assert git(repo, "rev-parse", "HEAD") == theirs[-1]
+    assert len(theirs) == git_utils.COMMIT_ATTEMPTS
+    assert "docs/mine.md" not in git(repo, "ls-tree", "-r", "--name-only", "HEAD")
+
+
+def test_concurrent_commits_all_land(git_repo):
+    import git_utils
+    repo, _ = git_repo
+    before = int(git(repo, "rev-list", "--count", "HEAD"))
+    results = []
+
+    def writer(name):
+        for number in range(5):
+            path = repo / "docs" / f"{name}-{number}.md"
+            path.write_text(f"# {name} {number}\n")
+            results.append(git_utils.git_commit_paths([path], f"{name} {number}"))
+
+    threads = [threading.Thread(target=writer, args=(name,)) for name in ("left", "right")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(60)
+
+    assert [success for success, _, _ in results] == [True] * 10
+    assert int(git(repo, "rev-list", "--count", "HEAD")) == before + 10
+    files = git(repo, "ls-tree", "-r", "--name-only", "HEAD").splitlines()
+    assert {f"docs/{name}-{number}.md" for name in ("left", "right") for number in range(5)} <= set(files)
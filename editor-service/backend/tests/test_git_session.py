@@ -0,0 +1,85 @@
+"""Tests for the long-lived git processes of a git session"""
+
+import sys
+import time
+
+import pytest
+
+from conftest import git
+from git_session import BatchProcess, GitProcessError, _readline
+
+# Echoes each stdin line; "noisy" first floods stderr, "hang" never answers,
+# "die" exits with a message on stderr
+FAKE_GIT = r"""
+import sys, time
+for line in sys.stdin:
+    line = line.strip()
+    if line == "noisy":
+        sys.stderr.write("warning: something\n" * 20000)
+        sys.stderr.flush()
+    elif line == "hang":
+        time.sleep(60)
+    elif line == "die":
+        sys.stderr.write("fatal: gave up\n")
+        sys.exit(1)
+    sys.stdout.write(line + "\n")
+    sys.stdout.flush()
+"""
+
+
+@pytest.fixture
+def fake(tmp_path):
+    process = BatchProcess(tmp_path, [sys.executable, "-c", FAKE_GIT], timeout=1.0)
+    yield process
+    process.close()
+
+
+def test_flood_of_error_output_does_not_block_the_process(fake):
+    # Far more than a pipe buffer, which nobody would read until the process died
+    assert fake.request(b"noisy\n", _readline) == b"noisy\n"
+    assert fake.request(b"after\n", _readline) == b"after\n"
+    assert fake.starts == 1
+
+
+def test_request_without_reply_kills_and_restarts_the_process(fake):
+    started = time.monotonic()
+    with pytest.raises(GitProcessError, match="no reply within 1s"):
+        fake.request(b"hang\n", _readline)
+    # The deadline plus at most one watchdog interval
+    assert time.monotonic() - started < 5
+
+    assert fake.request(b"again\n", _readline) == b"again\n"
+    assert fake.starts == 2
+
+
+def test_error_output_of_an_exited_process_is_reported(fake):
+    with pytest.raises(GitProcessError, match="fatal: gave up"):
+        fake.request(b"die\n", _readline)
+    assert fake.request(b"back\n", _readline) == b"back\n"
+
+
+def test_update_ref_reports_a_lost_race(git_repo):
+    import git_utils
+    repo, _ = git_repo
+    head = git(repo, "rev-parse", "HEAD")
+    tree = git(repo, "rev-parse", "HEAD^{tree}")
+    first = git(repo, "commit-tree", tree, "-p", head, "-m", "first")
+    second = git(repo, "commit-tree", tree, "-p", head, "-m", "second")
+
+    assert git_utils.SESSION.update_ref("HEAD", first, head) is True
+    # HEAD is no longer at the old value the second writer expected
+    assert git_utils.SESSION.update_ref("HEAD", second, head) is False
+    assert git(repo, "rev-parse", "HEAD") == first
+
+
+def test_update_ref_raises_when_the_ref_did_not_move(git_repo):
+    import git_utils
+    repo, _ = git_repo
+    head = git(repo, "rev-parse", "HEAD")
+    commit = git(repo, "commit-tree", git(repo, "rev-parse", "HEAD^{tree}"), "-p", head, "-m", "locked")
+    # A stale lock left by a crashed git process
+    (repo / ".git" / "refs" / "heads" / "main.lock").write_text("")
+
+    with pytest.raises(GitProcessError, match="lock"):
+        git_utils.SESSION.update_ref("HEAD", commit, head)
+    assert git(repo, "rev-parse", "HEAD") == head
@@ -0,0 +1,80 @@
+"""Tests for link graph snapshots"""
+
+import os
+import pickle
+import sqlite3
+
+import pytest
+
+from link_graph import LinkGraph
+
+DOCS = {
+    "index.md": "# Home\n\nSee [setup](guide/setup.md#install) and [gone](missing.md).\n",
+    "guide/setup.md": "# Setup\n\n## Install\n\nBack [home](../index.md#nowhere).\n",
+}
+
+
+def saved_graph(tmp_path):
+    graph = LinkGraph(tmp_path, tmp_path / "links.sqlite")
+    for path, text in DOCS.items():
+        graph.index_document(path, text, (len(text), 1.0))
+    assert graph.save()
+    return graph
+
+
+def test_snapshot_round_trip(tmp_path):
+    original = saved_graph(tmp_path)
+
+    loaded = LinkGraph(tmp_path, tmp_path / "links.sqlite")
+    assert loaded.load()
+
+    report, expected = loaded.check(), original.check()
+    for key in ("documents", "links", "broken", "missing_anchors"):
+        assert report[key] == expected[key]
+    assert [entry["target"] for entry in report["broken"]] == ["missing.md"]
+    for path in ("index.md", "guide/setup.md", "missing.md"):
+        assert loaded.page(path) == original.page(path)
+
+    # The rebuilt reverse maps are maintained like the original ones
+    loaded.remove_document("index.md")
+    assert loaded.page("guide/setup.md")["backlinks"] == []
+    assert loaded.page("missing.md") is None
+
+
+def test_pickle_in_the_cache_directory_is_never_unpickled(tmp_path):
+    snapshot = tmp_path / "links.sqlite"
+    marker = tmp_path / "pwned"
+
+    class Payload:
+        def __reduce__(self):
+            return os.system, (f"touch {marker}",)
+
+    snapshot.write_bytes(pickle.dumps(Payload()))
+
+    assert not LinkGraph(tmp_path, snapshot).load()
+    assert not marker.exists()
+
+
+@pytest.mark.parametrize("damage", ["truncate", "version", "docs_dir", "bad_anchors", "bad_line", "orphan_link"])
+def test_damaged_or_foreign_snapshot_is_ignored(tmp_path, damage):
+    snapshot = tmp_path / "links.sqlite"
+    saved_graph(tmp_path)
+
+    if damage == "truncate":
+        snapshot.write_bytes(snapshot.read_bytes()[:200])
+    else:
+        connection = sqlite3.connect(snapshot)
+        statements = {
+            "version": "UPDATE snapshot SET value = '1' WHERE key = 'version'",
+            "docs_dir": "UPDATE snapshot SET value = '/elsewhere' WHERE key = 'docs_dir'",
+            "bad_anchors": "UPDATE documents SET anchors = '{\"home\": 1}'",
+            "bad_line": "UPDATE links SET line = 'first'",
+            "orphan_link": "INSERT INTO links VALUES ('other.md', 'x.md', 'x.md', '', 1)",
+        }
+        connection.execute(statements[damage])
+        connection.commit()
+        connection.close()
+
+    graph = LinkGraph(tmp_path, snapshot)
+    assert not graph.load()
+    assert len(graph) == 0
@@ -0,0 +1,120 @@
+"""Tests for paged, filtered and streamed listings"""
+
+import json
+
+import pytest
+
+import listing_utils
+from document_index import DocumentIndex
+
+# "-" < "." < "/" < "0", so a subtree sorts between its siblings
+NAMES = ["foo.md", "foo-bar.md", "foo0.md", "foo/x.md", "foo/sub/y.md", "foo-bar/z.md", "foo.d/w.md", "a.md"]
+
+
+@pytest.fixture
+def docs(tmp_path):
+    docs = tmp_path / "docs"
+    for name in NAMES:
+        (docs / name).parent.mkdir(parents=True, exist_ok=True)
+        (docs / name).write_text(f"# {name}\n")
+    return docs
+
+
+def pages(index, kind, size, prefix=""):
+    rows, after = [], None
+    while True:
+        page = index.page(kind, prefix, after, size)
+        rows.extend(page)
+        if len(page) < size:
+            return rows
+        after = page[-1]["path"]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 100])
+def test_pages_reproduce_the_sorted_listing(docs, size):
+    index = DocumentIndex(docs)
+    index.build()
+    documents = index.list_documents()
+    directories = index.list_directories()
+
+    assert [row["path"] for row in documents] == sorted(NAMES)
+    assert [row["path"] for row in directories] == ["foo", "foo-bar", "foo.d", "foo/sub"]
+    assert pages(index, "documents", size) == documents
+    assert pages(index, "directories", size) == directories
+
+
+def test_prefix_only_lists_that_directory(docs):
+    index = DocumentIndex(docs)
+    index.build()
+
+    # Not "foo-bar/z.md" or "foo.md", which share the string prefix
+    assert [row["path"] for row in pages(index, "documents", 2, "foo")] == ["foo/sub/y.md", "foo/x.md"]
+    assert [row["path"] for row in pages(index, "directories", 1, "/foo/")] == ["foo/sub"]
+    assert index.page("documents", "missing") == []
+    assert index.page("documents", "foo.md") == []
+
+
+@pytest.fixture
+def listing(client, request):
+    """Documents below a directory of their own in the shared workspace"""
+    directory = f"listing/{request.node.name}"
+    for name in NAMES:
+        created = client.post("/api/documents", json={
+            "path": f"{directory}/{name}", "content": f"# {name}\n", "push": False
+        })
+        assert created.status_code == 200
+    return directory, sorted(f"{directory}/{name}" for name in NAMES)
+
+
+def test_cursor_pages_through_the_endpoint(client, listing):
+    directory, paths = listing
+    full = client.get("/api/documents").json()
+    for params in ({}, {"prefix": directory}):
+        expected = [row for row in full if row["path"].startswith(params.get("prefix", ""))]
+        rows, cursor = [], None
+        while True:
+            response = client.get("/api/documents", params={**params, "limit": 3, "cursor": cursor})
+            assert response.status_code == 200
+            rows.extend(response.json())
+            cursor = response.headers.get("x-next-cursor")
+            if cursor is None:
+                break
+        assert rows == expected
+    assert [row["path"] for row in rows] == paths
+
+    last = client.get("/api/documents", params={"prefix": directory, "limit": len(paths)})
+    assert "x-next-cursor" not in last.headers
+    for cursor in ("%%%", "bm90IHV0Zi04\xff", "_w"):
+        assert client.get("/api/documents", params={"cursor": cursor}).status_code == 400
+
+
+def test_fields_are_selected_and_unknown_fields_rejected(client, listing):
+    directory, paths = listing
+    rows = client.get("/api/documents", params={"prefix": directory, "fields": "path,title,outline"}).json()
+    assert rows[0]["path"] == paths[0]
+    assert set(rows[0]) == {"path", "title", "outline"}
+    assert rows[0]["title"] == "a.md"
+    assert [(heading["level"], heading["text"]) for heading in rows[0]["outline"]] == [(1, "a.md")]
+
+    response = client.get("/api/documents", params={"fields": "path,secret"})
+    assert response.status_code == 400
+    assert "secret" in response.json()["detail"]
+    assert client.get("/api/directories", params={"fields": "size"}).status_code == 400
+
+
+def test_ndjson_streams_one_row_per_line(client, listing, monkeypatch):
+    directory, paths = listing
+    # Several index chunks per stream
+    monkeypatch.setattr(listing_utils, "STREAM_CHUNK_SIZE", 3)
+    expected = client.get("/api/documents", params={"prefix": directory, "fields": "path,size"}).json()
+
+    for params, headers in (({"format": "ndjson"}, {}), ({}, {"Accept": "application/x-ndjson"})):
+        response = client.get("/api/documents", params={**params, "prefix": directory, "fields": "path,size"},
+                              headers=headers)
+        assert response.headers["content-type"].startswith(listing_utils.NDJSON_MEDIA_TYPE)
+        assert response.text.endswith("\n")
+        lines = response.text.split("\n")[:-1]
+        assert [json.loads(line) for line in lines] == expected
+
+    limited = client.get("/api/documents", params={"format": "ndjson", "prefix": directory, "limit": 4})
+    assert [json.loads(line)["path"] for line in limited.text.splitlines()] == paths[:4]
@@ -0,0 +1,96 @@
+"""Tests for navigation validation against the document set"""
+
+import pytest
+
+import mkdocs_utils
+from mkdocs_utils import validate_navigation
+from nav_index import NavIndex
+
+MKDOCS_YML = """\
+site_name: Test
+not_in_nav: |
+  drafts/
+nav:
+  - Home: index.md
+  - Guide:
+    - Overview: guide/index.md
+    - Setup: guide/setup.md
+    - Again: index.md
+    - Folder: guide/
+    - Sub: guide/sub
+    - Gone: guide/gone.md
+    - https://example.com
+    - assets/logo.png
+"""
+
+DOCUMENTS = ["index.md", "guide/index.md", "guide/setup.md", "guide/orphan.md", "guide/sub/page.md", "drafts/wip.md"]
+
+
+@pytest.fixture
+def site(tmp_path):
+    docs = tmp_path / "docs"
+    for path in DOCUMENTS + ["assets/logo.png"]:
+        (docs / path).parent.mkdir(parents=True, exist_ok=True)
+        (docs / path).write_text("# Page\n")
+    (tmp_path / "mkdocs.yml").write_text(MKDOCS_YML)
+    return tmp_path / "mkdocs.yml", docs
+
+
+def test_orphans_duplicates_and_directory_targets(site):
+    mkdocs_path, docs = site
+    result = validate_navigation(mkdocs_path, docs)
+
+    assert result["orphaned"] == ["guide/orphan.md", "guide/sub/page.md"]
+    assert result["duplicates"] == {"index.md": ["Home", "Guide / Again"]}
+    assert result["directory_targets"] == ["guide/", "guide/sub"]
+    assert result["missing"] == ["guide/gone.md"]
+    assert not result["valid"]
+    assert sorted(result["errors"]) == [
+        "Navigation item 'Folder' points to a directory: guide/",
+        "Navigation item 'Gone' points to non-existent file: guide/gone.md",
+        "Navigation item 'Sub' points to a directory: guide/sub",
+    ]
+    assert result["warnings"] == ["'index.md' appears 2 times in navigation"]
+
+
+def test_known_documents_are_not_checked_on_disk(site, monkeypatch):
+    mkdocs_path, docs = site
+
+    def no_scan(docs_dir):
+        raise AssertionError("the document set was given")
+
+    monkeypatch.setattr(mkdocs_utils, "scan_tree", no_scan)
+    from_index = validate_navigation(mkdocs_path, docs, DOCUMENTS, ["guide", "guide/sub", "drafts", "assets"])
+    monkeypatch.undo()
+    assert from_index == validate_navigation(mkdocs_path, docs)
+
+    # Only targets that are neither documents nor directories need a lookup
+    index = NavIndex(mkdocs_utils.config_cache.get(mkdocs_path)["nav"])
+    checked = []
+    index.validate(set(DOCUMENTS), {"guide", "guide/sub"}, exists=lambda target: checked.append(target) or True)
+    assert checked == ["assets/logo.png"]
+
+
+def test_index_follows_nav_edits():
+    nav = [{"Home": "index.md"}, {"Guide": [{"Overview": "guide/index.md"}, {"Again": "index.md"}]}]
+    index = NavIndex(nav)
+    assert index.section("Guide") is nav[1]
+    assert index.subsection("Guide", "Overview") is nav[1]["Guide"][0]
+    assert index.label_for((), "guide", "guide") == "Guide"
+
+    index.remove(("Guide",))
+    result = index.validate({"index.md", "guide/index.md"}, set(), exists=lambda target: True)
+    assert result["duplicates"] == {}
+    assert result["orphaned"] == ["guide/index.md"]
+    assert index.section("Guide") is None and index.subsection("Guide", "Overview") is None
+
+    index.add((), {"Manual": ["guide/index.md"]})
+    assert index.validate({"index.md", "guide/index.md"}, set(), exists=lambda target: True)["orphaned"] == []
+
+
+def test_without_a_nav_nothing_is_orphaned(tmp_path):
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "index.md").write_text("# Home\n")
+    (tmp_path / "mkdocs.yml").write_text("site_name: Test\n")
+    result = validate_navigation(tmp_path / "mkdocs.yml", tmp_path / "docs")
+    assert result["valid"] and result["orphaned"] == []
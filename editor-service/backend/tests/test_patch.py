@@ -0,0 +1,114 @@
+"""Tests for line-range and unified-diff patches"""
+
+import pytest
+
+from conftest import REPO
+from patch_utils import PatchError, apply_line_edits, diff_to_edits, line_ending, split_lines
+
+DOCS = REPO / "docs"
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("", []),
+    ("one", ["one"]),
+    ("one\n", ["one\n"]),
+    ("one\ntwo", ["one\n", "two"]),
+    ("a\x0cb\nc\n", ["a\x0cb\n", "c\n"]),
+    ("a\u2028b\nc d\n", ["a\u2028b\n", "c d\n"]),
+    ("a\x0b\x1c\x1d\x1e\x85b\n", ["a\x0b\x1c\x1d\x1e\x85b\n"]),
+    ("a\r\nb\r\n", ["a\r\n", "b\r\n"]),
+    ("a\rb\n", ["a\rb\n"]),
+])
+def test_split_lines_breaks_on_newline_only(text, expected):
+    assert split_lines(text) == expected
+    assert "".join(split_lines(text)) == text
+
+
+def test_line_edit_after_form_feed_replaces_the_right_line():
+    base = "# T\nform\x0cfeed line\nthird\nfourth\n"
+    content, first = apply_line_edits(base, [{"start": 2, "end": 3, "text": "THIRD\n"}])
+    assert content == "# T\nform\x0cfeed line\nTHIRD\nfourth\n"
+    assert first == 2
+
+
+def test_line_edit_after_line_separator_replaces_the_right_line():
+    base = "# T\nsee\u2028also\nthird\n"
+    content, _ = apply_line_edits(base, [{"start": 2, "end": 3, "text": "THIRD\n"}])
+    assert content == "# T\nsee\u2028also\nTHIRD\n"
+
+
+def test_out_of_range_edit_is_rejected():
+    with pytest.raises(PatchError):
+        apply_line_edits("a\x0cb\n", [{"start": 1, "end": 2, "text": "x\n"}])
+
+
+def test_diff_with_form_feed_and_crlf_context():
+    base = "# T\r\nform\x0cfeed\r\nthird\r\n"
+    diff = "@@ -2,2 +2,2 @@\n form\x0cfeed\n-third\n+THIRD\n"
+    edits = diff_to_edits(base, diff)
+    assert edits == [{"start": 1, "end": 3, "text": "form\x0cfeed\nTHIRD\n"}]
+
+
+def test_line_ending_detection():
+    assert line_ending("a\r\nb\r\n") == "\r\n"
+    assert line_ending("a\r\nb\n") == "\n"
+    assert line_ending("a\nb\n") == "\n"
+    assert line_ending("no breaks") == "\n"
+
+
+def put_and_get(client, path, raw):
+    (DOCS / path).write_bytes(raw)
+    response = client.get(f"/api/documents/{path}")
+    assert response.status_code == 200
+    return response.json()["content"], response.headers["etag"]
+
+
+def patch(client, path, etag, edits):
+    return client.patch(f"/api/documents/{path}", json={"edits": edits, "base_etag": etag, "push": False})
+
+
+def test_patch_endpoint_form_feed_body(client):
+    raw = "# T\nform\x0cfeed line\nthird\nfourth\n".encode("utf-8")
+    content, etag = put_and_get(client, "ff.md", raw)
+    assert content.split("\n")[2] == "third"
+
+    response = patch(client, "ff.md", etag, [{"start": 2, "end": 3, "text": "THIRD\n"}])
+
+    assert response.status_code == 200
+    assert (DOCS / "ff.md").read_bytes() == "# T\nform\x0cfeed line\nTHIRD\nfourth\n".encode("utf-8")
+    assert client.get("/api/documents/ff.md").headers["etag"] == response.json()["etag"]
+
+
+def test_patch_endpoint_line_separator_body(client):
+    raw = "# T\nsee\u2028also\nthird\n".encode("utf-8")
+    _, etag = put_and_get(client, "ls.md", raw)
+
+    response = patch(client, "ls.md", etag, [{"start": 2, "end": 3, "text": "THIRD\n"}])
+
+    assert response.status_code == 200
+    assert (DOCS / "ls.md").read_bytes() == "# T\nsee\u2028also\nTHIRD\n".encode("utf-8")
+
+
+def test_patch_endpoint_keeps_crlf_line_endings(client):
+    raw = b"# T\r\none\r\ntwo\r\nthree\r\n"
+    content, etag = put_and_get(client, "crlf.md", raw)
+    assert content == "# T\none\ntwo\nthree\n"
+
+    response = patch(client, "crlf.md", etag, [{"start": 2, "end": 3, "text": "TWO\nextra\n"}])
+
+    assert response.status_code == 200
+    assert (DOCS / "crlf.md").read_bytes() == b"# T\r\none\r\nTWO\r\nextra\r\nthree\r\n"
+    # Only the suffix from the changed line on was rewritten
+    assert response.json()["bytes_written"] == len(b"TWO\r\nextra\r\nthree\r\n")
+    assert client.get("/api/documents/crlf.md").headers["etag"] == response.json()["etag"]
+
+
+def test_patch_endpoint_diff_on_crlf_body(client):
+    raw = b"# T\r\none\r\ntwo\r\n"
+    _, etag = put_and_get(client, "crlf-diff.md", raw)
+    diff = "--- a/crlf-diff.md\n+++ b/crlf-diff.md\n@@ -2,2 +2,2 @@\n one\n-two\n+TWO\n"
+
+    response = client.patch("/api/documents/crlf-diff.md", json={"diff": diff, "base_etag": etag, "push": False})
+
+    assert response.status_code == 200
+    assert (DOCS / "crlf-diff.md").read_bytes() == b"# T\r\none\r\nTWO\r\n"
@@ -0,0 +1,105 @@
+"""Tests for request profiling and profile downloads"""
+
+import json
+import pstats
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import main
+from async_utils import run_fs
+from config import Settings
+from profiling import SPEEDSCOPE_SCHEMA, ProfileStore, ProfilingMiddleware
+
+TOKEN = "profile-secret"
+
+
+def busy_work(count: int) -> int:
+    return sum(number * number for number in range(count))
+
+
+def profiled_app(store, **options):
+    """A small app behind the profiling middleware"""
+    app = FastAPI()
+
+    @app.get("/work")
+    async def work():
+        return {"total": await run_fs(busy_work, 20000)}
+
+    app.add_middleware(ProfilingMiddleware, store=store, **options)
+    return TestClient(app)
+
+
+def test_profiling_is_off_by_default(client):
+    settings = Settings()
+    assert settings.profile_token is None and not settings.profile_requests
+
+    assert client.get("/api/profiles").status_code == 404
+    assert client.get("/api/profiles/anything", headers={"X-Profile": TOKEN}).status_code == 404
+
+    store = ProfileStore()
+    response = profiled_app(store).get("/work", headers={"X-Profile": TOKEN})
+    assert response.status_code == 200
+    assert "x-profile-id" not in response.headers
+    assert store.list() == []
+
+
+def test_profiles_are_refused_without_the_token(client, monkeypatch):
+    monkeypatch.setattr(main.settings, "profile_token", TOKEN)
+
+    assert client.get("/api/profiles").status_code == 403
+    assert client.get("/api/profiles", headers={"X-Profile": "wrong"}).status_code == 403
+    assert client.get("/api/profiles/anything").status_code == 403
+    assert client.get("/api/profiles", headers={"X-Profile": TOKEN}).status_code == 200
+
+    # A wrong token does not start a profile either
+    store = ProfileStore()
+    response = profiled_app(store, token=TOKEN).get("/work", headers={"X-Profile": "wrong"})
+    assert "x-profile-id" not in response.headers
+    assert store.list() == []
+
+
+@pytest.fixture
+def captured(client, monkeypatch):
+    """Id of a profile captured with the token, served by the app"""
+    store = ProfileStore()
+    response = profiled_app(store, token=TOKEN).get("/work", headers={"X-Profile": TOKEN})
+    assert response.status_code == 200
+    monkeypatch.setattr(main.settings, "profile_token", TOKEN)
+    monkeypatch.setattr(main, "profile_store", store)
+    return response.headers["x-profile-id"]
+
+
+def test_captured_profile_is_listed(client, captured):
+    [summary] = client.get("/api/profiles", headers={"X-Profile": TOKEN}).json()
+    assert summary["id"] == captured
+    assert (summary["method"], summary["path"], summary["status"], summary["reason"]) == ("GET", "/work", 200, "requested")
+    assert client.get("/api/profiles/unknown", headers={"X-Profile": TOKEN}).status_code == 404
+
+
+def test_captured_profile_downloads_as_speedscope(client, captured):
+    response = client.get(f"/api/profiles/{captured}", headers={"X-Profile": TOKEN})
+    assert response.status_code == 200
+    assert f'filename="{captured}.speedscope.json"' in response.headers["content-disposition"]
+
+    data = json.loads(response.content)
+    assert data["$schema"] == SPEEDSCOPE_SCHEMA
+    frames = [frame["name"] for frame in data["shared"]["frames"]]
+    assert "busy_work" in frames
+    for profile in data["profiles"]:
+        for sample in profile.get("samples", ()):
+            assert all(0 <= index < len(frames) for index in sample)
+
+
+def test_captured_profile_downloads_as_pstats(client, captured, tmp_path):
+    response = client.get(f"/api/profiles/{captured}", params={"format": "pstats"}, headers={"X-Profile": TOKEN})
+    assert response.status_code == 200
+    assert f'filename="{captured}.prof"' in response.headers["content-disposition"]
+
+    dump = tmp_path / "request.prof"
+    dump.write_bytes(response.content)
+    stats = pstats.Stats(str(dump))
+    assert any(function == "busy_work" for _, _, function in stats.stats)
+    assert client.get(f"/api/profiles/{captured}", params={"format": "svg"},
+                      headers={"X-Profile": TOKEN}).status_code == 422
@@ -0,0 +1,123 @@
+"""Tests for the background push worker against a local bare remote"""
+
+import queue
+
+import pytest
+
+from conftest import git
+from push_worker import PushWorker
+
+
+def commit_file(repo, name, content, message):
+    (repo / "docs" / name).write_text(content)
+    git(repo, "add", "-A")
+    git(repo, "commit", "-qm", message)
+    return git(repo, "rev-parse", "HEAD")
+
+
+@pytest.fixture
+def results():
+    return queue.Queue()
+
+
+@pytest.fixture
+def worker(git_repo, results):
+    worker = PushWorker(retry_base=0.5, retry_max=1.0, on_result=results.put)
+    yield worker
+    worker.stop(timeout=10)
+
+
+def test_push_reaches_remote(git_repo, worker, results):
+    repo, bare = git_repo
+    head = commit_file(repo, "new.md", "# New\n", "Add new page")
+
+    worker.start()
+    worker.request_push()
+    result = results.get(timeout=10)
+
+    assert result["success"] is True
+    assert result["message"] == "Pushed to origin/main"
+    assert git(bare, "rev-parse", "main") == head
+
+
+def test_requests_are_coalesced_into_one_push(git_repo, worker, results):
+    repo, bare = git_repo
+    commit_file(repo, "a.md", "a", "Add a")
+    for _ in range(3):
+        worker.request_push()
+    head = commit_file(repo, "b.md", "b", "Add b")
+
+    worker.start()
+    result = results.get(timeout=10)
+
+    assert result["success"] is True
+    assert result["coalesced_requests"] == 3
+    assert git(bare, "rev-parse", "main") == head
+    status = worker.status()
+    assert status["queue_depth"] == 0
+    assert status["total_pushes"] == 1
+    assert results.empty()
+
+
+def test_rejected_push_is_retried_with_backoff(git_repo, worker, results, tmp_path):
+    repo, bare = git_repo
+    # Someone else pushes first, so our branch is no longer a fast-forward
+    other = tmp_path / "other"
+    git(tmp_path, "clone", "-q", str(bare), str(other))
+    (other / "docs" / "other.md").write_text("other")
+    git(other, "add", "-A")
+    git(other, "-c", "user.name=Other", "-c", "user.email=other@example.com", "commit", "-qm", "Other change")
+    git(other, "push", "-q", "origin", "main")
+    commit_file(repo, "ours.md", "ours", "Our change")
+
+    worker.start()
+    worker.request_push()
+    failed = results.get(timeout=10)
+
+    assert failed["success"] is False
+    assert "Failed to push" in failed["message"]
+    status = worker.status()
+    assert status["consecutive_failures"] == 1
+    assert status["queue_depth"] == 1
+    assert status["next_retry_in"] is not None
+    assert status["total_pushes"] == 0
+    assert status["last_success_at"] is None
+
+    # Once the checkout is rebased the scheduled retry goes through
+    # without another request
+    git(repo, "pull", "-q", "--rebase", "origin", "main")
+    head = git(repo, "rev-parse", "HEAD")
+    while True:
+        result = results.get(timeout=10)
+        if result["success"]:
+            break
+
+    assert git(bare, "rev-parse", "main") == head
+    status = worker.status()
+    assert status["consecutive_failures"] == 0
+    assert status["next_retry_in"] is None
+    assert status["queue_depth"] == 0
+    assert status["total_pushes"] == 1
+    assert status["last_success_at"] == result["finished_at"]
+    assert status["last_result"]["success"] is True
+
+
+def test_backoff_delay_doubles_up_to_the_limit():
+    worker = PushWorker(retry_base=1.0, retry_max=5.0)
+    delays = []
+    for failures in range(1, 6):
+        worker._failures = failures
+        delays.append(worker._backoff_delay())
+    assert delays == [1.0, 2.0, 4.0, 5.0, 5.0]
+
+
+def test_stop_makes_a_final_attempt_for_pending_pushes(git_repo, results):
+    repo, bare = git_repo
+    head = commit_file(repo, "late.md", "late", "Late change")
+    worker = PushWorker(on_result=results.put)
+    worker.start()
+    worker.request_push()
+    worker.stop(timeout=10)
+
+    assert results.get(timeout=1)["success"] is True
+    assert git(bare, "rev-parse", "main") == head
@@ -0,0 +1,67 @@
+"""Tests for server-side markdown previews"""
+
+import pytest
+
+from conftest import MKDOCS_YML
+from render_utils import MarkdownRenderer
+
+
+@pytest.fixture
+def site(tmp_path):
+    """A checkout with mkdocs.yml, a docs tree and files outside it"""
+    (tmp_path / "docs" / "snippets").mkdir(parents=True)
+    (tmp_path / "docs" / "snippets" / "note.md").write_text("Shared note text")
+    (tmp_path / "secret.txt").write_text("TOP-SECRET")
+    (tmp_path / ".git").mkdir()
+    (tmp_path / ".git" / "config").write_text("[remote \"origin\"]\n\turl = https://token@example.com/repo\n")
+    (tmp_path / "mkdocs.yml").write_text(MKDOCS_YML)
+    return tmp_path
+
+
+def render(site, content, mkdocs_yml=None):
+    if mkdocs_yml is not None:
+        (site / "mkdocs.yml").write_text(mkdocs_yml)
+    renderer = MarkdownRenderer(site / "mkdocs.yml", site / "docs")
+    html, _ = renderer.render(content)
+    return html
+
+
+def test_snippets_inside_docs_are_included(site):
+    assert "Shared note text" in render(site, '--8<-- "snippets/note.md"')
+
+
+@pytest.mark.parametrize("target", [
+    "../secret.txt",
+    "../.git/config",
+    ".git/config",
+    "snippets/../../secret.txt",
+])
+def test_snippets_outside_docs_are_refused(site, target):
+    html = render(site, f'Before\n\n--8<-- "{target}"\n\nAfter')
+    assert "TOP-SECRET" not in html
+    assert "token@example.com" not in html
+    assert "After" in html
+
+
+def test_absolute_snippet_paths_are_refused(site):
+    html = render(site, f'--8<-- "{site / "secret.txt"}"')
+    assert "TOP-SECRET" not in html
+
+
+def test_base_paths_outside_docs_are_dropped(site):
+    # A base_path of "." in mkdocs.yml would otherwise expose the whole checkout
+    config = MKDOCS_YML.replace("  - pymdownx.snippets\n", "  - pymdownx.snippets:\n      base_path: [\".\", \"docs\"]\n")
+    assert "TOP-SECRET" not in render(site, '--8<-- "secret.txt"', config)
+    assert "Shared note text" in render(site, '--8<-- "snippets/note.md"', config)
+
+
+def test_missing_snippet_renders_quietly(site):
+    html = render(site, 'Text\n\n--8<-- "does-not-exist.md"\n')
+    assert "Text" in html
+
+
+def test_render_endpoint_does_not_leak_repository_files(client):
+    response = client.post("/api/render", json={"content": '--8<-- ".git/config"\n\n--8<-- "../mkdocs.yml"'})
+    assert response.status_code == 200
+    assert "[core]" not in response.json()["html"]
+    assert "site_name" not in response.json()["html"]
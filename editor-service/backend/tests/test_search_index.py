@@ -0,0 +1,238 @@
+"""Tests for BM25 ranking, index snapshots and queued index listeners"""
+
+import math
+import os
+import pickle
+import sqlite3
+import threading
+
+import pytest
+
+from document_index import QueuedListener
+from metadata_utils import extract_metadata
+from search_index import SearchIndex, tokenize
+
+
+def brute_force_scores(docs, query, k1=1.2, b=0.75):
+    """Textbook BM25 over every document, for comparison"""
+    tokens = {path: tokenize(text) for path, text in docs.items()}
+    avg = sum(len(t) for t in tokens.values()) / len(tokens)
+    scores = {}
+    for term in dict.fromkeys(tokenize(query)):
+        df = sum(1 for t in tokens.values() if term in t)
+        if not df:
+            continue
+        idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+        for path, t in tokens.items():
+            tf = t.count(term)
+            if tf:
+                norm = k1 * (1 - b + b * len(t) / avg)
+                scores[path] = scores.get(path, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+    return scores
+
+
+def build(tmp_path, docs):
+    index = SearchIndex(tmp_path)
+    for path, text in docs.items():
+        index.index_document(path, text, (len(text), 1.0))
+    return index
+
+
+def test_common_terms_are_scored_for_every_document(tmp_path):
+    # "guide" is in every document, "kubernetes" in one: documents that only
+    # match the common term must still be counted and ranked
+    docs = {f"doc{i}.md": f"guide page number {i} " + "filler " * i for i in range(20)}
+    docs["k8s.md"] = "kubernetes guide"
+    index = build(tmp_path, docs)
+
+    result = index.search("kubernetes guide", limit=100)
+    expected = brute_force_scores(docs, "kubernetes guide")
+
+    assert result["total"] == len(expected) == 21
+    assert [hit["path"] for hit in result["results"]][0] == "k8s.md"
+    for hit in result["results"]:
+        assert math.isclose(hit["score"], expected[hit["path"]], abs_tol=1e-3)
+    ordered = sorted(expected, key=lambda path: -expected[path])
+    assert [hit["path"] for hit in result["results"]] == ordered
+
+
+def test_paging_is_consistent_with_the_full_ranking(tmp_path):
+    docs = {f"doc{i}.md": "alpha " * (i % 5 + 1) + "beta " * (i % 3) for i in range(30)}
+    index = build(tmp_path, docs)
+
+    everything = [hit["path"] for hit in index.search("alpha beta", limit=30)["results"]]
+    paged = []
+    for offset in range(0, 30, 7):
+        paged.extend(hit["path"] for hit in index.search("alpha beta", limit=7, offset=offset)["results"])
+    assert paged == everything
+
+
+def test_scores_stay_exact_through_small_updates(tmp_path):
+    docs = {f"doc{i}.md": "alpha beta " + "filler " * (i % 7) for i in range(200)}
+    index = build(tmp_path, docs)
+    index.search("alpha")
+    # Each update moves the average length by far less than a percent
+    for i in range(0, 200, 40):
+        docs[f"doc{i}.md"] = "alpha " * 3 + "filler"
+        index.index_document(f"doc{i}.md", docs[f"doc{i}.md"], (1, 2.0))
+    index.remove_document("doc7.md")
+    del docs["doc7.md"]
+
+    expected = brute_force_scores(docs, "alpha beta")
+    # Unrounded, unlike the scores in search results
+    ranked, total = index._rank(["alpha", "beta"], len(docs))
+    assert total == len(expected)
+    for doc_id, score in ranked:
+        assert math.isclose(score, expected[index._paths[doc_id]], rel_tol=1e-9)
+
+
+def test_reused_document_ids_keep_postings_sorted(tmp_path):
+    docs = {f"doc{i}.md": f"common word{i}" for i in range(10)}
+    index = build(tmp_path, docs)
+    for i in (2, 5, 8):
+        index.remove_document(f"doc{i}.md")
+    # Take the freed ids, in the middle of the posting lists
+    for name in ("new1.md", "new2.md"):
+        index.index_document(name, "common fresh", (1, 2.0))
+    ids, _ = index._postings["common"]
+    assert list(ids) == sorted(ids)
+
+    for name in ("doc0.md", "new1.md", "doc9.md", "new2.md"):
+        index.remove_document(name)
+    assert sorted(hit["path"] for hit in index.search("common", limit=20)["results"]) == [
+        "doc1.md", "doc3.md", "doc4.md", "doc6.md", "doc7.md"
+    ]
+    assert index.search("fresh")["total"] == 0
+
+
+def test_result_titles_match_the_listing_titles(tmp_path):
+    text = "---\ntitle: Real\n---\n```sh\n# install deps\n```\n\nSetup steps.\n"
+    untitled = "```\n# not a heading\n```\n\nSetup Guide\n===========\n\nsteps\n"
+    index = build(tmp_path, {"real.md": text, "setext.md": untitled})
+
+    titles = {hit["path"]: hit["title"] for hit in index.search("setup")["results"]}
+    assert titles == {"real.md": "Real", "setext.md": "Setup Guide"}
+    assert titles["real.md"] == extract_metadata(text).title
+    assert titles["setext.md"] == extract_metadata(untitled).title
+
+
+def saved_index(tmp_path):
+    docs = {f"doc{i}.md": f"# Page {i}\n\nalpha beta " + "gamma " * i for i in range(10)}
+    docs["empty.md"] = ""
+    docs["unique.md"] = "zeta"
+    index = SearchIndex(tmp_path, tmp_path / "search.sqlite")
+    for path, text in docs.items():
+        index.index_document(path, text, (len(text), 1.0))
+    # Leaves a free slot behind
+    index.remove_document("doc3.md")
+    assert index.save()
+    return index
+
+
+def test_snapshot_round_trip(tmp_path):
+    original = saved_index(tmp_path)
+
+    loaded = SearchIndex(tmp_path, tmp_path / "search.sqlite")
+    assert loaded.load()
+
+    assert len(loaded) == len(original) == 11
+    for query in ("alpha", "gamma beta", "page zeta"):
+        assert loaded.search(query, limit=20)["results"] == original.search(query, limit=20)["results"]
+    # The loaded state can be maintained like the original
+    loaded.remove_document("doc5.md")
+    loaded.index_document("new.md", "gamma delta", (11, 2.0))
+    assert [hit["path"] for hit in loaded.search("delta")["results"]] == ["new.md"]
+    assert "doc5.md" not in [hit["path"] for hit in loaded.search("gamma", limit=20)["results"]]
+
+
+def test_pickle_in_the_cache_directory_is_never_unpickled(tmp_path):
+    snapshot = tmp_path / "search.sqlite"
+    marker = tmp_path / "pwned"
+
+    class Payload:
+        def __reduce__(self):
+            return os.system, (f"touch {marker}",)
+
+    snapshot.write_bytes(pickle.dumps(Payload()))
+
+    assert not SearchIndex(tmp_path, snapshot).load()
+    assert not marker.exists()
+
+
+@pytest.mark.parametrize("damage", ["truncate", "version", "arrays", "bad_postings", "missing_term", "bad_id"])
+def test_damaged_or_foreign_snapshot_is_ignored(tmp_path, damage):
+    snapshot = tmp_path / "search.sqlite"
+    saved_index(tmp_path)
+
+    if damage == "truncate":
+        snapshot.write_bytes(snapshot.read_bytes()[:200])
+    else:
+        connection = sqlite3.connect(snapshot)
+        statements = {
+            "version": "UPDATE snapshot SET value = '1' WHERE key = 'version'",
+            "arrays": "UPDATE snapshot SET value = 'I8-big' WHERE key = 'arrays'",
+            "bad_postings": "UPDATE postings SET tfs = x'01' WHERE term = 'alpha'",
+            "missing_term": "DELETE FROM postings WHERE term = 'beta'",
+            "bad_id": "UPDATE postings SET ids = x'ffff0000' WHERE term = 'zeta'",
+        }
+        connection.execute(statements[damage])
+        connection.commit()
+        connection.close()
+
+    index = SearchIndex(tmp_path, snapshot)
+    assert not index.load()
+    assert len(index) == 0
+
+
+def test_queued_listener_runs_off_the_calling_thread_and_merges_paths():
+    calls = []
+    threads = []
+    entered = threading.Event()
+    release = threading.Event()
+
+    def listener(changed, removed, created):
+        threads.append(threading.current_thread().name)
+        entered.set()
+        release.wait(5)
+        calls.append((sorted(changed), sorted(removed), sorted(created)))
+
+    queued = QueuedListener(listener, "test-listener")
+    queued.start()
+    try:
+        queued(["a.md"], [], ["a.md"])
+        assert entered.wait(5)
+        # While the first batch is being delivered, later changes pile up
+        # and are merged per path
+        queued(["b.md"], [], ["b.md"])
+        queued([], ["b.md"], [])
+        queued(["c.md"], [], [])
+        queued(["c.md"], [], [])
+        queued([], ["d.md"], [])
+        queued(["d.md"], [], ["d.md"])
+        release.set()
+        assert queued.wait_idle(5)
+    finally:
+        queued.stop()
+
+    assert set(threads) == {"test-listener"}
+    merged = [path for call in calls[1:] for path in call[0] + call[1]]
+    assert sorted(merged) == sorted(set(merged))
+    assert calls[0] == (["a.md"], [], ["a.md"])
+    last_state = {}
+    created = set()
+    for changed, removed, new in calls[1:]:
+        last_state.update({path: "changed" for path in changed})
+        last_state.update({path: "removed" for path in removed})
+        created.update(new)
+    assert last_state == {"b.md": "removed", "c.md": "changed", "d.md": "changed"}
+    assert created == {"d.md"}
+
+
+def test_queued_listener_delivers_pending_changes_on_stop():
+    calls = []
+    queued = QueuedListener(lambda changed, removed, created: calls.append(changed), "test-stop")
+    queued(["late.md"], [], [])
+    queued.start()
+    queued.stop()
+    assert calls == [["late.md"]]
+    assert queued.backlog == 0
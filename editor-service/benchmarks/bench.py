@@ -0,0 +1,376 @@
+"""
+Benchmark harness for the editor service
+
+For each corpus size a worker process generates a synthetic corpus in a
+scratch git repository with a local bare ``origin``, points the service at
+it through the usual environment variables and drives the ASGI app
+in-process. It covers startup, cold and warm reads of every read endpoint,
+document saves with and without push, patches, creates and deletes, batches,
+navigation and section changes. Results are written as JSON and can be
+checked against a stored baseline (see compare.py).
+
+    python benchmarks/bench.py --pages 1000 10000 --output results.json
+    python benchmarks/bench.py --pages 1000 --baseline baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from corpus import WORDS, Corpus, generate_corpus, init_repository
+from compare import DEFAULT_MIN_DELTA_MS, DEFAULT_THRESHOLD, compare, format_report
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+# Read endpoints measured on first use after startup and then warm
+READ_ENDPOINTS = [
+    ("root", "/"),
+    ("bootstrap", "/api/bootstrap"),
+    ("documents", "/api/documents"),
+    ("documents page", "/api/documents?limit=500"),
+    ("documents ndjson", "/api/documents?format=ndjson"),
+    ("directories", "/api/directories"),
+    ("sections", "/api/sections"),
+    ("navigation", "/api/navigation"),
+    ("navigation validate", "/api/navigation/validate"),
+    ("mkdocs config", "/api/mkdocs-config"),
+    ("links broken", "/api/links/broken"),
+    ("git status", "/api/git/status"),
+    ("push status", "/api/git/push-status"),
+    ("metrics", "/metrics"),
+]
+
+# Routes the metrics middleware does not time, so coverage cannot see them:
+# /metrics is read with the other endpoints, the event stream never completes
+UNTIMED = {("GET", "/api/events"), ("GET", "/metrics")}
+
+
+class BenchmarkError(Exception):
+    """A request in a scenario did not succeed"""
+
+
+class Recorder:
+    """Collects latency samples and throughput per scenario"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.rates: Dict[str, Dict[str, float]] = {}
+
+    def request(self, name: str, call: Callable, url: str, expect: int = 200, **kwargs):
+        """Time one request and check its status code"""
+        started = time.perf_counter()
+        response = call(url, **kwargs)
+        elapsed = time.perf_counter() - started
+        if response.status_code != expect:
+            raise BenchmarkError(f"{name}: {url} returned {response.status_code}: {response.text[:200]}")
+        self.samples.setdefault(name, []).append(elapsed)
+        return response
+
+    def record(self, name: str, seconds: float) -> None:
+        self.samples.setdefault(name, []).append(seconds)
+
+    def throughput(self, name: str, operations: int, seconds: float) -> None:
+        self.rates[name] = {
+            "n": operations,
+            "seconds": round(seconds, 4),
+            "ops_per_s": round(operations / seconds, 2) if seconds else 0.0
+        }
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        results: Dict[str, Dict[str, float]] = {}
+        for name, samples in self.samples.items():
+            ordered = sorted(samples)
+            results[name] = {
+                "n": len(ordered),
+                "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+                "p50_ms": round(_percentile(ordered, 0.5) * 1000, 3),
+                "p95_ms": round(_percentile(ordered, 0.95) * 1000, 3),
+                "max_ms": round(ordered[-1] * 1000, 3)
+            }
+        results.update(self.rates)
+        return results
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def _wait(condition: Callable[[], bool], timeout: float, what: str) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise BenchmarkError(f"Timed out waiting for {what}")
+        time.sleep(0.005)
+
+
+# Scenarios
+
+def bench_reads(client, rec: Recorder, corpus: Corpus, iterations: int, rng: random.Random) -> None:
+    for name, url in READ_ENDPOINTS:
+        rec.request(f"read.cold {name}", client.get, url)
+    for name, url in READ_ENDPOINTS:
+        for _ in range(iterations):
+            rec.request(f"read.warm {name}", client.get, url)
+
+    for name, url in READ_ENDPOINTS:
+        etag = client.get(url).headers.get("etag")
+        if etag:
+            for _ in range(iterations):
+                rec.request(f"read.revalidate {name}", client.get, url, expect=304, headers={"If-None-Match": etag})
+
+    pages = rng.sample(corpus.pages, min(iterations * 5, len(corpus.pages)))
+    etags = {}
+    for page in pages:
+        etags[page] = rec.request("read.cold document", client.get, f"/api/documents/{page}").headers["etag"]
+    for page in pages:
+        rec.request("read.warm document", client.get, f"/api/documents/{page}")
+        rec.request("read.revalidate document", client.get, f"/api/documents/{page}", expect=304,
+                    headers={"If-None-Match": etags[page]})
+        rec.request("read.links document", client.get, f"/api/links/{page}")
+
+    for word in rng.sample(WORDS, min(iterations, len(WORDS))):
+        rec.request("search", client.get, "/api/search", params={"q": f"{word} {rng.choice(WORDS)}"})
+
+    for number in range(iterations):
+        content = f"# Render {number}\n\n!!! note\n    {' '.join(rng.sample(WORDS, 10))}\n"
+        rec.request("render.cold", client.post, "/api/render", json={"content": content})
+        rec.request("render.warm", client.post, "/api/render", json={"content": content})
+
+
+def _drain(client, main, tickets: List[str], push: bool) -> None:
+    if tickets:
+        _wait(lambda: client.get(f"/api/commits/{tickets[-1]}").json()["status"] != "pending", 120, "commits")
+        for ticket in tickets:
+            status = client.get(f"/api/commits/{ticket}").json()["status"]
+            if status != "committed":
+                raise BenchmarkError(f"Commit ticket {ticket} ended {status}")
+    if push:
+        _wait(lambda: not main.push_worker.status()["queue_depth"], 120, "push")
+        if not main.push_worker.status()["last_result"]["success"]:
+            raise BenchmarkError(f"Push failed: {main.push_worker.status()['last_result']['message']}")
+
+
+def bench_saves(client, main, rec: Recorder, corpus: Corpus, saves: int, rng: random.Random) -> None:
+    minimal = {"Prefer": "return=minimal"}
+    pages = rng.sample(corpus.content_pages(), min(saves, len(corpus.content_pages())))
+    etags = {}
+
+    for push, suffix in ((False, ""), (True, " push")):
+        tickets = []
+        started = time.perf_counter()
+        for number, page in enumerate(pages):
+            content = f"# Saved {number}{suffix}\n\n{' '.join(rng.sample(WORDS, 30))}\n"
+            body = rec.request(f"save.put{suffix}", client.put, f"/api/documents/{page}",
+                               json={"content": content, "push": push}, headers=minimal).json()
+            etags[page] = body["etag"]
+            tickets.append(body["commit_ticket"])
+        _drain(client, main, tickets, push)
+        rec.throughput(f"save.put{suffix} throughput", len(pages), time.perf_counter() - started)
+
+    tickets = []
+    started = time.perf_counter()
+    for page in pages:
+        body = rec.request("save.patch", client.patch, f"/api/documents/{page}", json={
+            "base_etag": etags[page],
+            "edits": [{"start": 0, "end": 1, "text": "# Patched\n"}]
+        }).json()
+        tickets.append(body["commit_ticket"])
+    _drain(client, main, tickets, push=True)
+    rec.throughput("save.patch throughput", len(pages), time.perf_counter() - started)
+
+    created = [f"{corpus.directories[0]}/bench-new-{number:04d}.md" for number in range(len(pages))]
+    tickets = []
+    started = time.perf_counter()
+    for path in created:
+        body = rec.request("save.create", client.post, "/api/documents",
+                           json={"path": path, "content": "# New\n", "push": False}, headers=minimal).json()
+        tickets.append(body["commit_ticket"])
+    for path in created:
+        body = rec.request("save.delete", client.delete, f"/api/documents/{path}").json()
+        tickets.append(body.get("commit_ticket"))
+    _drain(client, main, [ticket for ticket in tickets if ticket], push=True)
+    rec.throughput("save.create+delete throughput", 2 * len(created), time.perf_counter() - started)
+
+    operations = [
+        {"op": "update", "path": page, "content": f"# Batched\n\n{rng.choice(WORDS)}\n"}
+        for page in pages[:50]
+    ]
+    rec.request("save.batch", client.post, "/api/batch", json={"operations": operations, "push": True})
+    _drain(client, main, [], push=True)
+
+
+def bench_structure(client, main, rec: Recorder, rounds: int) -> None:
+    for number in range(rounds):
+        name = f"Bench Section {number}"
+        directory = f"bench-section-{number}"
+        rec.request("section.create", client.post, "/api/sections", json={"name": name, "push": False})
+        rec.request("section.create subsection", client.post, f"/api/sections/{directory}/subsections",
+                    json={"name": "Child", "push": False})
+        rec.request("section.delete subsection", client.delete, f"/api/sections/{directory}/child")
+        rec.request("section.delete", client.delete, f"/api/sections/{directory}")
+
+    navigation = client.get("/api/navigation").json()["navigation"]
+    for _ in range(rounds):
+        rec.request("navigation.put", client.put, "/api/navigation", json={"navigation": navigation})
+    _drain(client, main, [], push=True)
+
+
+def route_coverage(main) -> List[str]:
+    """API routes no scenario requested"""
+    exercised = {(values[0], values[1]) for values, _ in main.REQUEST_SECONDS._items()}
+    routes = set()
+    for route in main.app.routes:
+        for method in getattr(route, "methods", None) or ():
+            if method != "HEAD" and not route.path.startswith(("/docs", "/redoc", "/openapi")):
+                routes.add((method, route.path))
+    return sorted(f"{method} {path}" for method, path in routes - exercised - UNTIMED)
+
+
+# Worker
+
+def run_worker(args: argparse.Namespace) -> Dict[str, Any]:
+    """Generate a corpus, run every scenario against it and return the results"""
+    workdir = Path(tempfile.mkdtemp(prefix="phronidoc-bench-"))
+    try:
+        started = time.perf_counter()
+        corpus = generate_corpus(
+            workdir / "repo", args.pages, args.depth, args.sections, args.fanout, args.page_size, args.seed
+        )
+        init_repository(corpus)
+        setup_seconds = time.perf_counter() - started
+
+        os.environ.update({
+            "DOCS_DIR": str(corpus.docs_dir),
+            "MKDOCS_CONFIG_PATH": str(corpus.mkdocs_path),
+            "GIT_REPO_PATH": str(corpus.root),
+            "GIT_REMOTE": "origin",
+            "GIT_BRANCH": "main",
+            "CACHE_DIR": str(workdir / "cache"),
+            "COMMIT_WINDOW": str(args.commit_window),
+            "DOCS_WATCH_MODE": args.watch_mode,
+        })
+        os.chdir(workdir)
+        sys.path.insert(0, str(BACKEND_DIR))
+
+        import logging
+        from fastapi.testclient import TestClient
+        import main
+
+        logging.getLogger().setLevel(logging.WARNING)
+        rec = Recorder()
+        rng = random.Random(args.seed)
+
+        client = TestClient(main.app)
+        started = time.perf_counter()
+        client.__enter__()
+        rec.record("startup", time.perf_counter() - started)
+        try:
+            _wait(lambda: main.search_index.ready and main.link_graph.ready, 600, "indexes")
+            rec.record("startup indexes ready", time.perf_counter() - started)
+
+            bench_reads(client, rec, corpus, args.iterations, rng)
+            bench_saves(client, main, rec, corpus, args.saves, rng)
+            bench_structure(client, main, rec, args.section_rounds)
+        finally:
+            client.__exit__(None, None, None)
+
+        return {
+            "corpus": {
+                "pages": len(corpus.pages),
+                "directories": len(corpus.directories),
+                "setup_seconds": round(setup_seconds, 2)
+            },
+            "results": rec.summary(),
+            "uncovered": route_coverage(main)
+        }
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _git_version() -> str:
+    try:
+        return subprocess.run(["git", "--version"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return "unknown"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the editor service against synthetic corpora")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1000], help="Corpus sizes to run")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--sections", type=int, default=10)
+    parser.add_argument("--fanout", type=int, default=4)
+    parser.add_argument("--page-size", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--iterations", type=int, default=20, help="Repetitions of each read")
+    parser.add_argument("--saves", type=int, default=50, help="Documents saved per save scenario")
+    parser.add_argument("--section-rounds", type=int, default=5)
+    parser.add_argument("--commit-window", type=float, default=0.1)
+    parser.add_argument("--watch-mode", default="off", help="DOCS_WATCH_MODE for the service")
+    parser.add_argument("--output", type=Path, default=Path("benchmark-results.json"))
+    parser.add_argument("--baseline", type=Path, help="Fail if results regressed against this file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA_MS)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch repositories")
+    parser.add_argument("--worker", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        args.pages = args.pages[0]
+        args.worker.write_text(json.dumps(run_worker(args)))
+        return 0
+
+    runs = {}
+    for pages in args.pages:
+        print(f"Benchmarking {pages} pages...", file=sys.stderr)
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as result_file:
+            result_path = Path(result_file.name)
+        try:
+            # One process per size, since the service reads its settings at import
+            command = [sys.executable, str(Path(__file__).resolve()), "--worker", str(result_path), "--pages", str(pages)]
+            for option in ("depth", "sections", "fanout", "page_size", "seed", "iterations", "saves",
+                           "section_rounds", "commit_window", "watch_mode"):
+                command += [f"--{option.replace('_', '-')}", str(getattr(args, option))]
+            if args.keep:
+                command.append("--keep")
+            subprocess.run(command, check=True)
+            runs[str(pages)] = json.loads(result_path.read_text())
+        finally:
+            result_path.unlink(missing_ok=True)
+
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "git": _git_version(),
+            "options": {
+                "depth": args.depth, "sections": args.sections, "fanout": args.fanout,
+                "page_size": args.page_size, "seed": args.seed, "iterations": args.iterations,
+                "saves": args.saves, "commit_window": args.commit_window, "watch_mode": args.watch_mode
+            }
+        },
+        "runs": runs
+    }
+    args.output.write_text(json.dumps(results, indent=2))
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.threshold, args.min_delta_ms)
+        print(format_report(regressions))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
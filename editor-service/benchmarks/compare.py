@@ -0,0 +1,113 @@
+"""
+Compare benchmark results against a stored baseline
+
+A latency scenario regresses when its median grew by more than the
+threshold (and by more than ``min_delta_ms``, so sub-millisecond noise does
+not fail a run); a throughput scenario regresses when its rate dropped by
+more than the threshold. Latency scenarios with fewer than ``min_samples``
+samples, such as the single cold request after startup, are too noisy to
+gate on and are only reported in the results. A baseline file may carry per-scenario thresholds:
+
+    {"thresholds": {"save.put throughput": 0.5}, "runs": {...}}
+
+    python benchmarks/compare.py results.json baseline.json --threshold 0.25
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_MIN_DELTA_MS = 1.0
+DEFAULT_MIN_SAMPLES = 3
+
+
+def compare(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float = DEFAULT_THRESHOLD,
+    min_delta_ms: float = DEFAULT_MIN_DELTA_MS,
+    min_samples: int = DEFAULT_MIN_SAMPLES
+) -> List[Dict[str, Any]]:
+    """
+    Scenarios that got slower than the baseline allows
+
+    Args:
+        current: Results of ``bench.py``
+        baseline: Earlier results, optionally with a ``thresholds`` mapping
+        threshold: Allowed relative slowdown, e.g. 0.25 for 25%
+        min_delta_ms: Latency increases below this are never regressions
+        min_samples: Latency scenarios with fewer samples are not compared
+
+    Returns:
+        One entry per regression with ``pages``, ``scenario``, ``metric``,
+        ``baseline``, ``current`` and ``change`` (relative)
+    """
+    overrides = baseline.get("thresholds", {})
+    regressions = []
+    for pages, run in current.get("runs", {}).items():
+        reference = baseline.get("runs", {}).get(pages, {}).get("results")
+        if reference is None:
+            continue
+        for name, result in run["results"].items():
+            before = reference.get(name)
+            if before is None:
+                continue
+            allowed = overrides.get(name, threshold)
+            if "ops_per_s" in result and "ops_per_s" in before:
+                old, new = before["ops_per_s"], result["ops_per_s"]
+                change = (old - new) / old if old else 0.0
+                if change > allowed:
+                    regressions.append(_entry(pages, name, "ops_per_s", old, new, -change))
+            elif "p50_ms" in result and "p50_ms" in before and result["n"] >= min_samples:
+                old, new = before["p50_ms"], result["p50_ms"]
+                change = (new - old) / old if old else 0.0
+                if change > allowed and new - old > min_delta_ms:
+                    regressions.append(_entry(pages, name, "p50_ms", old, new, change))
+    return regressions
+
+
+def _entry(pages: str, name: str, metric: str, old: float, new: float, change: float) -> Dict[str, Any]:
+    return {
+        "pages": pages,
+        "scenario": name,
+        "metric": metric,
+        "baseline": old,
+        "current": new,
+        "change": round(change, 3)
+    }
+
+
+def format_report(regressions: List[Dict[str, Any]]) -> str:
+    """Human-readable list of regressions"""
+    if not regressions:
+        return "No regressions"
+    lines = [f"{len(regressions)} regression(s):"]
+    for entry in regressions:
+        lines.append(
+            f"  [{entry['pages']} pages] {entry['scenario']}: {entry['metric']} "
+            f"{entry['baseline']} -> {entry['current']} ({entry['change']:+.0%})"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare benchmark results with a baseline")
+    parser.add_argument("results", type=Path)
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA_MS)
+    parser.add_argument("--min-samples", type=int, default=DEFAULT_MIN_SAMPLES)
+    args = parser.parse_args(argv)
+
+    current = json.loads(args.results.read_text())
+    baseline = json.loads(args.baseline.read_text())
+    regressions = compare(current, baseline, args.threshold, args.min_delta_ms, args.min_samples)
+    print(format_report(regressions))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
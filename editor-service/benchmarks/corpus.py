@@ -0,0 +1,239 @@
+"""
+Synthetic documentation corpus for benchmarks
+
+Generates a reproducible ``docs/`` tree with a matching ``mkdocs.yml`` and
+turns it into a git repository with a local bare repository as ``origin``,
+so saves and pushes can be measured without a network.
+
+    python benchmarks/corpus.py /tmp/corpus --pages 10000 --depth 3
+"""
+
+import argparse
+import random
+import subprocess
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import yaml
+
+WORDS = (
+    "cluster node job queue storage scratch quota module compiler runtime "
+    "allocation partition account login transfer bandwidth archive backup "
+    "container image network latency throughput memory processor thread "
+    "scheduler policy priority request limit project group permission key "
+    "service endpoint release upgrade maintenance outage monitor alert"
+).split()
+
+MKDOCS_EXTENSIONS = [
+    {"toc": {"permalink": True}},
+    "admonition",
+    "attr_list",
+    "def_list",
+    "md_in_html",
+    "pymdownx.superfences",
+]
+
+
+class Corpus:
+    """
+    Layout of a generated corpus
+
+    Args:
+        root: Repository root, containing ``docs/`` and ``mkdocs.yml``
+        pages: Paths of all generated pages relative to ``docs/``
+        directories: Paths of all generated directories relative to ``docs/``
+    """
+
+    def __init__(self, root: Path, pages: List[str], directories: List[str]):
+        self.root = root
+        self.docs_dir = root / "docs"
+        self.mkdocs_path = root / "mkdocs.yml"
+        self.origin = root.parent / f"{root.name}-origin.git"
+        self.pages = pages
+        self.directories = directories
+
+    def content_pages(self) -> List[str]:
+        """Pages other than section index pages"""
+        return [page for page in self.pages if not page.endswith("/index.md")]
+
+
+def _directory_tree(sections: int, depth: int, fanout: int) -> List[str]:
+    directories = []
+    level = [f"section-{number:02d}" for number in range(sections)]
+    for current_depth in range(depth):
+        directories.extend(level)
+        if current_depth + 1 < depth:
+            level = [f"{parent}/topic-{number:02d}" for parent in level for number in range(fanout)]
+    return directories
+
+
+def _paragraph(rng: random.Random, words: int) -> str:
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def _relative_link(source: str, target: str) -> str:
+    source_parts = source.split("/")[:-1]
+    target_parts = target.split("/")
+    common = 0
+    while common < len(source_parts) and common < len(target_parts) - 1 and source_parts[common] == target_parts[common]:
+        common += 1
+    return "/".join([".."] * (len(source_parts) - common) + target_parts[common:])
+
+
+def page_content(rng: random.Random, title: str, path: str, size: int, link_targets: List[str]) -> str:
+    """
+    Markdown page of roughly ``size`` bytes
+
+    Args:
+        rng: Random source (seeded for reproducible output)
+        title: H1 title
+        path: Page path, used to make links relative
+        size: Approximate size in bytes
+        link_targets: Pages to pick cross-links from
+    """
+    parts = [f"# {title}\n"]
+    section = 0
+    length = len(parts[0])
+    while length < size:
+        if section % 3 == 0:
+            heading = f"## {rng.choice(WORDS).title()} {rng.choice(WORDS)} {section}\n"
+            parts.append(heading)
+            length += len(heading)
+        if link_targets and rng.random() < 0.5:
+            target = rng.choice(link_targets)
+            block = f"See [{rng.choice(WORDS)}]({_relative_link(path, target)}) for details.\n"
+        elif rng.random() < 0.1:
+            block = "```bash\nsbatch --partition=" + rng.choice(WORDS) + " job.sh\n```\n"
+        else:
+            block = _paragraph(rng, rng.randint(20, 60)) + "\n"
+        parts.append(block)
+        length += len(block)
+        section += 1
+    return "\n".join(parts)
+
+
+def generate_corpus(
+    root: Path,
+    pages: int = 1000,
+    depth: int = 3,
+    sections: int = 10,
+    fanout: int = 4,
+    page_size: int = 2000,
+    seed: int = 0
+) -> Corpus:
+    """
+    Write a docs tree and mkdocs.yml
+
+    Every directory gets an ``index.md``; the remaining pages are spread
+    evenly over all directories. The nav lists every page.
+
+    Args:
+        root: Directory to create the corpus in (must not exist)
+        pages: Total number of pages, including index pages
+        depth: Directory levels below ``docs/``
+        sections: Top-level directories
+        fanout: Sub-directories per directory below the top level
+        page_size: Approximate page size in bytes
+        seed: Random seed; the same arguments always give the same corpus
+
+    Returns:
+        The generated Corpus
+    """
+    rng = random.Random(seed)
+    root = Path(root)
+    docs_dir = root / "docs"
+    directories = _directory_tree(sections, max(1, depth), fanout)
+
+    placement: Dict[str, List[str]] = {directory: [f"{directory}/index.md"] for directory in directories}
+    remaining = max(0, pages - len(directories) - 1)
+    for number in range(remaining):
+        directory = directories[number % len(directories)]
+        placement[directory].append(f"{directory}/page-{number:06d}.md")
+
+    all_pages = ["index.md"] + [page for directory in directories for page in placement[directory]]
+    for directory in directories:
+        (docs_dir / directory).mkdir(parents=True, exist_ok=True)
+    for page in all_pages:
+        title = page.rsplit("/", 1)[-1][:-3].replace("-", " ").title()
+        if page.endswith("index.md"):
+            title = (page.rsplit("/", 2)[-2] if "/" in page else "Home").replace("-", " ").title()
+        targets = [rng.choice(all_pages) for _ in range(3)]
+        (docs_dir / page).write_text(page_content(rng, title, page, page_size, targets), encoding="utf-8")
+
+    config = {
+        "site_name": "Benchmark Docs",
+        "docs_dir": "docs",
+        "nav": [{"Home": "index.md"}] + _nav(directories, placement, ""),
+        "markdown_extensions": MKDOCS_EXTENSIONS,
+    }
+    with open(root / "mkdocs.yml", "w", encoding="utf-8") as f:
+        yaml.safe_dump(config, f, default_flow_style=False, sort_keys=False, width=1000)
+
+    return Corpus(root, all_pages, directories)
+
+
+def _nav(directories: List[str], placement: Dict[str, List[str]], parent: str) -> List[Any]:
+    items: List[Any] = []
+    prefix = f"{parent}/" if parent else ""
+    children = [
+        directory for directory in directories
+        if directory.startswith(prefix) and "/" not in directory[len(prefix):]
+    ]
+    for directory in children:
+        name = directory.rsplit("/", 1)[-1]
+        entries: List[Any] = [{"Overview": f"{directory}/index.md"}]
+        for page in placement[directory][1:]:
+            entries.append({page.rsplit("/", 1)[-1][:-3].replace("-", " ").title(): page})
+        entries.extend(_nav(directories, placement, directory))
+        items.append({name.replace("-", " ").title(): entries})
+    return items
+
+
+def _git(args: List[str], cwd: Path) -> None:
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+def init_repository(corpus: Corpus, branch: str = "main") -> None:
+    """
+    Commit the corpus and push it to a new bare repository as ``origin``
+
+    Args:
+        corpus: Generated corpus
+        branch: Branch to create and push
+    """
+    _git(["init", "--bare", "-q", str(corpus.origin)], corpus.root.parent)
+    _git(["init", "-q", "-b", branch], corpus.root)
+    _git(["config", "user.name", "Benchmark"], corpus.root)
+    _git(["config", "user.email", "benchmark@example.com"], corpus.root)
+    _git(["add", "-A"], corpus.root)
+    _git(["commit", "-q", "-m", "Initial corpus"], corpus.root)
+    _git(["remote", "add", "origin", str(corpus.origin)], corpus.root)
+    _git(["push", "-q", "-u", "origin", branch], corpus.root)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic docs corpus")
+    parser.add_argument("root", type=Path, help="Directory to create")
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--sections", type=int, default=10)
+    parser.add_argument("--fanout", type=int, default=4)
+    parser.add_argument("--page-size", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--git", action="store_true", help="Also create a git repository with a bare origin")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    corpus = generate_corpus(
+        args.root, args.pages, args.depth, args.sections, args.fanout, args.page_size, args.seed
+    )
+    if args.git:
+        init_repository(corpus)
+    print(f"{len(corpus.pages)} pages in {len(corpus.directories)} directories "
+          f"written to {corpus.root} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,13 +7,18 @@ let documents = [];
 let sections = null;
 let editor = null;
 let isEditMode = false;
+let lastPreview = { content: null, html: null };  // Skips re-rendering unchanged content
+let previewRequest = 0;
+let currentNavigation = null;
+let liveUpdates = false;  // True while the change feed is connected
+let structureRefresh = null;
 
 // Initialize
-document.addEventListener('DOMContentLoaded', () => {
+document.addEventListener('DOMContentLoaded', async () => {
     initializeEditor();
-    loadSections();
-    loadDocuments();
     setupEventListeners();
+    const eventsAfter = await loadBootstrap();
+    connectChangeFeed(eventsAfter);
 });
 
 function initializeEditor() {
@@ -203,6 +208,26 @@ function setupEventListeners() {
     }
 }
 
+// Sections, navigation and documents in one request; returns the change feed position
+async function loadBootstrap() {
+    try {
+        const response = await fetch(`${API_BASE}/bootstrap`);
+        if (!response.ok) throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+        
+        const data = await response.json();
+        sections = data.sections;
+        documents = data.documents;
+        currentNavigation = data.navigation || [];
+        renderNavigation(currentNavigation);
+        return data.events_after;
+    } catch (error) {
+        console.error('Error loading bootstrap data, falling back to separate requests:', error);
+        await loadSections();
+        await loadDocuments();
+        return null;
+    }
+}
+
 async function loadSections() {
     try {
         // Load both sections structure and navigation
@@ -223,6 +248,7 @@ async function loadSections() {
             navigation = navData.navigation || [];
         }
         
+        currentNavigation = navigation;
         renderNavigation(navigation);
         return sections;
     } catch (error) {
@@ -243,6 +269,101 @@ async function loadDocuments() {
     }
 }
 
+// Reload the tree after a local change, unless the change feed will report it
+async function refreshAfterChange() {
+    if (liveUpdates) return;
+    await loadSections();
+    await loadDocuments();
+}
+
+// Follow /api/events and patch local state instead of re-fetching after every change
+function connectChangeFeed(after = null) {
+    if (!window.EventSource) return;
+    
+    // Resume from the bootstrap snapshot so nothing between the two is missed
+    const resume = after === null || after === undefined ? '' : `&after=${after}`;
+    const source = new EventSource(`${API_BASE}/events?types=document,navigation,push${resume}`);
+    source.addEventListener('open', () => { liveUpdates = true; });
+    source.addEventListener('error', () => { liveUpdates = false; });
+    source.addEventListener('reset', () => {
+        // Events were missed while disconnected
+        liveUpdates = true;
+        loadSections();
+        loadDocuments();
+    });
+    
+    source.addEventListener('document.created', (e) => {
+        const { path } = JSON.parse(e.data);
+        if (!documents.some(doc => doc.path === path)) {
+            const slash = path.lastIndexOf('/');
+            documents.push({
+                path,
+                name: path.slice(slash + 1),
+                directory: slash >= 0 ? path.slice(0, slash) : '.'
+            });
+            documents.sort((a, b) => (a.path < b.path ? -1 : a.path > b.path ? 1 : 0));
+        }
+        scheduleStructureRefresh();
+    });
+    source.addEventListener('document.deleted', (e) => {
+        const { path } = JSON.parse(e.data);
+        documents = documents.filter(doc => doc.path !== path);
+        scheduleStructureRefresh();
+        if (currentDocument && currentDocument.path === path && !isEditMode) {
+            showError(`"${path}" was deleted`);
+        }
+    });
+    source.addEventListener('documents.changed', () => {
+        loadDocuments();
+        scheduleStructureRefresh();
+    });
+    source.addEventListener('document.updated', (e) => {
+        const { path, etag } = JSON.parse(e.data);
+        if (currentDocument && currentDocument.path === path && etag !== currentDocument.etag) {
+            checkCurrentDocument();
+        }
+    });
+    source.addEventListener('navigation.changed', () => scheduleStructureRefresh(true));
+    source.addEventListener('push.completed', (e) => {
+        const result = JSON.parse(e.data);
+        if (!result.success) {
+            console.warn('Push failed:', result.message);
+        }
+    });
+}
+
+// Coalesce bursts of events into one sections/navigation reload
+function scheduleStructureRefresh(navigationChanged = false) {
+    // With an mkdocs.yml nav, only nav changes alter the tree
+    if (!navigationChanged && currentNavigation && currentNavigation.length > 0) return;
+    clearTimeout(structureRefresh);
+    structureRefresh = setTimeout(loadSections, 250);
+}
+
+// Reload the open document if it changed elsewhere; unsaved edits are kept
+async function checkCurrentDocument() {
+    const doc = currentDocument;
+    const response = await fetch(`${API_BASE}/documents/${encodeURIComponent(doc.path)}`, {
+        headers: doc.etag ? { 'If-None-Match': doc.etag } : {}
+    });
+    if (response.status === 304 || !response.ok || currentDocument !== doc) return;
+    
+    const updated = await response.json();
+    updated.etag = response.headers.get('ETag');
+    if (updated.etag === doc.etag) return;
+    if (editor && editor.getValue() === updated.content) {
+        // Our own save, reported before its response arrived
+        currentDocument.etag = updated.etag;
+        currentDocument.content = updated.content;
+        return;
+    }
+    if (isEditMode) {
+        showError(`"${doc.path}" was changed elsewhere; saving will be rejected until you reload it`);
+        return;
+    }
+    loadDocument(doc.path);
+}
+
 function renderNavigation(navigation = null) {
     const navTree = document.getElementById('navTree');
     if (!navTree) return;
@@ -504,8 +625,7 @@ async function createSection() {
             showSuccess(`Section "${sectionName}" created successfully! ${result.git_status || ''}`);
         }
         
-        await loadSections();
-        await loadDocuments();
+        await refreshAfterChange();
     } catch (error) {
         console.error('Error creating section:', error);
         showError(error.message || 'Failed to create section. Check console for details.');
@@ -552,8 +672,7 @@ async function createSubsection() {
             showSuccess(`Sub-section created successfully! ${result.git_status || ''}`);
         }
         
-        await loadSections();
-        await loadDocuments();
+        await refreshAfterChange();
     } catch (error) {
         console.error('Error creating sub-section:', error);
         showError(error.message || 'Failed to create sub-section. Check console for details.');
@@ -670,6 +789,7 @@ async function loadDocument(path) {
         if (!response.ok) throw new Error('Failed to load document');
         
         const doc = await response.json();
+        doc.etag = response.headers.get('ETag');
         currentDocument = doc;
         
         // Extract title from content
@@ -712,13 +832,45 @@ async function loadDocument(path) {
     }
 }
 
-function showPreview(content) {
+async function renderMarkdown(content) {
+    if (lastPreview.content === content) {
+        return lastPreview.html;
+    }
+    
+    let html;
+    try {
+        const response = await fetch(`${API_BASE}/render`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ content })
+        });
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+        html = (await response.json()).html;
+    } catch (error) {
+        // Fall back to client-side rendering without the mkdocs extensions
+        console.warn('Server-side rendering failed, using marked:', error);
+        html = marked.parse(content);
+    }
+    
+    lastPreview = { content, html };
+    return html;
+}
+
+async function showPreview(content) {
     const previewView = document.getElementById('previewView');
     const editView = document.getElementById('editView');
     const previewContent = document.getElementById('previewContent');
     
     if (previewView && previewContent) {
-        previewContent.innerHTML = marked.parse(content);
+        // Ignore renders that finish after a newer preview was requested
+        const request = ++previewRequest;
+        const html = await renderMarkdown(content);
+        if (request !== previewRequest) {
+            return;
+        }
+        previewContent.innerHTML = html;
         previewView.style.display = 'block';
         if (editView) {
             editView.style.display = 'none';
@@ -844,20 +996,44 @@ async function saveDocument() {
 
     try {
         const content = editor ? editor.getValue() : currentDocument.content;
-        const response = await fetch(
-            `${API_BASE}/documents/${encodeURIComponent(currentDocument.path)}`,
-            {
+        // The server does not need to echo back content we already have
+        const headers = { 'Content-Type': 'application/json', 'Prefer': 'return=minimal' };
+        if (currentDocument.etag) {
+            // Reject the save if someone else changed the document meanwhile
+            headers['If-Match'] = currentDocument.etag;
+        }
+        const url = `${API_BASE}/documents/${encodeURIComponent(currentDocument.path)}`;
+        
+        let response = null;
+        if (currentDocument.etag && typeof currentDocument.content === 'string') {
+            // Send only the changed lines
+            response = await fetch(url, {
+                method: 'PATCH',
+                headers: headers,
+                body: JSON.stringify({
+                    edits: [computeLineEdit(currentDocument.content, content)],
+                    push: true
+                })
+            });
+            if (response.status === 422) {
+                response = null;  // Patch did not apply; fall back to a full save
+            }
+        }
+        if (!response) {
+            response = await fetch(url, {
                 method: 'PUT',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
+                headers: headers,
                 body: JSON.stringify({
                     content: content,
                     title: extractTitle(content),
                     push: true
                 })
-            }
-        );
+            });
+        }
+
+        if (response.status === 412) {
+            throw new Error('This document was changed elsewhere since you opened it. Reload it before saving.');
+        }
 
         if (!response.ok) {
             const errorData = await response.json().catch(() => ({ detail: `HTTP ${response.status}` }));
@@ -865,7 +1041,13 @@ async function saveDocument() {
         }
 
         const updatedDoc = await response.json();
-        currentDocument = updatedDoc;
+        currentDocument = {
+            ...currentDocument,
+            content: content,
+            title: extractTitle(content),
+            last_modified: updatedDoc.last_modified,
+            etag: updatedDoc.etag || response.headers.get('ETag')
+        };
         
         // Update preview
         showPreview(content);
@@ -878,7 +1060,7 @@ async function saveDocument() {
         if (updatedDoc.git_error) {
             showSuccess(`Document saved, but git commit failed: ${updatedDoc.git_status || 'Unknown error'}`);
         } else {
-            showSuccess(`Document saved and committed! ${updatedDoc.git_status || ''}`);
+            showSuccess(`Document saved! ${updatedDoc.git_status || ''}`);
         }
     } catch (error) {
         console.error('Error saving document:', error);
@@ -920,7 +1102,8 @@ async function createNewDocument() {
         const response = await fetch(`${API_BASE}/documents`, {
             method: 'POST',
             headers: {
-                'Content-Type': 'application/json'
+                'Content-Type': 'application/json',
+                'Prefer': 'return=minimal'
             },
             body: JSON.stringify({
                 path: path,
@@ -941,11 +1124,10 @@ async function createNewDocument() {
         if (newDoc.git_error) {
             showSuccess(`Document "${path}" created, but git commit failed: ${newDoc.git_status || 'Unknown error'}`);
         } else {
-            showSuccess(`Document "${path}" created and committed! ${newDoc.git_status || ''}`);
+            showSuccess(`Document "${path}" created! ${newDoc.git_status || ''}`);
         }
         
-        await loadSections();
-        await loadDocuments();
+        await refreshAfterChange();
         loadDocument(newDoc.path);
     } catch (error) {
         console.error('Error creating document:', error);
@@ -979,14 +1161,32 @@ async function deleteDocument() {
         document.getElementById('emptyState').style.display = 'flex';
         document.getElementById('documentContainer').style.display = 'none';
         
-        await loadSections();
-        await loadDocuments();
+        await refreshAfterChange();
     } catch (error) {
         console.error('Error deleting document:', error);
         showError('Failed to delete document');
     }
 }
 
+// Single line-range edit turning oldText into newText (unchanged head and tail are skipped)
+function computeLineEdit(oldText, newText) {
+    const splitLines = (text) => text.match(/[^\n]*\n|[^\n]+$/g) || [];
+    const oldLines = splitLines(oldText);
+    const newLines = splitLines(newText);
+    
+    let start = 0;
+    while (start < oldLines.length && start < newLines.length && oldLines[start] === newLines[start]) {
+        start++;
+    }
+    let oldEnd = oldLines.length;
+    let newEnd = newLines.length;
+    while (oldEnd > start && newEnd > start && oldLines[oldEnd - 1] === newLines[newEnd - 1]) {
+        oldEnd--;
+        newEnd--;
+    }
+    return { start: start, end: oldEnd, text: newLines.slice(start, newEnd).join('') };
+}
+
 function extractTitle(content) {
     const match = content.match(/^#\s+(.+)$/m);
     return match ? match[1] : null;